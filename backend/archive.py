@@ -0,0 +1,136 @@
+import asyncio
+import os
+import sys
+import time
+
+from db import db_connection, run_db
+from storage import get_storage
+from tracing import purge_spans
+
+# Columns moved from dbo.Contracts to dbo.ContractsHistory (ArchivedAt is filled by its default)
+ARCHIVE_COLUMNS = [
+    "Id", "ContractId", "ProcessInstanceId", "BusinessKey",
+    "ContractTitle", "ContractType", "Roles", "Skills", "RequestType",
+    "Budget", "ContractStartDate", "ContractEndDate", "Description",
+    "ProvidersBudget", "ProvidersComment", "ProvidersName", "MeetRequirement",
+    "SignedDate", "ApprovedAt", "LegalComment", "ApprovalDecision", "RejectedAt",
+    "ContractStatus", "CreatedAt", "EmployeeName", "OfficeAddress", "FinalPrice",
+]
+
+
+def archive_batch(cursor, older_than_days: int, batch_size: int) -> int:
+    """
+    Moves up to batch_size Approved/Rejected contracts closed more than older_than_days
+    ago into ContractsHistory (see Storage.move_rows for how each backend keeps the move
+    atomic). Returns the number of rows moved; the caller commits.
+    """
+    storage = get_storage()
+    cutoff = storage.seconds_from_now()
+    return storage.move_rows(
+        cursor, "Contracts", "ContractsHistory", ARCHIVE_COLUMNS,
+        f"(ContractStatus = 'Approved' AND ApprovedAt < {cutoff}) "
+        f"OR (ContractStatus = 'Rejected' AND RejectedAt < {cutoff})",
+        [-older_than_days * 86400, -older_than_days * 86400],
+        batch_size,
+    )
+
+
+class ContractArchiver:
+    """
+    Background task on the app's event loop that keeps dbo.Contracts down to the
+    working set. Every `interval` seconds it moves closed contracts older than
+    `older_than_days` to dbo.ContractsHistory in batches of `batch_size`, each batch
+    in its own short transaction so store workers and PATCHes are never blocked long.
+    """
+
+    def __init__(self, older_than_days=90, batch_size=500, interval=3600.0, pause=0.2):
+        self.older_than_days = older_than_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+
+        self._wake = None
+        self._task = None
+        self._stopping = False
+        self._archived = 0
+        self._runs = 0
+        self._last_run_at = None
+        self._last_error = None
+
+    def start(self):
+        """Must be called from the running event loop (app lifespan)."""
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=10.0):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+
+    def stats(self):
+        return {
+            "olderThanDays": self.older_than_days,
+            "batchSize": self.batch_size,
+            "archivedRows": self._archived,
+            "runs": self._runs,
+            "lastRunAt": self._last_run_at,
+            "lastError": self._last_error,
+        }
+
+    def _move_batch(self) -> int:
+        with db_connection() as conn:
+            moved = archive_batch(conn.cursor(), self.older_than_days, self.batch_size)
+            conn.commit()
+        return moved
+
+    def _purge_spans(self) -> int:
+        with db_connection() as conn:
+            deleted = purge_spans(conn.cursor(), self.batch_size)
+            conn.commit()
+        return deleted
+
+    async def archive_once(self) -> int:
+        """Archives batches until a short one signals the backlog is gone; returns rows moved."""
+        total = 0
+        while not self._stopping:
+            moved = await run_db(self._move_batch)
+            total += moved
+            self._archived += moved
+            if moved < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+        # Pipeline spans past TRACE_RETENTION_DAYS go in the same housekeeping run
+        while not self._stopping and await run_db(self._purge_spans) >= self.batch_size:
+            await asyncio.sleep(self.pause)
+        self._runs += 1
+        self._last_run_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        if total:
+            print(f"[Archive] moved {total} closed contract(s) to ContractsHistory", flush=True)
+        return total
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await self.archive_once()
+                self._last_error = None
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"[Archive] error: {e}", file=sys.stderr)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+if __name__ == "__main__":
+    # One-off run, e.g. from cron with ARCHIVE_ENABLED=false on the backend
+    archiver = ContractArchiver(
+        older_than_days=int(os.getenv("ARCHIVE_AFTER_DAYS", "90")),
+        batch_size=int(os.getenv("ARCHIVE_BATCH_SIZE", "500")),
+    )
+    print(f"[Archive] done: {asyncio.run(archiver.archive_once())} row(s) moved", flush=True)
@@ -0,0 +1,184 @@
+import asyncio
+import os
+import re
+import time
+import httpx
+from typing import Optional
+
+from cache import LRUCache
+from metrics import REGISTRY
+
+CAMUNDA_URL = os.getenv("CAMUNDA_URL", "http://camunda:8080/engine-rest") # Use docker service name if running in docker
+CAMUNDA_TIMEOUT_SEC = float(os.getenv("CAMUNDA_TIMEOUT_SEC", "10"))
+CAMUNDA_MAX_CONNECTIONS = int(os.getenv("CAMUNDA_MAX_CONNECTIONS", "50"))
+# Extra attempts of a variable push to a known instance that failed transiently (5xx, network)
+CAMUNDA_PUSH_RETRIES = int(os.getenv("CAMUNDA_PUSH_RETRIES", "2"))
+CAMUNDA_RETRY_BACKOFF_SEC = float(os.getenv("CAMUNDA_RETRY_BACKOFF_SEC", "0.2"))
+
+# contractId -> process instance id, so repeat offers skip the Camunda variable search
+instance_cache = LRUCache(int(os.getenv("INSTANCE_CACHE_SIZE", "10000")))
+
+REGISTRY.collect_stats("camunda_instance_cache", instance_cache.stats)
+
+camunda_seconds = REGISTRY.histogram(
+    "camunda_request_duration_seconds", "Camunda REST calls by endpoint (ids replaced by {id})",
+    ("method", "endpoint", "status"))
+
+_ID_SEGMENT = re.compile(r"/[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}(?=/|$)")
+
+
+class _TimedTransport(httpx.AsyncHTTPTransport):
+    """Records every Camunda call, including ones that fail without a response."""
+
+    async def handle_async_request(self, request):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await super().handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            endpoint = _ID_SEGMENT.sub("/{id}", request.url.path.split("/engine-rest", 1)[-1])
+            camunda_seconds.observe(time.perf_counter() - started,
+                                    method=request.method, endpoint=endpoint, status=status)
+
+
+# Shared keep-alive client, opened and closed by the app lifespan
+_client: Optional[httpx.AsyncClient] = None
+
+
+def open_client() -> httpx.AsyncClient:
+    global _client
+    _client = httpx.AsyncClient(
+        base_url=CAMUNDA_URL,
+        timeout=CAMUNDA_TIMEOUT_SEC,
+        transport=_TimedTransport(limits=httpx.Limits(max_connections=CAMUNDA_MAX_CONNECTIONS,
+                                                      max_keepalive_connections=CAMUNDA_MAX_CONNECTIONS)),
+    )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def client() -> httpx.AsyncClient:
+    if _client is None:
+        raise RuntimeError("Camunda client is not open")
+    return _client
+
+
+async def _search_instances(contract_id: str) -> list:
+    """
+    Slow path: variable search on Camunda, then history as a fallback.
+    """
+    print(f"[Camunda Sync] Looking for ACTIVE instances with contractId={contract_id}...", flush=True)
+    # Find all active process instances with this contractId
+    instances_res = await client().get(
+        "/process-instance", params={"variables": f"contractId_eq_{contract_id}", "active": "true"}
+    )
+    active_instances = instances_res.json()
+
+    if not active_instances:
+         print(f"[Camunda Sync] No ACTIVE process instances found. Checking history for fallback...")
+         fallback_res = await client().get(
+             "/variable-instance", params={"variableName": "contractId", "variableValue": contract_id}
+         )
+         active_instances = [{"id": v["processInstanceId"]} for v in fallback_res.json()[:1]] # Use first one from history as fallback
+
+    ids = [inst.get("id") or inst.get("processInstanceId") for inst in active_instances]
+    return [i for i in ids if i]
+
+
+async def _post_variables(inst_id: str, var_payload: dict) -> int:
+    """POST /variables; returns the HTTP status, raises httpx errors for network failures."""
+    resp = await client().post(f"/process-instance/{inst_id}/variables", json=var_payload)
+    if resp.status_code >= 400:
+        print(f"[Camunda Sync] ERROR for {inst_id}: {resp.status_code} - {resp.text}", flush=True)
+    else:
+        print(f"[Camunda Sync] SUCCESS: Pushed variables to {inst_id}", flush=True)
+    return resp.status_code
+
+
+async def _push_variables(inst_id: str, var_payload: dict) -> bool:
+    return await _post_variables(inst_id, var_payload) < 400
+
+
+async def _instance_gone(inst_id: str) -> bool:
+    """
+    Camunda answers a push to an ended instance with 404 or, depending on the
+    version, a 500; a GET on the instance tells the two cases apart.
+    """
+    return (await client().get(f"/process-instance/{inst_id}")).status_code == 404
+
+
+async def _push_known(inst_id: str, var_payload: dict):
+    """
+    Pushes to a cached/stored instance, retrying transient failures with the same id.
+    Returns True (pushed), None (the instance no longer exists) or False (still failing).
+    """
+    for attempt in range(CAMUNDA_PUSH_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(CAMUNDA_RETRY_BACKOFF_SEC * (2 ** (attempt - 1)))
+        try:
+            status = await _post_variables(inst_id, var_payload)
+        except httpx.TransportError as e:
+            print(f"[Camunda Sync] push to {inst_id} failed: {e!r}", flush=True)
+            continue
+        if status < 400:
+            return True
+        if status == 404:
+            return None
+        if status < 500:
+            # The engine rejected the payload itself; searching or retrying won't help
+            return False
+    try:
+        return None if await _instance_gone(inst_id) else False
+    except httpx.TransportError:
+        return False
+
+
+async def sync_to_camunda(contract_id: str, stored_instance_id: Optional[str], modifications: dict):
+    """
+    Pushes provider variables to the contract's process instance.
+    The instance comes from the LRU cache or the ProcessInstanceId stored on the row;
+    only when neither is known, or the instance no longer exists (404), do we search
+    Camunda. Other failures are retried with the known id and then reported as False,
+    keeping the cache entry (the outbox retries later).
+    Returns True once at least one instance accepted the variables.
+    """
+    if not modifications:
+        return True
+    var_payload = {"modifications": modifications}
+
+    known_id = instance_cache.get(contract_id) or stored_instance_id
+    if known_id:
+        pushed = await _push_known(known_id, var_payload)
+        if pushed:
+            instance_cache.put(contract_id, known_id)
+            return True
+        if pushed is False:
+            return False
+        # Instance ended or is unknown to the engine: forget it and search
+        instance_cache.pop(contract_id)
+
+    instance_ids = [i for i in await _search_instances(contract_id) if i != known_id]
+    if not instance_ids:
+        print(f"[Camunda Sync] CRITICAL: No instance found at all for contractId={contract_id}", flush=True)
+        return False
+
+    print(f"[Camunda Sync] Syncing to {len(instance_ids)} instance(s)...", flush=True)
+    # Push to every matching instance concurrently
+    results = await asyncio.gather(*(_push_variables(i, var_payload) for i in instance_ids))
+    if len(instance_ids) == 1 and results[0]:
+        instance_cache.put(contract_id, instance_ids[0])
+    return any(results)
+
+
+async def start_process(variables: dict) -> dict:
+    res = await client().post("/process-definition/key/contractTool/start", json={"variables": variables})
+    res.raise_for_status()
+    return res.json()
@@ -0,0 +1,213 @@
+"""
+Change tracking for the provider contract list.
+
+Every write to Contracts sets ModifiedAt (store worker mappings, provider PATCH), so
+clients can follow the active set instead of re-reading it:
+    list_version()  cheap version of the table, the basis of the list's ETag
+    delta_page()    contracts modified after a watermark, in (ModifiedAt, Id) order
+    ContractFeed    one poller per backend process fanning changes out to SSE streams
+
+Rows are only handed out once they are CHANGE_FEED_SETTLE_SEC old: ModifiedAt is the
+statement time, and a transaction that commits a little after a later one must not be
+skipped by a watermark that has already moved past it.
+"""
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+from db import read_connection, run_db
+from paging import decode_cursor, encode_cursor
+from storage import get_storage, naive_utc
+
+CHANGE_FEED_SETTLE_SEC = float(os.getenv("CHANGE_FEED_SETTLE_SEC", "2"))
+ACTIVE_STATUSES = ("Submitted", "Running")
+
+
+def list_version(cursor) -> str:
+    """
+    Newest ModifiedAt plus the number of rows modified within the settle window before
+    it, so a write that commits late (with an older timestamp) still changes the version.
+    """
+    cursor.execute("SELECT MAX(ModifiedAt) FROM Contracts")
+    latest = get_storage().to_datetime(cursor.fetchone()[0])
+    if latest is None:
+        return "empty"
+    cursor.execute("SELECT COUNT(*) FROM Contracts WHERE ModifiedAt >= ?",
+                   latest - timedelta(seconds=CHANGE_FEED_SETTLE_SEC))
+    return f"{latest.isoformat()}/{cursor.fetchone()[0]}"
+
+
+def parse_since(value: str):
+    """
+    `since=` accepts a timestamp (first call; naive values are UTC) or the opaque
+    watermark of a previous response.
+    """
+    try:
+        return naive_utc(datetime.fromisoformat(value.replace("Z", "+00:00"))), 0
+    except ValueError:
+        return decode_cursor(value)
+
+
+def settled_watermark(cursor) -> str:
+    """Watermark of "now", for a feed that starts without history."""
+    cursor.execute(f"SELECT {get_storage().seconds_from_now()}", -int(CHANGE_FEED_SETTLE_SEC))
+    return encode_cursor(get_storage().to_datetime(cursor.fetchone()[0]), 0)
+
+
+def delta_page(cursor, columns: list, since: str, limit: int):
+    """
+    Up to `limit` contracts modified after the `since` watermark, oldest change first.
+    Returns ([(watermark after the row, item)], next watermark). Contracts that left the
+    active set (approved or rejected) come back as ContractId and ContractStatus only.
+    """
+    storage = get_storage()
+    modified_at, row_id = parse_since(since)
+    select = list(dict.fromkeys(list(columns) + ["ContractId", "ContractStatus", "ModifiedAt", "Id"]))
+    cursor.execute(
+        storage.top(
+            limit,
+            f"""{', '.join(select)} FROM Contracts
+                WHERE (ModifiedAt > ? OR (ModifiedAt = ? AND Id > ?))
+                  AND ModifiedAt <= {storage.seconds_from_now()}
+                ORDER BY ModifiedAt, Id"""
+        ),
+        modified_at, modified_at, row_id, -int(CHANGE_FEED_SETTLE_SEC)
+    )
+    changes = []
+    for row in cursor.fetchall():
+        item = dict(zip(select, row))
+        watermark = encode_cursor(storage.to_datetime(item["ModifiedAt"]), item["Id"])
+        if item["ContractStatus"] in ACTIVE_STATUSES:
+            changes.append((watermark, {c: item[c] for c in columns}))
+        else:
+            changes.append((watermark, {"ContractId": item["ContractId"], "ContractStatus": item["ContractStatus"]}))
+    return changes, (changes[-1][0] if changes else since)
+
+
+def load_delta(columns: list, since: str, limit: int, primary: bool = False):
+    """delta_page() on a pooled read connection (the primary with primary=True)."""
+    with read_connection(primary) as conn:
+        return delta_page(conn.cursor(), columns, since, limit)
+
+
+def _settled_watermark():
+    with read_connection() as conn:
+        return settled_watermark(conn.cursor())
+
+
+def sse_event(watermark: str, item: dict, columns: list) -> str:
+    """One `contract` event; its id is the watermark a reconnecting client resumes from (Last-Event-ID)."""
+    if item.get("ContractStatus") in ACTIVE_STATUSES:
+        item = {c: item.get(c) for c in columns}
+    data = json.dumps(item, default=str, separators=(",", ":"))
+    return f"id: {watermark}\nevent: contract\ndata: {data}\n\n"
+
+
+class ContractFeed:
+    """
+    Background task on the app's event loop behind the SSE stream. While at least one
+    client is connected it runs the delta query every `poll_interval` seconds (sooner
+    after notify()) and puts each change on every subscriber's queue, so any number of
+    open streams cost one query per interval. A subscriber whose queue overflows is
+    sent None and disconnected; it resumes from its Last-Event-ID.
+    """
+
+    def __init__(self, columns: list, poll_interval=2.0, batch_size=500, queue_size=1000):
+        self.columns = columns
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+
+        self._wake = None
+        self._task = None
+        self._stopping = False
+        self._subscribers = set()
+        self._watermark = None
+        self._polls = 0
+        self._events = 0
+        self._overflows = 0
+
+    def start(self):
+        """Must be called from the running event loop (app lifespan)."""
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=10.0):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        for queue in list(self._subscribers):
+            self._close(queue)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+
+    def notify(self):
+        """Poll right after a local write instead of waiting for the next tick."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        self.notify()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            # Idle feeds don't poll; the next subscriber starts from "now"
+            self._watermark = None
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "polls": self._polls,
+            "events": self._events,
+            "overflows": self._overflows,
+        }
+
+    def _close(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        while True:
+            try:
+                queue.put_nowait(None)
+                return
+            except asyncio.QueueFull:
+                queue.get_nowait()
+
+    async def poll_once(self) -> int:
+        """Publishes one batch of changes; returns the number of changes."""
+        if self._watermark is None:
+            self._watermark = await run_db(_settled_watermark)
+        changes, self._watermark = await run_db(load_delta, self.columns, self._watermark, self.batch_size)
+        self._polls += 1
+        for queue in list(self._subscribers):
+            try:
+                for change in changes:
+                    queue.put_nowait(change)
+            except asyncio.QueueFull:
+                self._overflows += 1
+                self._close(queue)
+        self._events += len(changes)
+        return len(changes)
+
+    async def _run(self):
+        while not self._stopping:
+            published = 0
+            if self._subscribers:
+                try:
+                    published = await self.poll_once()
+                except Exception as e:
+                    print(f"[ChangeFeed] poll error: {e}", file=sys.stderr)
+            # Keep going while there is a backlog, otherwise wait for a write or the poll tick
+            if published < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
@@ -1,6 +1,15 @@
+import asyncio
 import psycopg2
-import pyodbc 
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from metrics import REGISTRY
+from pool import ConnectionPool, PoolTimeout
+from storage import get_storage
 
 def get_connection():
     return psycopg2.connect(
@@ -11,23 +20,147 @@ def get_connection():
         port=os.getenv("DB_PORT", "5432")
     )
 
-def get_azure_connection():
-    server = os.getenv("AZURE_SQL_SERVER")
-    database = os.getenv("AZURE_SQL_DATABASE")
-    user = os.getenv("AZURE_SQL_USER")
-    password = os.getenv("AZURE_SQL_PASSWORD")
-
-    if not all([server, database, user, password]):
-        raise ValueError("Missing AZURE_SQL credentials")
-
-    conn_str = (
-        "Driver={ODBC Driver 18 for SQL Server};"
-        f"Server=tcp:{server},1433;"
-        f"Database={database};"
-        f"Uid={user};"
-        f"Pwd={password};"
-        "Encrypt=yes;"
-        "TrustServerCertificate=no;"
-        "Connection Timeout=30;"
-    )
-    return pyodbc.connect(conn_str)
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """
+    Process-wide pool of Contracts-store connections (STORAGE_BACKEND), created on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_storage().connect,
+                    max_size=int(os.getenv("AZURE_SQL_POOL_SIZE", "10")),
+                    max_lifetime=float(os.getenv("AZURE_SQL_POOL_MAX_LIFETIME_SEC", "1800")),
+                    max_idle=float(os.getenv("AZURE_SQL_POOL_MAX_IDLE_SEC", "300")),
+                    ping_after=float(os.getenv("AZURE_SQL_POOL_PING_AFTER_SEC", "30")),
+                    timeout=float(os.getenv("AZURE_SQL_POOL_TIMEOUT_SEC", "30")),
+                )
+    return _pool
+
+def db_connection():
+    """
+    Checks out a pooled Contracts-store connection; it is returned to the pool
+    (rolled back) when the with-block exits, even on error.
+    """
+    return get_pool().connection()
+
+def pool_stats():
+    if _pool is None:
+        return {}
+    return _pool.stats()
+
+# Read replica (Storage.has_replica). Read-only endpoints use read_connection(); after a
+# connection-level failure (connect, ping, lost link) the replica is skipped for
+# REPLICA_RETRY_SEC and reads go to the primary pool instead.
+REPLICA_RETRY_SEC = float(os.getenv("REPLICA_RETRY_SEC", "30"))
+
+_read_pool = None
+_replica_down_until = 0.0
+_replica_lock = threading.Lock()
+_read_counts = {"replica": 0, "primary": 0, "fallbacks": 0, "replicaErrors": 0}
+
+def _replica_pool():
+    global _read_pool
+    storage = get_storage()
+    if not storage.has_replica() or time.monotonic() < _replica_down_until:
+        return None
+    if _read_pool is None:
+        with _replica_lock:
+            if _read_pool is None:
+                _read_pool = ConnectionPool(
+                    storage.connect_replica,
+                    max_size=int(os.getenv("AZURE_SQL_READ_POOL_SIZE", os.getenv("AZURE_SQL_POOL_SIZE", "10"))),
+                    max_lifetime=float(os.getenv("AZURE_SQL_POOL_MAX_LIFETIME_SEC", "1800")),
+                    max_idle=float(os.getenv("AZURE_SQL_POOL_MAX_IDLE_SEC", "300")),
+                    ping_after=float(os.getenv("AZURE_SQL_POOL_PING_AFTER_SEC", "30")),
+                    timeout=float(os.getenv("AZURE_SQL_POOL_TIMEOUT_SEC", "30")),
+                )
+    return _read_pool
+
+def _count(key):
+    with _replica_lock:
+        _read_counts[key] += 1
+
+def _mark_replica_down(error):
+    global _replica_down_until
+    with _replica_lock:
+        _replica_down_until = time.monotonic() + REPLICA_RETRY_SEC
+        _read_counts["replicaErrors"] += 1
+    print(f"[db] read replica unhealthy, using primary for {REPLICA_RETRY_SEC:.0f}s: {error}", file=sys.stderr)
+
+@contextmanager
+def read_connection(primary: bool = False):
+    """
+    Connection for read-only work: the replica when one is configured and healthy,
+    otherwise (or with primary=True, for read-your-writes) the primary pool.
+    """
+    pool = None if primary else _replica_pool()
+    conn = None
+    if pool is not None:
+        try:
+            conn, created_at = pool.acquire()
+        except PoolTimeout:
+            # Replica pool saturated, not broken
+            _count("fallbacks")
+        except Exception as e:
+            _mark_replica_down(e)
+            _count("fallbacks")
+
+    if conn is None:
+        _count("primary")
+        with db_connection() as primary_conn:
+            yield primary_conn
+        return
+
+    _count("replica")
+    try:
+        yield conn
+    except Exception as e:
+        # An error in the caller's query is re-raised without rerouting reads
+        if get_storage().is_connection_error(e):
+            _mark_replica_down(e)
+        raise
+    finally:
+        pool.release(conn, created_at)
+
+def read_stats():
+    with _replica_lock:
+        stats = {
+            "configured": get_storage().has_replica(),
+            "healthy": time.monotonic() >= _replica_down_until,
+            "reads": dict(_read_counts),
+        }
+    if _read_pool is not None:
+        stats["pool"] = _read_pool.stats()
+    return stats
+
+# Blocking DB work from async endpoints runs here. Sized like the pool so a
+# DB thread never waits for a connection, and independent of the event loop's
+# default threadpool.
+db_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DB_EXECUTOR_THREADS", os.getenv("AZURE_SQL_POOL_SIZE", "10"))),
+    thread_name_prefix="db",
+)
+
+db_wait_seconds = REGISTRY.histogram(
+    "db_executor_wait_seconds", "Time a run_db call waited for a free db_executor thread")
+db_call_seconds = REGISTRY.histogram(
+    "db_call_duration_seconds", "Duration of blocking DB work run through run_db, by function", ("operation",))
+REGISTRY.collect_stats("db_pool", pool_stats)
+REGISTRY.collect_stats("db_read", read_stats)
+
+def _timed_call(queued_at: float, fn, args, kwargs):
+    started = time.perf_counter()
+    db_wait_seconds.observe(started - queued_at)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        db_call_seconds.observe(time.perf_counter() - started, operation=getattr(fn, "__name__", "call"))
+
+async def run_db(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, _timed_call, time.perf_counter(), fn, args, kwargs)
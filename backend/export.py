@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from db import read_connection
+from storage import get_storage
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _ndjson_chunk(columns: list, rows: list) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default, separators=(",", ":")) + "\n"
+        for row in rows
+    )
+
+
+def _csv_chunk(columns: list, rows: list, header: bool) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow(v.isoformat() if isinstance(v, (datetime, date)) else v for v in row)
+    return buf.getvalue()
+
+
+def stream_contracts(columns: list, where_sql: str, params: list, fmt: str, chunk_size: int,
+                     table: str = "Contracts", primary: bool = False):
+    """
+    Yields the export body chunk by chunk. The pooled connection is held only while
+    the response streams and rows are pulled from the server with fetchmany (through a
+    server-side cursor on Postgres), so memory stays bounded by chunk_size whatever the
+    table size.
+    """
+    if fmt == "csv":
+        # Header goes out before the query runs so the client sees the first byte immediately
+        yield _csv_chunk(columns, [], header=True)
+
+    with read_connection(primary) as conn:
+        cursor = get_storage().streaming_cursor(conn)
+        cursor.execute(
+            f"SELECT {', '.join(columns)} FROM {table} WHERE {where_sql} ORDER BY Id",
+            *params
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            if fmt == "csv":
+                yield _csv_chunk(columns, rows, header=False)
+            else:
+                yield _ndjson_chunk(columns, rows)
+        cursor.close()
@@ -1,11 +1,74 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from db import get_connection, get_azure_connection
+from fastapi.responses import StreamingResponse
+from db import get_connection, db_connection, read_connection, pool_stats, read_stats, run_db, db_executor
+from paging import keyset_page, parse_fields
+from export import stream_contracts
+from cache import TTLCache
+import camunda
+from camunda import instance_cache, sync_to_camunda
+from outbox import OutboxDispatcher, enqueue, enqueue_many
+from archive import ContractArchiver
+from metrics import REGISTRY, CONTENT_TYPE
+from changes import ContractFeed, list_version, load_delta, parse_since, sse_event
+from storage import get_storage, naive_utc
+from tracing import CORRELATION_VARIABLE, build_timeline, load_spans, new_correlation_id, record_spans, span, utcnow
+from schema import migrate
+import asyncio
+import hashlib
+import json
+import math
+import os
 import sys
+import time
+import uuid
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+# Provider offers are synced to Camunda through dbo.CamundaOutbox by a background
+# dispatcher; with OUTBOX_ENABLED=false the PATCH pushes synchronously instead.
+OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "true").lower() == "true"
+outbox = OutboxDispatcher(
+    batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", "50")),
+    poll_interval=float(os.getenv("OUTBOX_POLL_SEC", "1.0")),
+    max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10")),
+    lease_seconds=int(os.getenv("OUTBOX_LEASE_SEC", "120")),
+)
+
+# Closed contracts older than ARCHIVE_AFTER_DAYS move to dbo.ContractsHistory;
+# approved/rejected reads go through the dbo.ContractsAll view (hot + cold).
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() == "true"
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+archiver = ContractArchiver(
+    older_than_days=ARCHIVE_AFTER_DAYS,
+    batch_size=int(os.getenv("ARCHIVE_BATCH_SIZE", "500")),
+    interval=float(os.getenv("ARCHIVE_INTERVAL_SEC", "3600")),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Versioned schema migrations (backend/migrations/*.sql) before serving traffic
+    if os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true":
+        await run_db(migrate)
+    # One pooled HTTP client for every Camunda call made by this process
+    camunda.open_client()
+    if OUTBOX_ENABLED:
+        outbox.start()
+    if ARCHIVE_ENABLED:
+        archiver.start()
+    change_feed.start()
+    yield
+    await change_feed.stop()
+    if ARCHIVE_ENABLED:
+        await archiver.stop()
+    if OUTBOX_ENABLED:
+        await outbox.stop()
+    await camunda.close_client()
+    db_executor.shutdown(wait=False)
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,115 +76,251 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Read-Primary-Until", "X-Correlation-ID", "ETag", "X-Next-Since"],
 )
 
+# Per-route latency; DB (db_call_duration_seconds) and Camunda (camunda_request_duration_seconds)
+# time is broken out separately, the rest of a request is serialization and framework overhead
+http_seconds = REGISTRY.histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route", "status"))
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        http_seconds.observe(time.perf_counter() - started, method=request.method,
+                             route=getattr(route, "path", "unmatched"), status=str(status))
+
+# Reads go to the replica when one is configured (see db.read_connection). A provider
+# PATCH pins that client's reads to the primary for READ_YOUR_WRITES_SEC through the
+# read-primary-until cookie; API clients can send X-Read-Consistency: primary instead.
+READ_YOUR_WRITES_SEC = float(os.getenv("READ_YOUR_WRITES_SEC", "10"))
+
+def wants_primary(request: Request) -> bool:
+    if request.headers.get("x-read-consistency", "").lower() == "primary":
+        return True
+    try:
+        return float(request.cookies.get("read-primary-until", "0")) > time.time()
+    except ValueError:
+        return False
+
+def pin_reads_to_primary(response: Response):
+    until = time.time() + READ_YOUR_WRITES_SEC
+    response.set_cookie("read-primary-until", f"{until:.3f}", max_age=math.ceil(READ_YOUR_WRITES_SEC))
+    response.headers["X-Read-Primary-Until"] = f"{until:.3f}"
+
 @app.get("/")
-def home():
+async def home():
     return {"message": "Backend is running!"}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text format: route, DB and Camunda latency histograms, pool/cache/outbox gauges."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
     
+def _check_camunda_db():
+    conn = get_connection()
+    conn.close()
+
 @app.get("/test-db")
-def test_db():
+async def test_db():
     try:
-        conn = get_connection()
-        conn.close()
+        await run_db(_check_camunda_db)
         return {"status": "ok", "message": "Database connected"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+# Status counts are shared by /stats and the dashboard and cached briefly,
+# since the Cockpit plugin polls them constantly
+status_cache = TTLCache(ttl=float(os.getenv("STATS_CACHE_TTL_SEC", "5")))
+
+def _load_status_counts():
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        # Archived contracts still count towards Approved/Rejected
+        cursor.execute("SELECT ContractStatus, COUNT(*) FROM ContractsAll GROUP BY ContractStatus")
+        rows = cursor.fetchall()
+    
+    counts = {row[0]: row[1] for row in rows} if rows else {}
+    # Ensure base keys for safety
+    for k in ["Submitted", "Running", "Approved", "Rejected"]:
+        if k not in counts: counts[k] = 0
+    return counts
+
+def get_status_counts():
+    return dict(status_cache.get("status_counts", _load_status_counts))
+
+REGISTRY.collect_stats("stats_cache", status_cache.stats)
+REGISTRY.collect_stats("outbox", outbox.counters)
+REGISTRY.collect_stats("archive", archiver.stats)
+
+def invalidate_status_counts():
+    """Call after anything that changes a contract (status counts and the provider list version)."""
+    status_cache.invalidate()
+
 @app.get("/stats")
-def get_stats():
+async def get_stats():
     """
     Returns counts for Submitted, Running, Approved, and Rejected contracts from Azure SQL.
     """
     try:
-        conn = get_azure_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT ContractStatus, COUNT(*) FROM Contracts GROUP BY ContractStatus")
-        rows = cursor.fetchall()
-        
-        stats = {row[0]: row[1] for row in rows} if rows else {}
-        # Ensure base keys for safety
-        for k in ["Submitted", "Running", "Approved", "Rejected"]:
-            if k not in stats: stats[k] = 0
-            
-        return stats
+        return await run_db(get_status_counts)
     except Exception as e:
         print(f"Error in /stats: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/admin/dashboard-stats")
-def get_admin_dashboard_stats():
+async def get_admin_dashboard_stats():
     """
     Detailed stats for the Cockpit Dashboard Plugin.
     """
     try:
-        conn = get_azure_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT ContractStatus, COUNT(*) FROM Contracts GROUP BY ContractStatus")
-        rows = cursor.fetchall()
-        status_counts = {row[0]: row[1] for row in rows} if rows else {}
-        
-        for s in ["Submitted", "Running", "Approved", "Rejected"]:
-            if s not in status_counts:
-                status_counts[s] = 0
+        status_counts = await run_db(get_status_counts)
                 
         return {
             "totalContracts": sum(status_counts.values()),
             "byStatus": status_counts,
-            "systemHealth": "Healthy"
+            "systemHealth": "Healthy",
+            "connectionPool": pool_stats(),
+            "readReplica": read_stats(),
+            "statsCache": status_cache.stats(),
+            "instanceCache": instance_cache.stats(),
+            "archive": archiver.stats() if ARCHIVE_ENABLED else {"enabled": False}
         }
     except Exception as e:
         print(f"Error in /api/admin/dashboard-stats: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/admin/cache/invalidate")
+async def invalidate_cache():
+    """
+    Invalidation hook for the store workers, called after they change contract statuses.
+    """
+    invalidate_status_counts()
+    change_feed.notify()
+    return {"status": "ok", "statsCache": status_cache.stats()}
+
+# Columns of dbo.Contracts that list endpoints may project with ?fields=
+CONTRACT_COLUMNS = [
+    "Id", "ContractId", "ProcessInstanceId", "BusinessKey",
+    "ContractTitle", "ContractType", "Roles", "Skills", "RequestType",
+    "Budget", "ContractStartDate", "ContractEndDate", "Description",
+    "ProvidersBudget", "ProvidersComment", "ProvidersName", "MeetRequirement",
+    "SignedDate", "ApprovedAt", "LegalComment", "ApprovalDecision", "RejectedAt",
+    "ContractStatus", "CreatedAt", "EmployeeName", "OfficeAddress", "FinalPrice",
+]
+
+# Status filter, keyset sort column and source relation per list. Open contracts are
+# never archived, so only the closed lists need to include ContractsHistory.
+CONTRACT_LISTS = {
+    "submitted": ("ContractStatus IN ('Submitted', 'Running')", "CreatedAt", "Contracts"),
+    "approved": ("ContractStatus = 'Approved'", "ApprovedAt", "ContractsAll"),
+    "rejected": ("ContractStatus = 'Rejected'", "RejectedAt", "ContractsAll"),
+}
+
+def _contract_page(columns: list, where_sql: str, sort_column: str, limit: int, after: Optional[str],
+                   table: str = "Contracts", primary: bool = False):
+    with read_connection(primary) as conn:
+        return keyset_page(conn.cursor(), columns, where_sql, sort_column, limit, after, table)
+
 @app.get("/contracts/{status}")
-def get_contracts(status: str):
+async def get_contracts(
+    status: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+):
     """
     Returns list of contracts based on status: 'submitted', 'approved', 'rejected'.
+    Newest first, `limit` rows per page; pass the `X-Next-Cursor` response header back as `after`
+    to get the next page. `fields` is an optional comma-separated column projection.
     """
     status = status.lower()
     allowed = ["submitted", "approved", "rejected"]
     if status not in allowed:
         raise HTTPException(status_code=400, detail="Invalid status. Must be submitted, approved, or rejected.")
+    columns = parse_fields(fields, CONTRACT_COLUMNS, CONTRACT_COLUMNS)
     
     try:
-        conn = get_azure_connection()
-        cursor = conn.cursor()
-        
         # Map frontend status to DB status
         # 'submitted' could match 'Submitted' or 'Running'
         # 'approved' matches 'Approved'
         # 'rejected' matches 'Rejected'
-        
-        if status == "submitted":
-            query = "SELECT * FROM Contracts WHERE ContractStatus IN ('Submitted', 'Running') ORDER BY CreatedAt DESC"
-        elif status == "approved":
-             query = "SELECT * FROM Contracts WHERE ContractStatus = 'Approved' ORDER BY ApprovedAt DESC"
-        else: # rejected
-             query = "SELECT * FROM Contracts WHERE ContractStatus = 'Rejected' ORDER BY RejectedAt DESC"
+        where_sql, sort_column, table = CONTRACT_LISTS[status]
             
-        cursor.execute(query)
-        rows = cursor.fetchall()
+        results, next_cursor = await run_db(
+            _contract_page, columns, where_sql, sort_column, limit, after, table, wants_primary(request)
+        )
         
-        # Convert rows to list of dicts
-        columns = [column[0] for column in cursor.description]
-        results = []
-        for row in rows:
-            results.append(dict(zip(columns, row)))
-            
-        conn.close()
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return results
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in /contracts/{status}: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail=str(e))
 
-        
-import requests
 
-CAMUNDA_URL = "http://camunda:8080/engine-rest" # Use docker service name if running in docker
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+@app.get("/api/admin/contracts/export")
+def export_contracts(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    fields: Optional[str] = None,
+):
+    """
+    Streams the Contracts table as NDJSON or CSV for reporting.
+    Optional filters: status (submitted, approved, rejected) and a CreatedAt range [from, to)
+    (timestamps with an offset are converted to UTC; naive ones are UTC).
+    Archived contracts are included unless the filters rule them out.
+    """
+    columns = parse_fields(fields, CONTRACT_COLUMNS, CONTRACT_COLUMNS)
+
+    # CreatedAt is stored as naive UTC; bounds with an offset are converted once here
+    created_from = naive_utc(created_from) if created_from else None
+    created_to = naive_utc(created_to) if created_to else None
+
+    where, params = ["1 = 1"], []
+    if status:
+        status = status.lower()
+        if status not in CONTRACT_LISTS:
+            raise HTTPException(status_code=400, detail="Invalid status. Must be submitted, approved, or rejected.")
+        where.append(CONTRACT_LISTS[status][0])
+    if created_from:
+        where.append("CreatedAt >= ?")
+        params.append(created_from)
+    if created_to:
+        where.append("CreatedAt < ?")
+        params.append(created_to)
+
+    # An archived contract was closed, and therefore created, before the archive cutoff
+    hot_only = status == "submitted" or (
+        created_from is not None
+        and created_from >= utcnow() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    )
+    table = "Contracts" if hot_only else "ContractsAll"
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_contracts(columns, " AND ".join(where), params, format, EXPORT_CHUNK_SIZE, table,
+                         wants_primary(request)),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=contracts.{format}"},
+    )
 
 class ProviderUpdate(BaseModel):
     providersBudget: Optional[int] = None
@@ -129,112 +328,203 @@ class ProviderUpdate(BaseModel):
     meetRequirement: Optional[str] = None
     providersName: Optional[str] = None
 
+# Fields providers may see
+PROVIDER_COLUMNS = [
+    "ContractId", "ContractTitle", "ContractType", "Roles", "Skills", "RequestType",
+    "Budget", "ContractStartDate", "ContractEndDate", "Description",
+    "ContractStatus", "ProvidersBudget", "ProvidersComment", "MeetRequirement", "ProvidersName",
+]
+
+# Provider integrations poll the list: an unchanged list answers If-None-Match with 304,
+# since= returns only what changed, and the SSE stream pushes changes as they happen
+change_feed = ContractFeed(PROVIDER_COLUMNS, poll_interval=float(os.getenv("CHANGE_FEED_POLL_SEC", "2")))
+SSE_HEARTBEAT_SEC = float(os.getenv("SSE_HEARTBEAT_SEC", "15"))
+
+REGISTRY.collect_stats("change_feed", change_feed.stats)
+
+def _list_version(primary: bool):
+    with read_connection(primary) as conn:
+        return list_version(conn.cursor())
+
+def provider_list_etag(version: str, columns: list, limit: int, after: Optional[str]) -> str:
+    digest = hashlib.sha1(json.dumps([version, columns, limit, after]).encode()).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Weak comparison: W/ prefixes are ignored on both sides
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
 @app.get("/api/providers/contracts")
-def get_provider_contracts():
+async def get_provider_contracts(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    since: Optional[str] = None,
+):
     """
     Returns contracts for providers that are in 'Submitted' or 'Running' status.
+    Paged and projectable the same way as /contracts/{status}. Responses carry an ETag;
+    a request with a matching If-None-Match gets 304 without running the list query.
+
+    With `since` (a timestamp, or the X-Next-Since header of the previous call) only
+    contracts changed after it are returned, oldest change first; contracts that left
+    the list come back as ContractId and ContractStatus only.
     """
+    columns = parse_fields(fields, PROVIDER_COLUMNS, PROVIDER_COLUMNS)
     try:
-        conn = get_azure_connection()
-        cursor = conn.cursor()
-        
-        # Select specific fields requested, filtering for 'Submitted' or 'Running' contracts
-        query = """
-            SELECT ContractId, ContractTitle, ContractType, Roles, Skills, RequestType, 
-                   Budget, ContractStartDate, ContractEndDate, Description,
-                   ContractStatus, ProvidersBudget, ProvidersComment, MeetRequirement, ProvidersName
-            FROM Contracts
-            WHERE ContractStatus IN ('Submitted', 'Running')
-            ORDER BY CreatedAt DESC
-        """
-        cursor.execute(query)
-        rows = cursor.fetchall()
+        primary = wants_primary(request)
+        if since:
+            changes, watermark = await run_db(load_delta, columns, since, limit, primary)
+            response.headers["X-Next-Since"] = watermark
+            return [item for _, item in changes]
+
+        version = await run_db(status_cache.get, ("provider_list_version", primary), lambda: _list_version(primary))
+        etag = provider_list_etag(version, columns, limit, after)
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+        # Filtering for 'Submitted' or 'Running' contracts
+        results, next_cursor = await run_db(
+            _contract_page, columns, "ContractStatus IN ('Submitted', 'Running')", "CreatedAt", limit, after,
+            "Contracts", primary
+        )
         
-        columns = [column[0] for column in cursor.description]
-        results = []
-        for row in rows:
-            results.append(dict(zip(columns, row)))
-            
-        conn.close()
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return results
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in /api/providers/contracts: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.patch("/api/providers/contracts/{contract_id}")
-def update_provider_contract(contract_id: str, update: ProviderUpdate):
+@app.get("/api/providers/contracts/stream")
+async def stream_provider_contracts(request: Request, since: Optional[str] = None, fields: Optional[str] = None):
     """
-    Updates providersBudget, providersComment and meetRequirement for a contract.
-    This endpoint is used by providers to submit their offers.
-    It also attempts to sync the data back to Camunda process variables if an active instance is found.
+    Server-Sent Events: one `contract` event per new or changed contract (same shapes as
+    the since= delta). With `since` or a Last-Event-ID header the changes after that
+    watermark are replayed first. Delivery is at least once; apply events by ContractId.
     """
-    try:
-        conn = get_azure_connection()
+    columns = parse_fields(fields, PROVIDER_COLUMNS, PROVIDER_COLUMNS)
+    since = request.headers.get("last-event-id") or since
+    if since:
+        parse_since(since)  # 400 before the stream starts
+
+    async def events():
+        queue = change_feed.subscribe()
+        try:
+            watermark = since
+            while watermark:
+                changes, watermark = await run_db(load_delta, columns, watermark, change_feed.batch_size)
+                for change in changes:
+                    yield sse_event(*change, columns)
+                if len(changes) < change_feed.batch_size:
+                    break
+            while True:
+                try:
+                    change = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SEC)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if change is None:
+                    # Fell too far behind (or shutdown); the client reconnects with Last-Event-ID
+                    break
+                yield sse_event(*change, columns)
+        finally:
+            change_feed.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def offer_update_sql() -> str:
+    """UPDATE of one offer; parameters are offer_params(update) followed by the ContractId."""
+    return f"""
+        UPDATE Contracts
+        SET ContractStatus = 'Running', ProvidersBudget = ?, ProvidersComment = ?, MeetRequirement = ?, ProvidersName = ?,
+            ModifiedAt = {get_storage().now}
+        WHERE ContractId = ?
+    """
+
+def offer_params(update: ProviderUpdate) -> tuple:
+    return update.providersBudget, update.providersComment, update.meetRequirement, update.providersName
+
+def offer_modifications(update: ProviderUpdate) -> dict:
+    """Camunda variables for the fields the offer sets."""
+    modifications = {}
+    if update.providersName is not None:
+        modifications["providersName"] = {"value": str(update.providersName), "type": "String"}
+    if update.providersBudget is not None:
+        modifications["providersBudget"] = {"value": int(update.providersBudget), "type": "Integer"}
+    if update.providersComment is not None:
+        modifications["providersComment"] = {"value": str(update.providersComment), "type": "String"}
+    if update.meetRequirement is not None:
+        modifications["meetRequirement"] = {"value": str(update.meetRequirement), "type": "String"}
+    return modifications
+
+def _save_offer(contract_id: str, update: ProviderUpdate, started_at: datetime):
+    """
+    Stores the offer (and its outbox row and trace span) in one transaction.
+    Returns (stored ProcessInstanceId, Camunda variable modifications).
+    """
+    with db_connection() as conn:
         cursor = conn.cursor()
         
         # Check if contract exists
-        cursor.execute("SELECT ContractId, ContractStatus FROM Contracts WHERE ContractId = ?", contract_id)
+        cursor.execute("SELECT ContractId, ContractStatus, ProcessInstanceId FROM Contracts WHERE ContractId = ?", contract_id)
         row = cursor.fetchone()
         if not row:
-            conn.close()
             raise HTTPException(status_code=404, detail=f"Contract with ID {contract_id} not found")
             
         # Update fields in DB
-        query = """
-            UPDATE Contracts
-            SET ContractStatus = 'Running', ProvidersBudget = ?, ProvidersComment = ?, MeetRequirement = ?, ProvidersName = ?
-            WHERE ContractId = ?
-        """
-        cursor.execute(query, update.providersBudget, update.providersComment, update.meetRequirement, update.providersName, contract_id)
+        cursor.execute(offer_update_sql(), *offer_params(update), contract_id)
+
+        # Prepare variables for Camunda
+        modifications = offer_modifications(update)
+
+        # Same transaction as the update: the sync can't be lost once the offer is saved
+        if OUTBOX_ENABLED and modifications:
+            enqueue(cursor, contract_id, row[2], modifications)
+        record_spans(cursor, [span("provider-offer", "backend", started_at, process_instance_id=row[2])])
         conn.commit()
-        conn.close()
+    invalidate_status_counts()
+    return row[2], modifications
 
-        # Camunda Sync: Try to find and update process variables
-        try:
-            print(f"[Camunda Sync] Looking for ACTIVE instances with contractId={contract_id}...", flush=True)
-            # Find all active process instances with this contractId
-            search_url = f"{CAMUNDA_URL}/process-instance?variables=contractId_eq_{contract_id}&active=true"
-            instances_res = requests.get(search_url)
-            active_instances = instances_res.json()
-            
-            if not active_instances:
-                 print(f"[Camunda Sync] No ACTIVE process instances found. Checking history for fallback...")
-                 fallback_res = requests.get(f"{CAMUNDA_URL}/variable-instance?variableName=contractId&variableValue={contract_id}")
-                 active_instances = [{"id": v["processInstanceId"]} for v in fallback_res.json()[:1]] # Use first one from history as fallback
+@app.patch("/api/providers/contracts/{contract_id}")
+async def update_provider_contract(contract_id: str, update: ProviderUpdate, response: Response):
+    """
+    Updates providersBudget, providersComment and meetRequirement for a contract.
+    This endpoint is used by providers to submit their offers.
+    The data is synced back to the contract's Camunda process variables through the outbox
+    (or inline when the outbox is disabled).
+    """
+    try:
+        instance_id, modifications = await run_db(_save_offer, contract_id, update, utcnow())
+        # This client's next reads must see the offer even if the replica lags
+        pin_reads_to_primary(response)
 
-            if active_instances:
-                print(f"[Camunda Sync] Syncing to {len(active_instances)} instance(s)...", flush=True)
-                
-                # Prepare variables
-                modifications = {}
-                if update.providersName is not None:
-                    modifications["providersName"] = {"value": str(update.providersName), "type": "String"}
-                if update.providersBudget is not None:
-                    modifications["providersBudget"] = {"value": int(update.providersBudget), "type": "Integer"}
-                if update.providersComment is not None:
-                    modifications["providersComment"] = {"value": str(update.providersComment), "type": "String"}
-                if update.meetRequirement is not None:
-                    modifications["meetRequirement"] = {"value": str(update.meetRequirement), "type": "String"}
-
-                if modifications:
-                    var_payload = {"modifications": modifications}
-                    for inst in active_instances:
-                        inst_id = inst.get("id") or inst.get("processInstanceId")
-                        if not inst_id: continue
-                        
-                        resp = requests.post(f"{CAMUNDA_URL}/process-instance/{inst_id}/variables", json=var_payload)
-                        if resp.status_code >= 400:
-                            print(f"[Camunda Sync] ERROR for {inst_id}: {resp.status_code} - {resp.text}", flush=True)
-                        else:
-                            print(f"[Camunda Sync] SUCCESS: Pushed variables to {inst_id}", flush=True)
-            else:
-                print(f"[Camunda Sync] CRITICAL: No instance found at all for contractId={contract_id}", flush=True)
-        except Exception as camunda_err:
-            print(f"Warning: Failed to sync with Camunda: {camunda_err}", file=sys.stderr)
+        change_feed.notify()
+        if OUTBOX_ENABLED:
+            outbox.notify()
+        else:
+            # Camunda Sync: update process variables inline
+            try:
+                await sync_to_camunda(contract_id, instance_id, modifications)
+            except Exception as camunda_err:
+                print(f"Warning: Failed to sync with Camunda: {camunda_err}", file=sys.stderr)
 
         return {
             "status": "success",
-            "message": "Contract updated and synced successfully",
+            "message": "Contract updated; Camunda sync queued" if OUTBOX_ENABLED else "Contract updated and synced successfully",
             "contractId": contract_id,
             "updatedFields": {
                 "providersBudget": update.providersBudget,
@@ -250,28 +540,217 @@ def update_provider_contract(contract_id: str, update: ProviderUpdate):
         print(f"Error in PATCH /api/providers/contracts: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail=str(e))
 
+class BulkOffer(ProviderUpdate):
+    contractId: str
+
+class BulkOffers(BaseModel):
+    offers: List[BulkOffer]
+
+BULK_OFFER_MAX = int(os.getenv("BULK_OFFER_MAX", "1000"))
+# Concurrent Camunda pushes of one bulk request when the outbox is disabled
+BULK_SYNC_CONCURRENCY = int(os.getenv("BULK_SYNC_CONCURRENCY", "20"))
+# SQL Server allows at most 2100 parameters per statement
+MAX_SQL_PARAMS = 2000
+
+def _save_offers(offers: list, started_at: datetime):
+    """
+    Stores a batch of offers in one transaction: one existence query per 2000 ids, one
+    executemany UPDATE, the outbox rows and trace spans. Returns (per-offer results in
+    request order, [(result index, contract id, instance id, modifications)] to sync).
+    """
+    results = [{"contractId": o.contractId} for o in offers]
+    # ContractId is a UNIQUEIDENTIFIER on Azure SQL: a malformed id would fail the whole
+    # query, so ids are parsed first. Ids naming the same UUID (differing only in case
+    # or format) are one contract; only the first is queried, exactly as sent, since
+    # the column is a case-sensitive VARCHAR on Postgres and SQLite.
+    uuids, wanted = [], {}
+    for index, offer in enumerate(offers):
+        try:
+            uuids.append(uuid.UUID(offer.contractId))
+        except ValueError:
+            uuids.append(None)
+            results[index].update(status="error", detail=f"Invalid contractId {offer.contractId!r}")
+            continue
+        wanted.setdefault(uuids[-1], offer.contractId)
+    wanted = list(wanted.values())
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        found = {}
+        for i in range(0, len(wanted), MAX_SQL_PARAMS):
+            chunk = wanted[i:i + MAX_SQL_PARAMS]
+            cursor.execute(
+                f"SELECT ContractId, ProcessInstanceId FROM Contracts WHERE ContractId IN ({', '.join('?' * len(chunk))})",
+                *chunk
+            )
+            found.update({uuid.UUID(str(row[0])): (row[0], row[1]) for row in cursor.fetchall()})
+
+        seen, rows, to_sync, spans = set(), [], [], []
+        for index, offer in enumerate(offers):
+            key = uuids[index]
+            if key is None:
+                continue
+            if key in seen:
+                results[index].update(status="error", detail="Duplicate contractId in request")
+                continue
+            seen.add(key)
+            if key not in found:
+                results[index].update(status="error", detail=f"Contract with ID {offer.contractId} not found")
+                continue
+            contract_id, instance_id = found[key]
+            rows.append(offer_params(offer) + (contract_id,))
+            to_sync.append((index, contract_id, instance_id, offer_modifications(offer)))
+            spans.append(span("provider-offer", "backend", started_at, process_instance_id=instance_id))
+            results[index]["status"] = "updated"
+
+        if rows:
+            # pyodbc ships the whole parameter array in one round-trip
+            cursor.fast_executemany = True
+            cursor.executemany(offer_update_sql(), rows)
+            if OUTBOX_ENABLED:
+                enqueue_many(cursor, [(c, i, m) for _, c, i, m in to_sync if m])
+            record_spans(cursor, spans)
+            conn.commit()
+    if rows:
+        invalidate_status_counts()
+    return results, to_sync
+
+@app.patch("/api/providers/contracts")
+async def update_provider_contracts(batch: BulkOffers, response: Response):
+    """
+    Bulk form of PATCH /api/providers/contracts/{id}: {"offers": [{"contractId": ..., "providersBudget": ...}]}.
+    All offers for known contracts are stored in one transaction; unknown or repeated ids
+    are reported per item and do not affect the others. Results keep the request order.
+    """
+    if not batch.offers:
+        raise HTTPException(status_code=400, detail="No offers")
+    if len(batch.offers) > BULK_OFFER_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_OFFER_MAX} offers per request")
+    try:
+        results, to_sync = await run_db(_save_offers, batch.offers, utcnow())
+        if to_sync:
+            pin_reads_to_primary(response)
+            change_feed.notify()
+
+        if OUTBOX_ENABLED:
+            outbox.notify()
+            for index, _, _, _ in to_sync:
+                results[index]["camundaSync"] = "queued"
+        else:
+            semaphore = asyncio.Semaphore(BULK_SYNC_CONCURRENCY)
+
+            async def push(index, contract_id, instance_id, modifications):
+                async with semaphore:
+                    try:
+                        ok = await sync_to_camunda(contract_id, instance_id, modifications)
+                    except Exception as camunda_err:
+                        print(f"Warning: Failed to sync {contract_id} with Camunda: {camunda_err}", file=sys.stderr)
+                        ok = False
+                results[index]["camundaSync"] = "synced" if ok else "failed"
+
+            await asyncio.gather(*(push(*item) for item in to_sync))
+
+        updated = sum(1 for r in results if r["status"] == "updated")
+        return {
+            "status": "success" if updated == len(results) else "partial" if updated else "failed",
+            "updated": updated,
+            "failed": len(results) - updated,
+            "results": results,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in PATCH /api/providers/contracts: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/admin/outbox")
+async def get_outbox_stats():
+    """
+    Camunda sync outbox metrics: pending rows, lag of the oldest pending row, dead letters and dispatcher counters.
+    """
+    return {"enabled": OUTBOX_ENABLED, **(await run_db(outbox.stats))}
+
+def _record_spans(spans: list):
+    with db_connection() as conn:
+        record_spans(conn.cursor(), spans)
+        conn.commit()
+
 @app.post("/start-process")
-def start_process(data: dict):
+async def start_process(data: dict, request: Request, response: Response):
     """
     Starts the Camunda process and passes initial variables.
+    The correlation ID (X-Correlation-ID header, or a new one) travels with the process
+    as the correlationId variable, so every stage's span can be tied back to this start.
     """
     # Note: contractId is NOT generated here, it's generated by the store-create-contract-worker
-    payload = {
-        "variables": {
-            "contractTitle": {"value": data.get("contractTitle"), "type": "String"},
-            "requestedBy": {"value": data.get("requestedBy"), "type": "String"},
-        }
+    correlation_id = request.headers.get("x-correlation-id") or new_correlation_id()
+    variables = {
+        "contractTitle": {"value": data.get("contractTitle"), "type": "String"},
+        "requestedBy": {"value": data.get("requestedBy"), "type": "String"},
+        CORRELATION_VARIABLE: {"value": correlation_id, "type": "String"},
     }
+    response.headers["X-Correlation-ID"] = correlation_id
     
+    started_at = utcnow()
     try:
-        print(f"Starting process in Camunda: {data.get('contractTitle')}")
-        res = requests.post(
-            f"{CAMUNDA_URL}/process-definition/key/contractTool/start",
-            json=payload,
-            timeout=10
-        )
-        res.raise_for_status()
-        return {"camunda_response": res.json()}
+        print(f"Starting process in Camunda: {data.get('contractTitle')} correlationId={correlation_id}")
+        result = await camunda.start_process(variables)
     except Exception as e:
         print(f"Failed to start Camunda process: {e}", file=sys.stderr)
-        return {"error": str(e)}
+        return {"error": str(e), "correlationId": correlation_id}
+
+    try:
+        await run_db(_record_spans, [span("start-process", "backend", started_at,
+                                          correlation_id=correlation_id, process_instance_id=result.get("id"))])
+    except Exception as e:
+        # The process is running; a missing span only leaves a gap in its trace
+        print(f"Warning: could not record start-process span: {e}", file=sys.stderr)
+    return {"camunda_response": result, "correlationId": correlation_id}
+
+class TraceSpan(BaseModel):
+    stage: str
+    component: str
+    startedAt: datetime
+    endedAt: datetime
+    correlationId: Optional[str] = None
+    processInstanceId: Optional[str] = None
+    taskId: Optional[str] = None
+    status: str = "ok"
+
+class TraceSpans(BaseModel):
+    spans: List[TraceSpan]
+
+@app.post("/api/admin/trace/spans")
+async def post_trace_spans(batch: TraceSpans):
+    """
+    Span sink for workers without database access (the email workers).
+    Timestamps are UTC; naive values are taken as UTC.
+    """
+    spans = [span(s.stage, s.component, naive_utc(s.startedAt), naive_utc(s.endedAt), s.correlationId,
+                  s.processInstanceId, s.taskId, s.status) for s in batch.spans]
+    await run_db(_record_spans, spans)
+    return {"status": "ok", "recorded": len(spans)}
+
+def _load_trace(contract_id: str):
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        # Archived contracts keep their trace until TRACE_RETENTION_DAYS
+        cursor.execute("SELECT ProcessInstanceId FROM ContractsAll WHERE ContractId = ?", contract_id)
+        row = cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail=f"Contract with ID {contract_id} not found")
+        return row[0], (load_spans(cursor, row[0]) if row[0] else [])
+
+@app.get("/api/admin/contracts/{contract_id}/trace")
+async def get_contract_trace(contract_id: str):
+    """
+    Stage-by-stage timeline of a contract (start, store and notify tasks, provider offer,
+    Camunda sync) with the queue/wait time before each stage and the work time of each.
+    """
+    try:
+        instance_id, rows = await run_db(_load_trace, contract_id)
+        return {"contractId": contract_id, "processInstanceId": instance_id, **build_timeline(rows)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in /api/admin/contracts/{{id}}/trace: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,13 +1,10 @@
 -- =========================================
--- Contract Tool - Azure SQL Tables
+-- Contract Tool - Azure SQL baseline
+-- Unified Contracts table (formerly docker/create_tables.sql, without the
+-- destructive DROP and the duplicated provider columns)
 -- =========================================
--- Unified Contracts Table
-IF OBJECT_ID('dbo.Contracts', 'U') IS NOT NULL DROP TABLE dbo.Contracts;
-GO -- Drop old tables if they exist (cleanup)
-  IF OBJECT_ID('dbo.CreatedContracts', 'U') IS NOT NULL DROP TABLE dbo.CreatedContracts;
-IF OBJECT_ID('dbo.ApprovedContracts', 'U') IS NOT NULL DROP TABLE dbo.ApprovedContracts;
-IF OBJECT_ID('dbo.RejectedContracts', 'U') IS NOT NULL DROP TABLE dbo.RejectedContracts;
-GO CREATE TABLE dbo.Contracts (
+IF OBJECT_ID('dbo.Contracts', 'U') IS NULL
+CREATE TABLE dbo.Contracts (
     Id INT IDENTITY(1, 1) PRIMARY KEY,
     ContractId UNIQUEIDENTIFIER NOT NULL,
     ProcessInstanceId NVARCHAR(64) NULL,
@@ -26,10 +23,7 @@ GO CREATE TABLE dbo.Contracts (
     ProvidersBudget INT NULL,
     ProvidersComment NVARCHAR(MAX) DEFAULT '',
     ProvidersName NVARCHAR(255) NULL,
-    -- Provider Fields
-    ProvidersBudget INT NULL,
-    ProvidersComment NVARCHAR(MAX) DEFAULT '',
-    ProvidersName NVARCHAR(255) NULL,
+    MeetRequirement NVARCHAR(50) NULL,
     -- Approval Fields
     SignedDate NVARCHAR(50) NULL,
     ApprovedAt DATETIME2 NULL,
@@ -38,14 +32,14 @@ GO CREATE TABLE dbo.Contracts (
     ApprovalDecision NVARCHAR(50) NULL,
     -- Meta
     ContractStatus NVARCHAR(50) DEFAULT 'Running',
-    -- Submitted, Approved, Rejected
+    -- Submitted, Running, Approved, Rejected
     CreatedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
-    -- New Fields (Store Contract)
+    -- Store Contract
     EmployeeName NVARCHAR(255) NULL,
     OfficeAddress NVARCHAR(255) NULL,
-    FinalPrice FLOAT NULL,
-    -- New Fields (Provider Offer)
-    MeetRequirement NVARCHAR(50) NULL
+    FinalPrice FLOAT NULL
   );
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_Contracts_ContractId' AND object_id = OBJECT_ID('dbo.Contracts'))
 CREATE UNIQUE INDEX UX_Contracts_ContractId ON dbo.Contracts(ContractId);
-GO
\ No newline at end of file
+GO
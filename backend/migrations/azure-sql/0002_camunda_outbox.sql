@@ -0,0 +1,21 @@
+-- =========================================
+-- Outbox for provider offer -> Camunda variable sync
+-- =========================================
+IF OBJECT_ID('dbo.CamundaOutbox', 'U') IS NULL
+CREATE TABLE dbo.CamundaOutbox (
+    Id BIGINT IDENTITY(1, 1) PRIMARY KEY,
+    ContractId NVARCHAR(64) NOT NULL,
+    ProcessInstanceId NVARCHAR(64) NULL,
+    -- JSON object of Camunda variable modifications
+    Variables NVARCHAR(MAX) NOT NULL,
+    CreatedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+    Attempts INT NOT NULL DEFAULT 0,
+    NextAttemptAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+    LastError NVARCHAR(MAX) NULL,
+    DispatchedAt DATETIME2 NULL
+  );
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_CamundaOutbox_Pending' AND object_id = OBJECT_ID('dbo.CamundaOutbox'))
+CREATE INDEX IX_CamundaOutbox_Pending ON dbo.CamundaOutbox(NextAttemptAt, ContractId)
+  INCLUDE (Attempts) WHERE DispatchedAt IS NULL;
+GO
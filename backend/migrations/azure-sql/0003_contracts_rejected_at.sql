@@ -0,0 +1,10 @@
+-- =========================================
+-- Rejection timestamp (sort key of GET /contracts/rejected)
+-- =========================================
+IF COL_LENGTH('dbo.Contracts', 'RejectedAt') IS NULL
+ALTER TABLE dbo.Contracts ADD RejectedAt DATETIME2 NULL;
+GO
+-- Rows rejected before the column existed: best known time is their creation
+UPDATE dbo.Contracts SET RejectedAt = CreatedAt
+WHERE ContractStatus = 'Rejected' AND RejectedAt IS NULL;
+GO
@@ -0,0 +1,24 @@
+-- =========================================
+-- Indexes for the status/time access paths
+--   GET /contracts/submitted, GET /api/providers/contracts : ContractStatus IN (...) ORDER BY CreatedAt DESC, Id DESC
+--   GET /contracts/approved : ContractStatus = 'Approved' ORDER BY ApprovedAt DESC, Id DESC
+--   GET /contracts/rejected : ContractStatus = 'Rejected' ORDER BY RejectedAt DESC, Id DESC
+--   /stats                   : GROUP BY ContractStatus
+-- Each index seeks on the status and reads rows in keyset order. The INCLUDE lists
+-- cover narrow ?fields= projections without a key lookup.
+-- =========================================
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Contracts_Status_CreatedAt' AND object_id = OBJECT_ID('dbo.Contracts'))
+CREATE INDEX IX_Contracts_Status_CreatedAt
+  ON dbo.Contracts(ContractStatus, CreatedAt DESC, Id DESC)
+  INCLUDE (ContractId, ContractTitle, ContractType, RequestType, Budget, ProvidersBudget, ProvidersName, MeetRequirement);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Contracts_Approved_ApprovedAt' AND object_id = OBJECT_ID('dbo.Contracts'))
+CREATE INDEX IX_Contracts_Approved_ApprovedAt
+  ON dbo.Contracts(ContractStatus, ApprovedAt DESC, Id DESC)
+  INCLUDE (ContractId, ContractTitle, ContractType, FinalPrice, ProvidersName);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Contracts_Rejected_RejectedAt' AND object_id = OBJECT_ID('dbo.Contracts'))
+CREATE INDEX IX_Contracts_Rejected_RejectedAt
+  ON dbo.Contracts(ContractStatus, RejectedAt DESC, Id DESC)
+  INCLUDE (ContractId, ContractTitle, ContractType, ProvidersName);
+GO
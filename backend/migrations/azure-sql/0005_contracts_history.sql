@@ -0,0 +1,68 @@
+-- =========================================
+-- Hot/cold split: closed contracts older than ARCHIVE_AFTER_DAYS are moved from
+-- dbo.Contracts into dbo.ContractsHistory by the archive job (backend/archive.py).
+-- Rows keep their Id, so keyset cursors stay valid across both tables.
+-- =========================================
+IF OBJECT_ID('dbo.ContractsHistory', 'U') IS NULL
+CREATE TABLE dbo.ContractsHistory (
+    Id INT NOT NULL PRIMARY KEY,
+    ContractId UNIQUEIDENTIFIER NOT NULL,
+    ProcessInstanceId NVARCHAR(64) NULL,
+    BusinessKey NVARCHAR(255) NULL,
+    ContractTitle NVARCHAR(255) NULL,
+    ContractType NVARCHAR(255) NULL,
+    Roles NVARCHAR(MAX) NULL,
+    Skills NVARCHAR(MAX) NULL,
+    RequestType NVARCHAR(255) NULL,
+    Budget FLOAT NULL,
+    ContractStartDate NVARCHAR(50) NULL,
+    ContractEndDate NVARCHAR(50) NULL,
+    Description NVARCHAR(MAX) NULL,
+    ProvidersBudget INT NULL,
+    ProvidersComment NVARCHAR(MAX) NULL,
+    ProvidersName NVARCHAR(255) NULL,
+    MeetRequirement NVARCHAR(50) NULL,
+    SignedDate NVARCHAR(50) NULL,
+    ApprovedAt DATETIME2 NULL,
+    LegalComment NVARCHAR(MAX) NULL,
+    ApprovalDecision NVARCHAR(50) NULL,
+    RejectedAt DATETIME2 NULL,
+    ContractStatus NVARCHAR(50) NULL,
+    CreatedAt DATETIME2 NOT NULL,
+    EmployeeName NVARCHAR(255) NULL,
+    OfficeAddress NVARCHAR(255) NULL,
+    FinalPrice FLOAT NULL,
+    ArchivedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+  );
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_ContractsHistory_ContractId' AND object_id = OBJECT_ID('dbo.ContractsHistory'))
+CREATE UNIQUE INDEX UX_ContractsHistory_ContractId ON dbo.ContractsHistory(ContractId);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ContractsHistory_Approved_ApprovedAt' AND object_id = OBJECT_ID('dbo.ContractsHistory'))
+CREATE INDEX IX_ContractsHistory_Approved_ApprovedAt
+  ON dbo.ContractsHistory(ContractStatus, ApprovedAt DESC, Id DESC)
+  INCLUDE (ContractId, ContractTitle, ContractType, FinalPrice, ProvidersName);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ContractsHistory_Rejected_RejectedAt' AND object_id = OBJECT_ID('dbo.ContractsHistory'))
+CREATE INDEX IX_ContractsHistory_Rejected_RejectedAt
+  ON dbo.ContractsHistory(ContractStatus, RejectedAt DESC, Id DESC)
+  INCLUDE (ContractId, ContractTitle, ContractType, ProvidersName);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ContractsHistory_CreatedAt' AND object_id = OBJECT_ID('dbo.ContractsHistory'))
+CREATE INDEX IX_ContractsHistory_CreatedAt ON dbo.ContractsHistory(CreatedAt);
+GO
+-- Read side: hot and cold rows as one relation. Status predicates are pushed into
+-- both branches, so each side still seeks its own status/time index.
+CREATE OR ALTER VIEW dbo.ContractsAll AS
+SELECT Id, ContractId, ProcessInstanceId, BusinessKey, ContractTitle, ContractType, Roles, Skills,
+       RequestType, Budget, ContractStartDate, ContractEndDate, Description, ProvidersBudget,
+       ProvidersComment, ProvidersName, MeetRequirement, SignedDate, ApprovedAt, LegalComment,
+       ApprovalDecision, RejectedAt, ContractStatus, CreatedAt, EmployeeName, OfficeAddress, FinalPrice
+FROM dbo.Contracts
+UNION ALL
+SELECT Id, ContractId, ProcessInstanceId, BusinessKey, ContractTitle, ContractType, Roles, Skills,
+       RequestType, Budget, ContractStartDate, ContractEndDate, Description, ProvidersBudget,
+       ProvidersComment, ProvidersName, MeetRequirement, SignedDate, ApprovedAt, LegalComment,
+       ApprovalDecision, RejectedAt, ContractStatus, CreatedAt, EmployeeName, OfficeAddress, FinalPrice
+FROM dbo.ContractsHistory;
+GO
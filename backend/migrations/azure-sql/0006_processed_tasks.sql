@@ -0,0 +1,24 @@
+-- =========================================
+-- Ledger of store tasks already written, keyed on process instance + activity.
+-- A redelivered task (lost complete call, expired lock, second replica) finds
+-- its entry and is completed again with the stored result instead of rewritten.
+-- =========================================
+IF OBJECT_ID('dbo.ProcessedTasks', 'U') IS NULL
+CREATE TABLE dbo.ProcessedTasks (
+    Id BIGINT IDENTITY(1, 1) PRIMARY KEY,
+    ProcessInstanceId NVARCHAR(64) NOT NULL,
+    ActivityId NVARCHAR(255) NOT NULL,
+    TaskId NVARCHAR(64) NOT NULL,
+    Topic NVARCHAR(255) NOT NULL,
+    -- JSON object of the variables the task was completed with
+    Result NVARCHAR(MAX) NOT NULL,
+    ProcessedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+  );
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_ProcessedTasks_Instance_Activity' AND object_id = OBJECT_ID('dbo.ProcessedTasks'))
+CREATE UNIQUE INDEX UX_ProcessedTasks_Instance_Activity ON dbo.ProcessedTasks(ProcessInstanceId, ActivityId)
+  INCLUDE (Result);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ProcessedTasks_ProcessedAt' AND object_id = OBJECT_ID('dbo.ProcessedTasks'))
+CREATE INDEX IX_ProcessedTasks_ProcessedAt ON dbo.ProcessedTasks(ProcessedAt);
+GO
@@ -0,0 +1,29 @@
+-- =========================================
+-- Pipeline spans: one row per stage a contract passes through (start-process,
+-- store/notify tasks, provider offer, Camunda sync), tied together by the
+-- correlationId process variable set at /start-process.
+-- =========================================
+IF OBJECT_ID('dbo.PipelineSpans', 'U') IS NULL
+CREATE TABLE dbo.PipelineSpans (
+    Id BIGINT IDENTITY(1, 1) PRIMARY KEY,
+    CorrelationId NVARCHAR(36) NULL,
+    ProcessInstanceId NVARCHAR(64) NULL,
+    Stage NVARCHAR(255) NOT NULL,
+    Component NVARCHAR(64) NOT NULL,
+    TaskId NVARCHAR(64) NULL,
+    StartedAt DATETIME2 NOT NULL,
+    EndedAt DATETIME2 NOT NULL,
+    -- ok | error
+    Status NVARCHAR(16) NOT NULL
+  );
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PipelineSpans_ProcessInstanceId' AND object_id = OBJECT_ID('dbo.PipelineSpans'))
+CREATE INDEX IX_PipelineSpans_ProcessInstanceId ON dbo.PipelineSpans(ProcessInstanceId)
+  INCLUDE (CorrelationId);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PipelineSpans_CorrelationId' AND object_id = OBJECT_ID('dbo.PipelineSpans'))
+CREATE INDEX IX_PipelineSpans_CorrelationId ON dbo.PipelineSpans(CorrelationId);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PipelineSpans_StartedAt' AND object_id = OBJECT_ID('dbo.PipelineSpans'))
+CREATE INDEX IX_PipelineSpans_StartedAt ON dbo.PipelineSpans(StartedAt);
+GO
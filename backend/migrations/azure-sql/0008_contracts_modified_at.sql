@@ -0,0 +1,14 @@
+-- =========================================
+-- Last modification time of a contract: every write to Contracts sets it.
+-- Drives the provider list's ETag and its since= change feed.
+-- =========================================
+IF COL_LENGTH('dbo.Contracts', 'ModifiedAt') IS NULL
+ALTER TABLE dbo.Contracts ADD ModifiedAt DATETIME2 NULL;
+GO
+-- Existing rows: their last known status change
+UPDATE dbo.Contracts SET ModifiedAt = COALESCE(RejectedAt, ApprovedAt, CreatedAt, SYSUTCDATETIME())
+WHERE ModifiedAt IS NULL;
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Contracts_ModifiedAt' AND object_id = OBJECT_ID('dbo.Contracts'))
+CREATE INDEX IX_Contracts_ModifiedAt ON dbo.Contracts(ModifiedAt, Id);
+GO
@@ -0,0 +1,13 @@
+-- =========================================
+-- Key the ProcessedTasks ledger on the external task id. Camunda keeps the id when
+-- it redelivers a task, but a store activity reached again through a BPMN loop
+-- (Store_Reject_DB -> PM_Draft_Contract -> Store_Initial_Draft) is a new external
+-- task, so process instance + activity is not unique.
+-- =========================================
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_ProcessedTasks_Instance_Activity' AND object_id = OBJECT_ID('dbo.ProcessedTasks'))
+DROP INDEX UX_ProcessedTasks_Instance_Activity ON dbo.ProcessedTasks;
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_ProcessedTasks_TaskId' AND object_id = OBJECT_ID('dbo.ProcessedTasks'))
+CREATE UNIQUE INDEX UX_ProcessedTasks_TaskId ON dbo.ProcessedTasks(TaskId)
+  INCLUDE (Result);
+GO
@@ -0,0 +1,11 @@
+-- =========================================
+-- Outbox claims: a dispatcher leases all pending rows of a contract (ClaimToken,
+-- ClaimedUntil) before pushing them, so two backend replicas never push the same
+-- contract concurrently and an older push cannot land after a newer one.
+-- =========================================
+IF COL_LENGTH('dbo.CamundaOutbox', 'ClaimToken') IS NULL
+ALTER TABLE dbo.CamundaOutbox ADD ClaimToken NVARCHAR(36) NULL, ClaimedUntil DATETIME2 NULL;
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_CamundaOutbox_ClaimToken' AND object_id = OBJECT_ID('dbo.CamundaOutbox'))
+CREATE INDEX IX_CamundaOutbox_ClaimToken ON dbo.CamundaOutbox(ClaimToken) WHERE ClaimToken IS NOT NULL;
+GO
@@ -0,0 +1,40 @@
+-- =========================================
+-- Contract Tool - PostgreSQL baseline (same schema as migrations/azure-sql)
+-- =========================================
+CREATE TABLE IF NOT EXISTS Contracts (
+    Id SERIAL PRIMARY KEY,
+    ContractId VARCHAR(36) NOT NULL,
+    ProcessInstanceId VARCHAR(64) NULL,
+    BusinessKey VARCHAR(255) NULL,
+    -- Common Data
+    ContractTitle VARCHAR(255) NULL,
+    ContractType VARCHAR(255) NULL,
+    Roles TEXT NULL,
+    Skills TEXT NULL,
+    RequestType VARCHAR(255) NULL,
+    Budget DOUBLE PRECISION NULL,
+    ContractStartDate VARCHAR(50) NULL,
+    ContractEndDate VARCHAR(50) NULL,
+    Description TEXT NULL,
+    -- Provider Fields
+    ProvidersBudget INT NULL,
+    ProvidersComment TEXT DEFAULT '',
+    ProvidersName VARCHAR(255) NULL,
+    MeetRequirement VARCHAR(50) NULL,
+    -- Approval Fields
+    SignedDate VARCHAR(50) NULL,
+    ApprovedAt TIMESTAMP NULL,
+    -- Rejection Fields
+    LegalComment TEXT NULL,
+    ApprovalDecision VARCHAR(50) NULL,
+    -- Meta
+    ContractStatus VARCHAR(50) DEFAULT 'Running',
+    CreatedAt TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    -- Store Contract
+    EmployeeName VARCHAR(255) NULL,
+    OfficeAddress VARCHAR(255) NULL,
+    FinalPrice DOUBLE PRECISION NULL
+);
+GO
+CREATE UNIQUE INDEX IF NOT EXISTS UX_Contracts_ContractId ON Contracts(ContractId);
+GO
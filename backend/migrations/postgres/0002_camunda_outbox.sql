@@ -0,0 +1,19 @@
+-- =========================================
+-- Outbox for provider offer -> Camunda variable sync
+-- =========================================
+CREATE TABLE IF NOT EXISTS CamundaOutbox (
+    Id BIGSERIAL PRIMARY KEY,
+    ContractId VARCHAR(64) NOT NULL,
+    ProcessInstanceId VARCHAR(64) NULL,
+    -- JSON object of Camunda variable modifications
+    Variables TEXT NOT NULL,
+    CreatedAt TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    Attempts INT NOT NULL DEFAULT 0,
+    NextAttemptAt TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    LastError TEXT NULL,
+    DispatchedAt TIMESTAMP NULL
+);
+GO
+CREATE INDEX IF NOT EXISTS IX_CamundaOutbox_Pending ON CamundaOutbox(NextAttemptAt, ContractId)
+  INCLUDE (Attempts) WHERE DispatchedAt IS NULL;
+GO
@@ -0,0 +1,24 @@
+-- =========================================
+-- Pipeline spans: one row per stage a contract passes through (start-process,
+-- store/notify tasks, provider offer, Camunda sync), tied together by the
+-- correlationId process variable set at /start-process.
+-- =========================================
+CREATE TABLE IF NOT EXISTS PipelineSpans (
+    Id BIGSERIAL PRIMARY KEY,
+    CorrelationId VARCHAR(36) NULL,
+    ProcessInstanceId VARCHAR(64) NULL,
+    Stage VARCHAR(255) NOT NULL,
+    Component VARCHAR(64) NOT NULL,
+    TaskId VARCHAR(64) NULL,
+    StartedAt TIMESTAMP NOT NULL,
+    EndedAt TIMESTAMP NOT NULL,
+    -- ok | error
+    Status VARCHAR(16) NOT NULL
+);
+GO
+CREATE INDEX IF NOT EXISTS IX_PipelineSpans_ProcessInstanceId ON PipelineSpans(ProcessInstanceId);
+GO
+CREATE INDEX IF NOT EXISTS IX_PipelineSpans_CorrelationId ON PipelineSpans(CorrelationId);
+GO
+CREATE INDEX IF NOT EXISTS IX_PipelineSpans_StartedAt ON PipelineSpans(StartedAt);
+GO
@@ -0,0 +1,11 @@
+-- =========================================
+-- Last modification time of a contract: every write to Contracts sets it.
+-- Drives the provider list's ETag and its since= change feed.
+-- =========================================
+ALTER TABLE Contracts ADD COLUMN IF NOT EXISTS ModifiedAt TIMESTAMP NULL;
+GO
+UPDATE Contracts SET ModifiedAt = COALESCE(RejectedAt, ApprovedAt, CreatedAt, now() AT TIME ZONE 'utc')
+WHERE ModifiedAt IS NULL;
+GO
+CREATE INDEX IF NOT EXISTS IX_Contracts_ModifiedAt ON Contracts(ModifiedAt, Id);
+GO
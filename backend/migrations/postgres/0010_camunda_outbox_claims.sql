@@ -0,0 +1,11 @@
+-- =========================================
+-- Outbox claims: a dispatcher leases all pending rows of a contract (ClaimToken,
+-- ClaimedUntil) before pushing them, so two backend replicas never push the same
+-- contract concurrently and an older push cannot land after a newer one.
+-- =========================================
+ALTER TABLE CamundaOutbox ADD COLUMN IF NOT EXISTS ClaimToken VARCHAR(36) NULL;
+GO
+ALTER TABLE CamundaOutbox ADD COLUMN IF NOT EXISTS ClaimedUntil TIMESTAMP NULL;
+GO
+CREATE INDEX IF NOT EXISTS IX_CamundaOutbox_ClaimToken ON CamundaOutbox(ClaimToken) WHERE ClaimToken IS NOT NULL;
+GO
@@ -0,0 +1,27 @@
+-- =========================================
+-- Keyset lists sort NULL ApprovedAt/RejectedAt last (ORDER BY ... DESC NULLS LAST, the
+-- SQL Server and SQLite default); rebuild the closed-list indexes in that order so
+-- Postgres keeps reading them in keyset order.
+-- =========================================
+DROP INDEX IF EXISTS IX_Contracts_Approved_ApprovedAt;
+GO
+CREATE INDEX IX_Contracts_Approved_ApprovedAt
+  ON Contracts(ContractStatus, ApprovedAt DESC NULLS LAST, Id DESC)
+  INCLUDE (ContractId, ContractTitle, ContractType, FinalPrice, ProvidersName);
+GO
+DROP INDEX IF EXISTS IX_Contracts_Rejected_RejectedAt;
+GO
+CREATE INDEX IX_Contracts_Rejected_RejectedAt
+  ON Contracts(ContractStatus, RejectedAt DESC NULLS LAST, Id DESC)
+  INCLUDE (ContractId, ContractTitle, ContractType, ProvidersName);
+GO
+DROP INDEX IF EXISTS IX_ContractsHistory_Approved_ApprovedAt;
+GO
+CREATE INDEX IX_ContractsHistory_Approved_ApprovedAt
+  ON ContractsHistory(ContractStatus, ApprovedAt DESC NULLS LAST, Id DESC);
+GO
+DROP INDEX IF EXISTS IX_ContractsHistory_Rejected_RejectedAt;
+GO
+CREATE INDEX IX_ContractsHistory_Rejected_RejectedAt
+  ON ContractsHistory(ContractStatus, RejectedAt DESC NULLS LAST, Id DESC);
+GO
@@ -0,0 +1,18 @@
+-- =========================================
+-- Outbox for provider offer -> Camunda variable sync
+-- =========================================
+CREATE TABLE IF NOT EXISTS CamundaOutbox (
+    Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ContractId VARCHAR(64) NOT NULL,
+    ProcessInstanceId VARCHAR(64) NULL,
+    -- JSON object of Camunda variable modifications
+    Variables TEXT NOT NULL,
+    CreatedAt TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    Attempts INT NOT NULL DEFAULT 0,
+    NextAttemptAt TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    LastError TEXT NULL,
+    DispatchedAt TIMESTAMP NULL
+);
+GO
+CREATE INDEX IF NOT EXISTS IX_CamundaOutbox_Pending ON CamundaOutbox(NextAttemptAt, ContractId) WHERE DispatchedAt IS NULL;
+GO
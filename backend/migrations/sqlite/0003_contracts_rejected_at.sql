@@ -0,0 +1,8 @@
+-- =========================================
+-- Rejection timestamp (sort key of GET /contracts/rejected)
+-- =========================================
+ALTER TABLE Contracts ADD COLUMN RejectedAt TIMESTAMP NULL;
+GO
+UPDATE Contracts SET RejectedAt = CreatedAt
+WHERE ContractStatus = 'Rejected' AND RejectedAt IS NULL;
+GO
@@ -0,0 +1,12 @@
+-- =========================================
+-- Indexes for the status/time access paths (see migrations/azure-sql/0004)
+-- =========================================
+CREATE INDEX IF NOT EXISTS IX_Contracts_Status_CreatedAt
+  ON Contracts(ContractStatus, CreatedAt DESC, Id DESC);
+GO
+CREATE INDEX IF NOT EXISTS IX_Contracts_Approved_ApprovedAt
+  ON Contracts(ContractStatus, ApprovedAt DESC, Id DESC);
+GO
+CREATE INDEX IF NOT EXISTS IX_Contracts_Rejected_RejectedAt
+  ON Contracts(ContractStatus, RejectedAt DESC, Id DESC);
+GO
@@ -0,0 +1,59 @@
+-- =========================================
+-- Hot/cold split (see migrations/azure-sql/0005)
+-- =========================================
+CREATE TABLE IF NOT EXISTS ContractsHistory (
+    Id INT NOT NULL PRIMARY KEY,
+    ContractId VARCHAR(36) NOT NULL,
+    ProcessInstanceId VARCHAR(64) NULL,
+    BusinessKey VARCHAR(255) NULL,
+    ContractTitle VARCHAR(255) NULL,
+    ContractType VARCHAR(255) NULL,
+    Roles TEXT NULL,
+    Skills TEXT NULL,
+    RequestType VARCHAR(255) NULL,
+    Budget REAL NULL,
+    ContractStartDate VARCHAR(50) NULL,
+    ContractEndDate VARCHAR(50) NULL,
+    Description TEXT NULL,
+    ProvidersBudget INT NULL,
+    ProvidersComment TEXT NULL,
+    ProvidersName VARCHAR(255) NULL,
+    MeetRequirement VARCHAR(50) NULL,
+    SignedDate VARCHAR(50) NULL,
+    ApprovedAt TIMESTAMP NULL,
+    LegalComment TEXT NULL,
+    ApprovalDecision VARCHAR(50) NULL,
+    RejectedAt TIMESTAMP NULL,
+    ContractStatus VARCHAR(50) NULL,
+    CreatedAt TIMESTAMP NOT NULL,
+    EmployeeName VARCHAR(255) NULL,
+    OfficeAddress VARCHAR(255) NULL,
+    FinalPrice REAL NULL,
+    ArchivedAt TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+GO
+CREATE UNIQUE INDEX IF NOT EXISTS UX_ContractsHistory_ContractId ON ContractsHistory(ContractId);
+GO
+CREATE INDEX IF NOT EXISTS IX_ContractsHistory_Approved_ApprovedAt
+  ON ContractsHistory(ContractStatus, ApprovedAt DESC, Id DESC);
+GO
+CREATE INDEX IF NOT EXISTS IX_ContractsHistory_Rejected_RejectedAt
+  ON ContractsHistory(ContractStatus, RejectedAt DESC, Id DESC);
+GO
+CREATE INDEX IF NOT EXISTS IX_ContractsHistory_CreatedAt ON ContractsHistory(CreatedAt);
+GO
+DROP VIEW IF EXISTS ContractsAll;
+GO
+CREATE VIEW ContractsAll AS
+SELECT Id, ContractId, ProcessInstanceId, BusinessKey, ContractTitle, ContractType, Roles, Skills,
+       RequestType, Budget, ContractStartDate, ContractEndDate, Description, ProvidersBudget,
+       ProvidersComment, ProvidersName, MeetRequirement, SignedDate, ApprovedAt, LegalComment,
+       ApprovalDecision, RejectedAt, ContractStatus, CreatedAt, EmployeeName, OfficeAddress, FinalPrice
+FROM Contracts
+UNION ALL
+SELECT Id, ContractId, ProcessInstanceId, BusinessKey, ContractTitle, ContractType, Roles, Skills,
+       RequestType, Budget, ContractStartDate, ContractEndDate, Description, ProvidersBudget,
+       ProvidersComment, ProvidersName, MeetRequirement, SignedDate, ApprovedAt, LegalComment,
+       ApprovalDecision, RejectedAt, ContractStatus, CreatedAt, EmployeeName, OfficeAddress, FinalPrice
+FROM ContractsHistory;
+GO
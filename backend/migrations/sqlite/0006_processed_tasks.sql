@@ -0,0 +1,20 @@
+-- =========================================
+-- Ledger of store tasks already written, keyed on process instance + activity.
+-- A redelivered task (lost complete call, expired lock, second replica) finds
+-- its entry and is completed again with the stored result instead of rewritten.
+-- =========================================
+CREATE TABLE IF NOT EXISTS ProcessedTasks (
+    Id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ProcessInstanceId VARCHAR(64) NOT NULL,
+    ActivityId VARCHAR(255) NOT NULL,
+    TaskId VARCHAR(64) NOT NULL,
+    Topic VARCHAR(255) NOT NULL,
+    -- JSON object of the variables the task was completed with
+    Result TEXT NOT NULL,
+    ProcessedAt TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+GO
+CREATE UNIQUE INDEX IF NOT EXISTS UX_ProcessedTasks_Instance_Activity ON ProcessedTasks(ProcessInstanceId, ActivityId);
+GO
+CREATE INDEX IF NOT EXISTS IX_ProcessedTasks_ProcessedAt ON ProcessedTasks(ProcessedAt);
+GO
@@ -0,0 +1,10 @@
+-- =========================================
+-- Key the ProcessedTasks ledger on the external task id. Camunda keeps the id when
+-- it redelivers a task, but a store activity reached again through a BPMN loop
+-- (Store_Reject_DB -> PM_Draft_Contract -> Store_Initial_Draft) is a new external
+-- task, so process instance + activity is not unique.
+-- =========================================
+DROP INDEX IF EXISTS UX_ProcessedTasks_Instance_Activity;
+GO
+CREATE UNIQUE INDEX IF NOT EXISTS UX_ProcessedTasks_TaskId ON ProcessedTasks(TaskId);
+GO
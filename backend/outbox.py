@@ -0,0 +1,278 @@
+import asyncio
+import json
+import sys
+import time
+import uuid
+
+from db import db_connection, run_db
+from storage import get_storage
+from camunda import sync_to_camunda
+from tracing import record_spans, span, utcnow
+
+
+CLAIM_LOCK = "camunda-outbox-claim"
+ENQUEUE_SQL = "INSERT INTO CamundaOutbox (ContractId, ProcessInstanceId, Variables) VALUES (?, ?, ?)"
+
+
+def enqueue(cursor, contract_id: str, instance_id, modifications: dict):
+    """
+    Adds a pending Camunda variable update. Must run on the caller's cursor, before its
+    commit, so the contract update and its outbox row are committed together.
+    """
+    cursor.execute(ENQUEUE_SQL, contract_id, instance_id, json.dumps(modifications))
+
+
+def enqueue_many(cursor, updates: list):
+    """enqueue() for [(contract_id, instance_id, modifications)] in one executemany."""
+    if updates:
+        cursor.executemany(ENQUEUE_SQL, [(c, i, json.dumps(m)) for c, i, m in updates])
+
+
+def outbox_depth(cursor, max_attempts: int) -> dict:
+    storage = get_storage()
+    cursor.execute(
+        f"""
+        SELECT COUNT(*), MIN(CreatedAt), {storage.now},
+               SUM(CASE WHEN Attempts >= ? THEN 1 ELSE 0 END)
+        FROM CamundaOutbox
+        WHERE DispatchedAt IS NULL
+        """,
+        max_attempts
+    )
+    pending, oldest, now, dead = cursor.fetchone()
+    # Lag is measured against the database clock, not this host's
+    oldest, now = storage.to_datetime(oldest), storage.to_datetime(now)
+    return {
+        "pending": pending or 0,
+        "lagSeconds": (now - oldest).total_seconds() if oldest else 0.0,
+        "deadLettered": dead or 0,
+    }
+
+
+class OutboxDispatcher:
+    """
+    Background task on the app's event loop that drains dbo.CamundaOutbox.
+
+    All pending rows of a contract are merged in insertion order (later values win)
+    and sent as one POST /variables; contracts of one batch are pushed concurrently.
+    Failed pushes are retried with exponential backoff; after max_attempts a row
+    stays in the table as dead-lettered.
+
+    Every backend replica runs a dispatcher. Before pushing, a dispatcher claims all
+    pending rows of a contract with its own token and a lease of lease_seconds, and
+    only sends the rows it claimed. Claims are serialized by a storage lock, and a
+    contract with a live lease is not claimed again, so one contract is never pushed
+    by two dispatchers at once. A later row is therefore never overtaken by an
+    earlier one. The lease must outlast a push (a few CAMUNDA_TIMEOUT_SEC); a
+    dispatcher whose lease ran out no longer owns its rows and leaves them alone.
+    """
+
+    def __init__(self, batch_size=50, poll_interval=1.0, max_attempts=10, base_backoff=2.0,
+                 max_backoff=300.0, retention_hours=24, lease_seconds=120):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.retention_hours = retention_hours
+        self.lease_seconds = lease_seconds
+
+        self._wake = None
+        self._task = None
+        self._stopping = False
+        self._dispatched_rows = 0
+        self._pushes = 0
+        self._failures = 0
+        self._last_purge = 0.0
+
+    def start(self):
+        """Must be called from the running event loop (app lifespan)."""
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=10.0):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+
+    def notify(self):
+        """Wake the dispatcher right after a commit instead of waiting for the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def counters(self):
+        """In-memory dispatcher counters (no query)."""
+        return {
+            "dispatchedRows": self._dispatched_rows,
+            "pushes": self._pushes,
+            # rows saved by merging several updates of one contract into one push
+            "coalescedRows": self._dispatched_rows - self._pushes,
+            "failures": self._failures,
+        }
+
+    def stats(self):
+        """Blocking (queries the outbox); call through run_db."""
+        counters = self.counters()
+        try:
+            with db_connection() as conn:
+                counters.update(outbox_depth(conn.cursor(), self.max_attempts))
+        except Exception as e:
+            counters["error"] = str(e)
+        return counters
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                drained = await self.dispatch_once()
+            except Exception as e:
+                print(f"[Outbox] dispatch error: {e}", file=sys.stderr)
+                drained = 0
+            # Keep going while there is a backlog, otherwise wait for a commit or the poll tick
+            if drained < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+    def _claim(self):
+        """
+        Leases every pending row of up to batch_size due contracts that no other
+        dispatcher holds a live lease on; returns (token, claimed rows).
+        """
+        storage = get_storage()
+        due = storage.top(
+            self.batch_size,
+            f"""ContractId
+                      FROM CamundaOutbox
+                      WHERE DispatchedAt IS NULL AND Attempts < ? AND NextAttemptAt <= {storage.now}
+                        AND ContractId NOT IN (
+                            SELECT ContractId FROM CamundaOutbox
+                            WHERE DispatchedAt IS NULL AND ClaimedUntil > {storage.now}
+                        )
+                      GROUP BY ContractId
+                      ORDER BY MIN(Id)"""
+        )
+        token = str(uuid.uuid4())
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            storage.app_lock(cursor, CLAIM_LOCK)
+            try:
+                cursor.execute(
+                    f"""
+                    UPDATE CamundaOutbox
+                    SET ClaimToken = ?, ClaimedUntil = {storage.seconds_from_now()}
+                    WHERE DispatchedAt IS NULL AND Attempts < ?
+                      AND ContractId IN (
+                          {due}
+                      )
+                    """,
+                    token, self.lease_seconds, self.max_attempts, self.max_attempts
+                )
+                cursor.execute(
+                    "SELECT Id, ContractId, ProcessInstanceId, Variables, Attempts "
+                    "FROM CamundaOutbox WHERE ClaimToken = ? AND DispatchedAt IS NULL ORDER BY Id",
+                    token
+                )
+                rows = cursor.fetchall()
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                storage.app_unlock(cursor, CLAIM_LOCK)
+                conn.commit()
+        return token, rows
+
+    async def dispatch_once(self) -> int:
+        """Sends one batch of contracts; returns the number of contracts handled."""
+        token, rows = await run_db(self._claim)
+        by_contract = {}
+        for row_id, contract_id, instance_id, variables, attempts in rows:
+            entry = by_contract.setdefault(contract_id, {"contractId": contract_id, "ids": [], "instance": None,
+                                                         "vars": {}, "attempts": 0, "token": token})
+            entry["ids"].append(row_id)
+            entry["instance"] = instance_id or entry["instance"]
+            entry["vars"].update(json.loads(variables))
+            entry["attempts"] = max(entry["attempts"], attempts)
+
+        await asyncio.gather(*(self._send(contract_id, entry) for contract_id, entry in by_contract.items()))
+
+        await run_db(self._purge)
+        return len(by_contract)
+
+    async def _send(self, contract_id: str, entry: dict):
+        error = None
+        entry["startedAt"] = utcnow()
+        try:
+            ok = await sync_to_camunda(contract_id, entry["instance"], entry["vars"])
+            if not ok:
+                error = "No process instance accepted the variables"
+        except Exception as e:
+            error = str(e) or repr(e)
+        await run_db(self._finish, entry, error)
+        # Counters are only touched on the event loop
+        if error is None:
+            self._dispatched_rows += len(entry["ids"])
+            self._pushes += 1
+        else:
+            self._failures += 1
+
+    def _finish(self, entry: dict, error):
+        ids = entry["ids"]
+        placeholders = ", ".join("?" * len(ids))
+        storage = get_storage()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            # Only while the claim is still ours: after the lease ran out another
+            # dispatcher may own (and have pushed) these rows
+            if error is None:
+                cursor.execute(
+                    f"""
+                    UPDATE CamundaOutbox
+                    SET DispatchedAt = {storage.now}, ClaimToken = NULL, ClaimedUntil = NULL
+                    WHERE Id IN ({placeholders}) AND ClaimToken = ?
+                    """,
+                    *ids, entry["token"]
+                )
+                owned = cursor.rowcount
+                record_spans(cursor, [span("camunda-sync", "backend", entry["startedAt"],
+                                           process_instance_id=entry["instance"])])
+            else:
+                backoff = min(self.max_backoff, self.base_backoff * (2 ** entry["attempts"]))
+                cursor.execute(
+                    f"""
+                    UPDATE CamundaOutbox
+                    SET Attempts = Attempts + 1,
+                        NextAttemptAt = {storage.seconds_from_now()},
+                        LastError = ?,
+                        ClaimToken = NULL, ClaimedUntil = NULL
+                    WHERE Id IN ({placeholders}) AND ClaimToken = ?
+                    """,
+                    int(backoff), error[:4000], *ids, entry["token"]
+                )
+                owned = cursor.rowcount
+            conn.commit()
+
+        if owned < len(ids):
+            print(f"[Outbox] lease expired for {len(ids) - owned} row(s) of contract {entry['contractId']}; "
+                  f"raise OUTBOX_LEASE_SEC above the push time", file=sys.stderr)
+        if error is not None:
+            print(f"[Outbox] push failed (attempt {entry['attempts'] + 1}/{self.max_attempts}): {error}", file=sys.stderr)
+
+    def _purge(self):
+        now = time.monotonic()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        storage = get_storage()
+        expired = storage.top(1000, f"Id FROM CamundaOutbox WHERE DispatchedAt < {storage.seconds_from_now()}")
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"DELETE FROM CamundaOutbox WHERE Id IN ({expired})", -self.retention_hours * 3600)
+            conn.commit()
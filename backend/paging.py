@@ -0,0 +1,99 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+from storage import get_storage
+
+
+def encode_cursor(sort_value, row_id) -> str:
+    """Opaque cursor over (sort timestamp or None, Id) of the last row on a page."""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return (None if sort_value is None else datetime.fromisoformat(sort_value)), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: str, allowed: list, default: list) -> list:
+    """
+    Maps a comma-separated `fields=` value onto known column names (case-insensitive).
+    Only whitelisted columns ever reach the SQL text.
+    """
+    if not fields:
+        return list(default)
+    by_lower = {c.lower(): c for c in allowed}
+    selected = []
+    for name in fields.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        column = by_lower.get(name.lower())
+        if column is None:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {name}")
+        if column not in selected:
+            selected.append(column)
+    return selected or list(default)
+
+
+def keyset_query(columns: list, where_sql: str, sort_column: str, limit: int, after: str = None,
+                 table: str = "Contracts"):
+    """
+    Builds the keyset SELECT; returns (sql, params, selected columns). Rows whose sort
+    column is NULL (e.g. an approved contract without ApprovedAt) come last on every
+    backend, ordered by Id, and a cursor on such a row continues among them.
+    """
+    storage = get_storage()
+    select = list(columns)
+    for key in (sort_column, "Id"):
+        if key not in select:
+            select.append(key)
+
+    params = []
+    where = where_sql
+    if after:
+        sort_value, row_id = decode_cursor(after)
+        if sort_value is None:
+            where += f" AND {sort_column} IS NULL AND Id < ?"
+            params += [row_id]
+        else:
+            where += f" AND ({sort_column} < ? OR ({sort_column} = ? AND Id < ?) OR {sort_column} IS NULL)"
+            params += [sort_value, sort_value, row_id]
+
+    sql = storage.top(
+        limit + 1,
+        f"{', '.join(select)} FROM {table} WHERE {where} ORDER BY {sort_column} DESC{storage.nulls_last}, Id DESC"
+    )
+    return sql, params, select
+
+
+def keyset_page(cursor, columns: list, where_sql: str, sort_column: str, limit: int, after: str = None,
+                table: str = "Contracts"):
+    """
+    Runs one keyset page (newest first) and returns (rows as dicts, next cursor or None).
+    The sort column and Id are always fetched for the cursor but only returned if requested.
+    """
+    sql, params, select = keyset_query(columns, where_sql, sort_column, limit, after, table)
+    cursor.execute(sql, *params)
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[select.index(sort_column)], last[select.index("Id")])
+
+    results = []
+    for row in rows:
+        item = dict(zip(select, row))
+        results.append({c: item[c] for c in columns})
+    return results, next_cursor
@@ -0,0 +1,155 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of reusable DB-API connections.
+
+    Connections are handed out LIFO so a small hot set stays warm, pinged on
+    checkout once they have been idle for `ping_after` seconds, and closed once
+    older than `max_lifetime` or idle for longer than `max_idle`.
+    """
+
+    def __init__(self, connect, max_size=10, max_lifetime=1800.0, max_idle=300.0,
+                 ping_after=30.0, timeout=30.0, health_query="SELECT 1"):
+        self._connect = connect
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self.timeout = timeout
+        self.health_query = health_query
+
+        self._cond = threading.Condition()
+        self._idle = []      # [(conn, created_at, last_used)]
+        self._size = 0       # open connections, idle + checked out
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+        self._waits = 0
+        self._timeouts = 0
+
+    def _expired(self, created_at, last_used, now):
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return True
+        if self.max_idle and now - last_used > self.max_idle:
+            return True
+        return False
+
+    def _healthy(self, conn):
+        try:
+            cur = conn.cursor()
+            cur.execute(self.health_query)
+            cur.fetchall()
+            cur.close()
+            return True
+        except Exception:
+            return False
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _drop(self, conn):
+        self._close(conn)
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def acquire(self):
+        """Returns (conn, created_at). Blocks up to `timeout` when the pool is exhausted."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        conn, created_at, last_used = self._idle.pop()
+                        if self._expired(created_at, last_used, now):
+                            self._close(conn)
+                            self._size -= 1
+                            self._discarded += 1
+                            continue
+                        entry = (conn, created_at, last_used)
+                        break
+                    if entry or self._size < self.max_size:
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No connection available within {self.timeout}s (max_size={self.max_size})")
+                    self._waits += 1
+                    self._cond.wait(remaining)
+                if entry is None:
+                    self._size += 1
+
+            if entry is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+                return conn, time.monotonic()
+
+            conn, created_at, last_used = entry
+            if self.ping_after is not None and time.monotonic() - last_used >= self.ping_after:
+                if not self._healthy(conn):
+                    self._drop(conn)
+                    continue
+            with self._cond:
+                self._reused += 1
+            return conn, created_at
+
+    def release(self, conn, created_at):
+        # Never hand out a connection with an open transaction
+        try:
+            conn.rollback()
+        except Exception:
+            self._drop(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn, created_at = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn, created_at)
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "maxSize": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "inUse": self._size - len(self._idle),
+                "created": self._created,
+                "reused": self._reused,
+                "discarded": self._discarded,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+            }
@@ -0,0 +1,85 @@
+import os
+import re
+import sys
+
+from db import db_connection
+from storage import Storage, get_storage
+
+# One subdirectory of scripts per storage backend (migrations/azure-sql, migrations/postgres, ...)
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+LOCK_RESOURCE = "contract-tool-migrations"
+
+# Scripts are named NNNN_description.sql and split into batches on GO lines, like sqlcmd does
+_FILE_RE = re.compile(r"^(\d+)_(.+)\.sql$")
+_GO_RE = re.compile(r"^\s*GO\s*(?:--.*)?$", re.IGNORECASE | re.MULTILINE)
+
+
+def load_migrations(directory: str) -> list:
+    """Returns [(version, name, [batch, ...])] sorted by version."""
+    migrations = []
+    for filename in os.listdir(directory):
+        m = _FILE_RE.match(filename)
+        if not m:
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            batches = [b.strip() for b in _GO_RE.split(f.read()) if b.strip()]
+        migrations.append((int(m.group(1)), m.group(2), batches))
+    migrations.sort()
+    versions = [v for v, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration version in {directory}")
+    return migrations
+
+
+def apply_migrations(conn, storage: Storage = None, directory: str = None) -> list:
+    """
+    Applies every migration of the storage backend not yet recorded in SchemaVersions,
+    each in its own transaction together with its version row. A backend lock
+    serializes concurrent backend replicas starting at the same time. Returns applied versions.
+    """
+    storage = storage or get_storage()
+    directory = directory or os.path.join(MIGRATIONS_DIR, storage.name)
+    cursor = conn.cursor()
+    cursor.execute(storage.create_versions_table)
+    conn.commit()
+
+    storage.app_lock(cursor, LOCK_RESOURCE)
+    applied = []
+    try:
+        cursor.execute("SELECT Version FROM SchemaVersions")
+        done = {row[0] for row in cursor.fetchall()}
+
+        for version, name, batches in load_migrations(directory):
+            if version in done:
+                continue
+            print(f"[migrations] applying {storage.name}/{version:04d}_{name}", flush=True)
+            try:
+                for batch in batches:
+                    cursor.execute(batch)
+                cursor.execute(
+                    f"INSERT INTO SchemaVersions (Version, Name, AppliedAt) VALUES (?, ?, {storage.now})",
+                    version, name
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(version)
+    finally:
+        storage.app_unlock(cursor, LOCK_RESOURCE)
+        conn.commit()
+    return applied
+
+
+def migrate():
+    """Startup entry point: migrates on a pooled connection and logs instead of raising."""
+    try:
+        with db_connection() as conn:
+            applied = apply_migrations(conn)
+        print(f"[migrations] schema up to date ({len(applied)} applied)", flush=True)
+    except Exception as e:
+        print(f"[migrations] FAILED: {e}", file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    migrate()
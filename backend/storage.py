@@ -0,0 +1,439 @@
+"""
+Storage backends for the Contracts data, shared by the backend and the store worker.
+
+STORAGE_BACKEND selects the implementation:
+    azure-sql  Azure SQL / SQL Server through pyodbc (default, AZURE_SQL_* env vars)
+    postgres   PostgreSQL through psycopg2 (STORAGE_PG_DSN, or the DB_* env vars of the
+               Camunda database so contracts can live next to the engine)
+    sqlite     a local file (STORAGE_SQLITE_PATH), for offline runs and benchmarks
+
+Every backend hands out DB-API connections with pyodbc call conventions:
+`?` placeholders and `cursor.execute(sql, *params)`. Queries are written once in
+portable SQL and use the few dialect fragments below for the rest (current UTC
+time, row limits, relative timestamps, joined bulk updates, moving rows).
+Each backend has its own migrations directory, backend/migrations/<name>/.
+"""
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+
+
+class _Cursor:
+    """pyodbc-style facade over a DB-API cursor with a different call convention."""
+
+    def __init__(self, storage, cursor):
+        self._storage = storage
+        self._cursor = cursor
+        self.fast_executemany = False  # pyodbc-only knob, accepted and ignored
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = tuple(params[0])
+        self._cursor.execute(self._storage.translate(sql), tuple(params))
+        return self
+
+    def executemany(self, sql, rows):
+        self._storage.executemany(self._cursor, self._storage.translate(sql), [tuple(r) for r in rows])
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class _Connection:
+    def __init__(self, storage, conn):
+        self._storage = storage
+        self._conn = conn
+
+    def cursor(self):
+        return _Cursor(self._storage, self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+class Storage:
+    name = None
+    # Current UTC time as a SQL expression
+    now = None
+    # Appended to "ORDER BY col DESC" so NULLs sort last, as SQL Server and SQLite do by default
+    nulls_last = ""
+    # Migrations bookkeeping table, created before the lock is taken
+    create_versions_table = """
+        CREATE TABLE IF NOT EXISTS SchemaVersions (
+            Version INT NOT NULL PRIMARY KEY,
+            Name VARCHAR(255) NOT NULL,
+            AppliedAt TIMESTAMP NOT NULL
+        )
+    """
+
+    def connect(self):
+        raise NotImplementedError
+
+    def has_replica(self) -> bool:
+        """True when a separate read-only target is configured."""
+        return False
+
+    def connect_replica(self):
+        raise NotImplementedError
+
+    @property
+    def errors(self) -> tuple:
+        """Driver exception types, used to tell database failures from application errors."""
+        return ()
+
+    def is_connection_error(self, error: Exception) -> bool:
+        """
+        True when `error` means the server or the link to it failed (connect, ping,
+        communication), as opposed to an error in the statement itself.
+        """
+        return False
+
+    def translate(self, sql: str) -> str:
+        return sql
+
+    def executemany(self, cursor, sql, rows):
+        cursor.executemany(sql, rows)
+
+    def streaming_cursor(self, conn):
+        """
+        Cursor for reading a large result with fetchmany without the driver buffering
+        all of it. pyodbc and sqlite3 already fetch rows from the server as asked.
+        """
+        return conn.cursor()
+
+    def top(self, n: int, body: str) -> str:
+        """SELECT of at most n rows; body is everything after SELECT."""
+        return f"SELECT {body} LIMIT {int(n)}"
+
+    def seconds_from_now(self) -> str:
+        """Timestamp expression `now + ?` seconds (negative for the past); takes one int parameter."""
+        raise NotImplementedError
+
+    def typed_param(self, sql_type: str) -> str:
+        return "?"
+
+    def bulk_update(self, table: str, key: str, columns: list, set_sql: str, nrows: int,
+                    returning: list) -> str:
+        """
+        UPDATE `table` joined on `key` to nrows parameter rows of `columns`
+        ([(name, type)], key first), returning `returning` for every updated row.
+        `set_sql` refers to the parameter columns as v.<name>.
+        """
+        row = ", ".join(f"{self.typed_param(t)} AS {c}" for c, t in columns)
+        rows = " UNION ALL ".join([f"SELECT {row}"] + [
+            "SELECT " + ", ".join(self.typed_param(t) for _, t in columns)
+        ] * (nrows - 1))
+        return (
+            f"UPDATE {table} SET {set_sql} FROM ({rows}) AS v "
+            f"WHERE {table}.{key} = v.{key} RETURNING {', '.join(f'{table}.{c}' for c in returning)}"
+        )
+
+    def move_rows(self, cursor, source: str, target: str, columns: list, where_sql: str,
+                  params: list, limit: int) -> int:
+        """Moves up to `limit` rows matching where_sql from source to target; the caller commits."""
+        raise NotImplementedError
+
+    def app_lock(self, cursor, resource: str):
+        """
+        Exclusive lock on `resource` across processes, held by the connection until
+        app_unlock() (schema migrations, outbox claims). SQLite serializes writers anyway.
+        """
+        pass
+
+    def app_unlock(self, cursor, resource: str):
+        pass
+
+    @staticmethod
+    def to_datetime(value):
+        """Timestamps computed in SQL come back as strings from SQLite."""
+        if value is None or isinstance(value, datetime):
+            return value
+        return datetime.fromisoformat(str(value))
+
+
+class AzureSqlStorage(Storage):
+    name = "azure-sql"
+    now = "SYSUTCDATETIME()"
+    create_versions_table = """
+        IF OBJECT_ID('dbo.SchemaVersions', 'U') IS NULL
+        CREATE TABLE dbo.SchemaVersions (
+            Version INT NOT NULL PRIMARY KEY,
+            Name NVARCHAR(255) NOT NULL,
+            AppliedAt DATETIME2 NOT NULL
+        )
+    """
+
+    def connect(self):
+        return self._connect(os.getenv("AZURE_SQL_SERVER"), read_only=False)
+
+    def has_replica(self) -> bool:
+        return bool(os.getenv("AZURE_SQL_READ_SERVER")) or os.getenv("AZURE_SQL_READ_INTENT", "false").lower() == "true"
+
+    def connect_replica(self):
+        # Same server with ApplicationIntent=ReadOnly reaches the read scale-out secondary;
+        # AZURE_SQL_READ_SERVER points at a separate (e.g. geo) replica instead
+        return self._connect(os.getenv("AZURE_SQL_READ_SERVER") or os.getenv("AZURE_SQL_SERVER"), read_only=True)
+
+    @property
+    def errors(self) -> tuple:
+        import pyodbc
+        return (pyodbc.Error,)
+
+    def is_connection_error(self, error):
+        import pyodbc
+        if isinstance(error, pyodbc.InterfaceError):
+            return True
+        # SQLSTATE class 08 (connection exception) and the driver's login/query timeouts
+        state = str(error.args[0]) if isinstance(error, pyodbc.Error) and error.args else ""
+        return state.startswith("08") or state in ("HYT00", "HYT01")
+
+    def _connect(self, server, read_only: bool):
+        import pyodbc
+
+        database = os.getenv("AZURE_SQL_DATABASE")
+        user = os.getenv("AZURE_SQL_USER")
+        password = os.getenv("AZURE_SQL_PASSWORD")
+
+        if not all([server, database, user, password]):
+            raise ValueError("Missing AZURE_SQL credentials")
+
+        conn_str = (
+            "Driver={ODBC Driver 18 for SQL Server};"
+            f"Server=tcp:{server},1433;"
+            f"Database={database};"
+            f"Uid={user};"
+            f"Pwd={password};"
+            "Encrypt=yes;"
+            "TrustServerCertificate=no;"
+            "Connection Timeout=30;"
+        )
+        if read_only:
+            conn_str += "ApplicationIntent=ReadOnly;"
+        return pyodbc.connect(conn_str)
+
+    def top(self, n: int, body: str) -> str:
+        return f"SELECT TOP ({int(n)}) {body}"
+
+    def seconds_from_now(self) -> str:
+        return "DATEADD(second, ?, SYSUTCDATETIME())"
+
+    def bulk_update(self, table, key, columns, set_sql, nrows, returning):
+        # T-SQL: join to a VALUES table and report rows with OUTPUT
+        values = ", ".join(["(" + ", ".join("?" * len(columns)) + ")"] * nrows)
+        return (
+            f"UPDATE t SET {set_sql} "
+            f"OUTPUT {', '.join(f'inserted.{c}' for c in returning)} "
+            f"FROM {table} t JOIN (VALUES {values}) AS v ({', '.join(c for c, _ in columns)}) "
+            f"ON t.{key} = v.{key}"
+        )
+
+    def move_rows(self, cursor, source, target, columns, where_sql, params, limit):
+        # One statement, so a row is always in exactly one table even with concurrent movers
+        cols = ", ".join(columns)
+        cursor.execute(
+            f"DELETE TOP ({int(limit)}) FROM {source} "
+            f"OUTPUT {', '.join(f'DELETED.{c}' for c in columns)} INTO {target} ({cols}) "
+            f"WHERE {where_sql}",
+            *params
+        )
+        return cursor.rowcount
+
+    def app_lock(self, cursor, resource):
+        cursor.execute(
+            "EXEC sp_getapplock @Resource = ?, @LockMode = 'Exclusive', @LockOwner = 'Session', @LockTimeout = 120000",
+            resource
+        )
+
+    def app_unlock(self, cursor, resource):
+        cursor.execute("EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'", resource)
+
+
+class PostgresStorage(Storage):
+    name = "postgres"
+    now = "(now() AT TIME ZONE 'utc')"
+    nulls_last = " NULLS LAST"
+
+    def connect(self):
+        import psycopg2
+
+        dsn = os.getenv("STORAGE_PG_DSN")
+        if dsn:
+            return _Connection(self, psycopg2.connect(dsn))
+        return _Connection(self, psycopg2.connect(
+            database=os.getenv("DB_NAME", "camunda"),
+            user=os.getenv("DB_USER", "camunda"),
+            password=os.getenv("DB_PASSWORD", "camunda"),
+            host=os.getenv("DB_HOST", "postgres"),
+            port=os.getenv("DB_PORT", "5432"),
+        ))
+
+    def has_replica(self) -> bool:
+        return bool(os.getenv("STORAGE_PG_READ_DSN"))
+
+    def connect_replica(self):
+        import psycopg2
+        conn = psycopg2.connect(os.getenv("STORAGE_PG_READ_DSN"))
+        conn.set_session(readonly=True)
+        return _Connection(self, conn)
+
+    @property
+    def errors(self) -> tuple:
+        import psycopg2
+        return (psycopg2.Error,)
+
+    def is_connection_error(self, error):
+        import psycopg2
+        if isinstance(error, psycopg2.InterfaceError):
+            return True
+        if isinstance(error, psycopg2.OperationalError):
+            # No SQLSTATE: the client lost the connection; 08: connection exception;
+            # 57P: server shutting down or restarting. Other codes (e.g. 57014, a
+            # statement timeout) are errors of the query.
+            code = error.pgcode or ""
+            return not code or code.startswith("08") or code.startswith("57P")
+        return False
+
+    def translate(self, sql: str) -> str:
+        # psycopg2 uses %s placeholders; none of our statements has a literal '?'
+        return sql.replace("%", "%%").replace("?", "%s")
+
+    def executemany(self, cursor, sql, rows):
+        from psycopg2.extras import execute_batch
+        execute_batch(cursor, sql, rows, page_size=500)
+
+    def streaming_cursor(self, conn):
+        # A plain psycopg2 cursor pulls the whole result into client memory on execute;
+        # a named one is a server-side cursor read fetchmany by fetchmany. It lives in
+        # the connection's transaction, which the pool rolls back on release.
+        return _Cursor(self, conn._conn.cursor(name=f"stream_{uuid.uuid4().hex}"))
+
+    def seconds_from_now(self) -> str:
+        return "((now() AT TIME ZONE 'utc') + ? * INTERVAL '1 second')"
+
+    def typed_param(self, sql_type: str) -> str:
+        # Untyped parameters in a derived table would all resolve to text
+        return f"CAST(? AS {sql_type})"
+
+    def move_rows(self, cursor, source, target, columns, where_sql, params, limit):
+        cols = ", ".join(columns)
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {source}
+                WHERE Id IN (SELECT Id FROM {source} WHERE {where_sql} LIMIT {int(limit)} FOR UPDATE SKIP LOCKED)
+                RETURNING {cols}
+            )
+            INSERT INTO {target} ({cols}) SELECT {cols} FROM moved
+            """,
+            *params
+        )
+        return cursor.rowcount
+
+    def app_lock(self, cursor, resource):
+        cursor.execute("SELECT pg_advisory_lock(hashtext(?))", resource)
+
+    def app_unlock(self, cursor, resource):
+        cursor.execute("SELECT pg_advisory_unlock(hashtext(?))", resource)
+
+
+# SQLite keeps timestamps as text. Bound datetimes and SQL-side defaults use the same
+# millisecond format, so comparisons and keyset cursors agree in both directions.
+SQLITE_TIMESTAMP = "%Y-%m-%d %H:%M:%f"
+
+sqlite3.register_adapter(datetime, lambda d: d.strftime("%Y-%m-%d %H:%M:%S.") + f"{d.microsecond // 1000:03d}")
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+
+
+class SqliteStorage(Storage):
+    name = "sqlite"
+    now = f"strftime('{SQLITE_TIMESTAMP}', 'now')"
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("STORAGE_SQLITE_PATH", "contracts.db")
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return _Connection(self, conn)
+
+    def has_replica(self) -> bool:
+        return bool(os.getenv("STORAGE_SQLITE_READ_PATH"))
+
+    def connect_replica(self):
+        path = os.path.abspath(os.getenv("STORAGE_SQLITE_READ_PATH"))
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30,
+                               detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        return _Connection(self, conn)
+
+    @property
+    def errors(self) -> tuple:
+        return (sqlite3.Error,)
+
+    def seconds_from_now(self) -> str:
+        return f"strftime('{SQLITE_TIMESTAMP}', 'now', ? || ' seconds')"
+
+    def move_rows(self, cursor, source, target, columns, where_sql, params, limit):
+        # SQLite serializes writers, so copy + delete inside the caller's transaction is atomic
+        cols = ", ".join(columns)
+        cursor.execute(f"SELECT Id FROM {source} WHERE {where_sql} LIMIT {int(limit)}", *params)
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return 0
+        placeholders = ", ".join("?" * len(ids))
+        cursor.execute(f"INSERT INTO {target} ({cols}) SELECT {cols} FROM {source} WHERE Id IN ({placeholders})", *ids)
+        cursor.execute(f"DELETE FROM {source} WHERE Id IN ({placeholders})", *ids)
+        return len(ids)
+
+
+STORAGE_BACKENDS = {
+    "azure-sql": AzureSqlStorage,
+    "postgres": PostgresStorage,
+    "sqlite": SqliteStorage,
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    """Process-wide storage backend chosen by STORAGE_BACKEND."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                name = os.getenv("STORAGE_BACKEND", "azure-sql").lower()
+                if name not in STORAGE_BACKENDS:
+                    raise ValueError(f"Unknown STORAGE_BACKEND '{name}' (expected one of {', '.join(STORAGE_BACKENDS)})")
+                _storage = STORAGE_BACKENDS[name]()
+    return _storage
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Naive UTC, like the timestamps every backend stores; naive input is taken as UTC."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
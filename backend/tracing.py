@@ -0,0 +1,206 @@
+"""
+Pipeline tracing: one timed span per stage a contract passes through, tied together
+by the correlation ID that /start-process puts on the process instance.
+
+Spans are rows of PipelineSpans. The backend and the store worker insert them on the
+cursor of the transaction that did the work, so a span exists exactly when the work
+was committed. The email worker has no database access and posts its spans to the
+backend (POST /api/admin/trace/spans) in batches through SpanSink.
+
+Shared by the backend and the workers; the worker image copies this file next to the
+worker scripts.
+"""
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from storage import get_storage
+
+# Process variable carrying the correlation ID from /start-process to every task
+CORRELATION_VARIABLE = "correlationId"
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_RETENTION_DAYS = int(os.getenv("TRACE_RETENTION_DAYS", "90"))
+
+SPAN_COLUMNS = ["CorrelationId", "ProcessInstanceId", "Stage", "Component", "TaskId",
+                "StartedAt", "EndedAt", "Status"]
+
+
+def utcnow() -> datetime:
+    """Naive UTC, like the timestamps the storage backends write."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def new_correlation_id() -> str:
+    return str(uuid.uuid4())
+
+
+def span(stage: str, component: str, started_at: datetime, ended_at: datetime = None,
+         correlation_id: str = None, process_instance_id: str = None, task_id: str = None,
+         status: str = "ok") -> dict:
+    return {
+        "correlationId": correlation_id,
+        "processInstanceId": process_instance_id,
+        "stage": stage,
+        "component": component,
+        "taskId": task_id,
+        "startedAt": started_at,
+        "endedAt": ended_at or utcnow(),
+        "status": status,
+    }
+
+
+def record_spans(cursor, spans: list):
+    """Inserts spans on the caller's cursor; the caller commits."""
+    if not TRACING_ENABLED or not spans:
+        return
+    cursor.executemany(
+        f"INSERT INTO PipelineSpans ({', '.join(SPAN_COLUMNS)}) VALUES ({', '.join('?' * len(SPAN_COLUMNS))})",
+        [(s["correlationId"], s["processInstanceId"], s["stage"], s["component"], s["taskId"],
+          s["startedAt"], s["endedAt"], s["status"]) for s in spans]
+    )
+
+
+def purge_spans(cursor, batch_size: int = 1000) -> int:
+    """Deletes up to batch_size spans older than TRACE_RETENTION_DAYS; the caller commits."""
+    storage = get_storage()
+    expired = storage.top(batch_size, f"Id FROM PipelineSpans WHERE StartedAt < {storage.seconds_from_now()}")
+    cursor.execute(f"DELETE FROM PipelineSpans WHERE Id IN ({expired})", -TRACE_RETENTION_DAYS * 86400)
+    return cursor.rowcount
+
+
+def load_spans(cursor, process_instance_id: str) -> list:
+    """
+    Spans of a process instance plus every span sharing one of its correlation IDs
+    (a contract restarted in a new instance keeps its trace), oldest first.
+    """
+    cursor.execute(
+        f"""
+        SELECT {', '.join(SPAN_COLUMNS)}
+        FROM PipelineSpans
+        WHERE ProcessInstanceId = ?
+           OR CorrelationId IN (
+               SELECT CorrelationId FROM PipelineSpans
+               WHERE ProcessInstanceId = ? AND CorrelationId IS NOT NULL
+           )
+        ORDER BY StartedAt, Id
+        """,
+        process_instance_id, process_instance_id
+    )
+    return [dict(zip(SPAN_COLUMNS, row)) for row in cursor.fetchall()]
+
+
+def _ms(delta) -> float:
+    return round(delta.total_seconds() * 1000.0, 1)
+
+
+def build_timeline(rows: list) -> dict:
+    """
+    Stage-by-stage timeline of PipelineSpans rows (oldest first). `waitMs` of a stage
+    is the gap since the previous stage finished: queue time for worker stages, the
+    time people took for user tasks (e.g. the provider offer). `workMs` is the span itself.
+    """
+    to_datetime = get_storage().to_datetime
+    stages, by_stage = [], {}
+    first_start = last_end = None
+    wait_total = work_total = 0.0
+    for row in rows:
+        started, ended = to_datetime(row["StartedAt"]), to_datetime(row["EndedAt"])
+        wait_ms = max(0.0, _ms(started - last_end)) if last_end else 0.0
+        work_ms = max(0.0, _ms(ended - started))
+        first_start = first_start or started
+        last_end = max(last_end, ended) if last_end else ended
+        wait_total += wait_ms
+        work_total += work_ms
+
+        stages.append({
+            "stage": row["Stage"],
+            "component": row["Component"],
+            "status": row["Status"],
+            "taskId": row["TaskId"],
+            "processInstanceId": row["ProcessInstanceId"],
+            "startedAt": started.isoformat() + "Z",
+            "endedAt": ended.isoformat() + "Z",
+            "waitMs": wait_ms,
+            "workMs": work_ms,
+        })
+        entry = by_stage.setdefault(row["Stage"], {"count": 0, "waitMs": 0.0, "workMs": 0.0})
+        entry["count"] += 1
+        entry["waitMs"] = round(entry["waitMs"] + wait_ms, 1)
+        entry["workMs"] = round(entry["workMs"] + work_ms, 1)
+
+    longest_wait = max(stages, key=lambda s: s["waitMs"], default=None)
+    return {
+        "correlationIds": sorted({r["CorrelationId"] for r in rows if r["CorrelationId"]}),
+        "stages": stages,
+        "summary": {
+            "spans": len(stages),
+            "totalMs": _ms(last_end - first_start) if stages else 0.0,
+            "waitMs": round(wait_total, 1),
+            "workMs": round(work_total, 1),
+            "longestWait": {"stage": longest_wait["stage"], "waitMs": longest_wait["waitMs"]}
+            if longest_wait and longest_wait["waitMs"] else None,
+            "byStage": by_stage,
+        },
+    }
+
+
+class SpanSink:
+    """
+    Buffers spans and posts them to the backend every `interval` seconds from a daemon
+    thread, for processes without a database connection. Best effort: a batch that
+    cannot be delivered is dropped after logging, so tracing never holds up a task.
+    """
+
+    def __init__(self, backend_url: str, interval: float = 2.0, max_buffer: int = 10000, log_prefix: str = "[trace]"):
+        self.url = f"{backend_url.rstrip('/')}/api/admin/trace/spans"
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self.log_prefix = log_prefix
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._dropped = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, item: dict):
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self._dropped += 1
+                return
+            self._buffer.append(item)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="span-sink", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 10)
+
+    def flush(self, session=None):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        import requests
+        payload = {"spans": [{**s, "startedAt": s["startedAt"].isoformat(), "endedAt": s["endedAt"].isoformat()}
+                             for s in batch]}
+        try:
+            (session or requests).post(self.url, json=payload, timeout=10).raise_for_status()
+        except Exception as e:
+            with self._lock:
+                self._dropped += len(batch)
+            print(f"{self.log_prefix} could not deliver {len(batch)} span(s): {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"buffered": len(self._buffer), "dropped": self._dropped}
+
+    def _run(self):
+        import requests
+        session = requests.Session()
+        while not self._stop.wait(self.interval):
+            self.flush(session)
+        self.flush(session)
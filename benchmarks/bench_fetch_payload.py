@@ -0,0 +1,123 @@
+"""
+fetchAndLock payload size per store topic with and without the variables filter.
+
+Builds the variable scope a process instance has when it reaches each store task
+(draft form, offer review, legal review, plus the HTML email body older process
+definitions keep as a variable), serializes tasks the way the engine returns them
+and applies the engine's filter semantics to them. It then checks that every
+topic handler builds the same row from the filtered task as from the full one,
+i.e. that the declared variables are all a handler reads.
+
+    python benchmarks/bench_fetch_payload.py --description-kb 8 --tasks 5
+
+Exits 1 if a filtered payload is not smaller or a handler's row changes.
+"""
+import argparse
+import json
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker"))
+
+from store_worker import TOPIC_HANDLERS
+
+EMAIL_BODY = """
+<div style="font-family: Arial, sans-serif; color: #333;">
+  <h2 style="color: #2c3e50;">New Requirement Notification</h2>
+  <p>Dear Provider Manager,</p>
+  <p>I have new contract requirements that need your attention. Please check your system to provide an offer.</p>
+  <div style="background: #f8f9fa; padding: 15px; border-radius: 5px; border-left: 5px solid #3498db;">
+    <strong>Contract ID:</strong> ${contractId}<br>
+    <strong>Title:</strong> ${contractTitle}
+  </div>
+  <p>Best Regards,<br>Procurement Team</p>
+</div>
+"""
+
+
+def typed(value):
+    kind = {bool: "Boolean", int: "Integer", float: "Double"}.get(type(value), "String")
+    return {"type": kind, "value": value, "valueInfo": {}}
+
+
+def process_scope(description_kb: int) -> dict:
+    values = {
+        "initiator": "demo",
+        "contractId": str(uuid.uuid4()),
+        "contractTitle": "Cloud platform operations",
+        "contractType": "Service",
+        "roles": "DevOps Engineer, SRE",
+        "skills": "Kubernetes, Terraform, Azure",
+        "requestType": "Team",
+        "budget": "120000",
+        "contractStartDate": "2026-01-01",
+        "contractEndDate": "2026-12-31",
+        "description": ("Detailed requirements. " * 64 * description_kb)[:description_kb * 1024],
+        "toEmail": "provider@local.com",
+        "subject": "Action Required: New Contract Requirements Available",
+        "body": EMAIL_BODY,
+        "providersName": "Acme Consulting",
+        "providersBudget": 110000.0,
+        "providersComment": "We can staff the team within two weeks. " * 10,
+        "meetRequirement": True,
+        "legalcomment": "Standard terms accepted.",
+        "approvaldecision": "approve",
+        "signeddate": "2026-01-15",
+        "employeeName": "J. Doe",
+        "officeAddress": "Main Street 1, Berlin",
+        "finalPrice": 115000.0,
+    }
+    return {name: typed(v) for name, v in values.items()}
+
+
+def make_task(topic: str, scope: dict) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "topicName": topic,
+        "workerId": "bench",
+        "processInstanceId": str(uuid.uuid4()),
+        "businessKey": None,
+        "variables": scope,
+    }
+
+
+def filtered(task: dict, names) -> dict:
+    # The engine returns the requested variables that exist and silently skips the rest
+    return {**task, "variables": {n: task["variables"][n] for n in names if n in task["variables"]}}
+
+
+def size(tasks: list) -> int:
+    return len(json.dumps(tasks, separators=(",", ":")))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--description-kb", type=int, default=4)
+    ap.add_argument("--tasks", type=int, default=5, help="tasks per fetchAndLock response")
+    args = ap.parse_args()
+
+    scope = process_scope(args.description_kb)
+    results, ok = {}, True
+    for topic, handler in TOPIC_HANDLERS.items():
+        build, names = handler.build, handler.variables
+        full = [make_task(topic, scope) for _ in range(args.tasks)]
+        slim = [filtered(t, names) for t in full]
+
+        same_rows = all(build(f)[1] == build(s)[1] for f, s in zip(full, slim))
+        full_bytes, slim_bytes = size(full), size(slim)
+        ok &= same_rows and slim_bytes < full_bytes
+        results[topic] = {
+            "variables": len(names),
+            "fullBytes": full_bytes,
+            "filteredBytes": slim_bytes,
+            "reductionPct": round(100 * (1 - slim_bytes / full_bytes), 1),
+            "sameRows": same_rows,
+        }
+
+    print(json.dumps({"descriptionKb": args.description_kb, "tasks": args.tasks, "topics": results}, indent=2))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Offline benchmark suite: backend and store worker against local stand-ins.
+
+Starts benchmarks/fake_camunda.py and the backend (uvicorn) on free local ports, with the
+SQLite storage backend standing in for Azure SQL, seeds contracts and matching process
+instances, then runs the scripted scenarios:
+
+    providers     concurrent GET /api/providers/contracts
+    patch-sync    concurrent PATCH /api/providers/contracts/{id}, then the time until the
+                  outbox has pushed every offer to Camunda
+    stats         concurrent GET /stats polling
+    worker-drain  N store-create-contract tasks queued in Camunda, drained by a store worker
+
+Every scenario reports throughput and p50/p95/p99 latency. The combined result is printed
+as JSON (and written to --out), so runs of different revisions can be compared.
+
+    python benchmarks/bench_offline.py --contracts 2000 --concurrency 50 --duration 10 --tasks 500
+    python benchmarks/bench_offline.py --scenarios providers,stats --camunda-latency-ms 5 --out bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from load_providers import summarize
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+BACKEND_DIR = os.path.join(ROOT, "backend")
+WORKER = os.path.join(ROOT, "docker", "store_worker.py")
+
+SCENARIOS = ["providers", "patch-sync", "stats", "worker-drain"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_http(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def stop(proc: subprocess.Popen):
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def seed_contracts(camunda_url: str, count: int):
+    """Submitted contracts, each with a live process instance in the fake engine."""
+    sys.path.insert(0, BACKEND_DIR)
+    from storage import get_storage
+
+    instance_ids = httpx.post(f"{camunda_url}/_bench/instances", json={"count": count}, timeout=60).json()
+    storage = get_storage()
+    conn = storage.connect()
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO Contracts (ContractId, ProcessInstanceId, ContractTitle, ContractType, Budget, "
+        f"Description, ContractStatus, CreatedAt, ModifiedAt) "
+        f"VALUES (?, ?, ?, 'Service', ?, ?, 'Submitted', {storage.now}, {storage.now})",
+        [(str(uuid.uuid4()), instance_id, f"Bench contract {i}", random.randint(1000, 100000),
+          "Benchmark contract " * 20) for i, instance_id in enumerate(instance_ids)]
+    )
+    conn.commit()
+    conn.close()
+
+
+async def closed_loop(url: str, concurrency: int, duration: float, request) -> dict:
+    """`concurrency` clients each issuing `request(client)` back to back for `duration` seconds."""
+    latencies, errors = [], [0]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60.0, limits=limits) as client:
+        started = time.monotonic()
+        deadline = started + duration
+
+        async def loop():
+            while time.monotonic() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    ok = (await request(client)).status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+                errors[0] += 0 if ok else 1
+
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return summarize(latencies, errors[0], elapsed)
+
+
+async def scenario_providers(ctx) -> dict:
+    return await closed_loop(ctx.backend_url, ctx.args.concurrency, ctx.args.duration, lambda c: c.get(
+        "/api/providers/contracts", params={"limit": ctx.args.page_size, "fields": "ContractId,ContractTitle"}
+    ))
+
+
+async def scenario_stats(ctx) -> dict:
+    return await closed_loop(ctx.backend_url, ctx.args.concurrency, ctx.args.duration, lambda c: c.get("/stats"))
+
+
+async def scenario_patch_sync(ctx) -> dict:
+    before = httpx.get(f"{ctx.camunda_url}/_bench/state").json()["variableUpdates"]
+    result = await closed_loop(ctx.backend_url, ctx.args.concurrency, ctx.args.duration, lambda c: c.patch(
+        f"/api/providers/contracts/{random.choice(ctx.contract_ids)}",
+        json={"providersBudget": random.randint(1000, 9000), "providersName": "Bench GmbH",
+              "providersComment": "offline benchmark", "meetRequirement": "yes"},
+    ))
+
+    # Time for the outbox to push every stored offer to the engine
+    t0 = time.monotonic()
+    outbox = {}
+    while time.monotonic() - t0 < 120:
+        outbox = httpx.get(f"{ctx.backend_url}/api/admin/outbox", timeout=10).json()
+        if not outbox.get("enabled") or outbox.get("pending", 0) == 0:
+            break
+        await asyncio.sleep(0.1)
+    result["syncDrainSec"] = round(time.monotonic() - t0, 2)
+    result["syncPending"] = outbox.get("pending")
+    result["camundaVariableUpdates"] = httpx.get(f"{ctx.camunda_url}/_bench/state").json()["variableUpdates"] - before
+    return result
+
+
+async def scenario_worker_drain(ctx) -> dict:
+    args = ctx.args
+    httpx.post(f"{ctx.camunda_url}/_bench/reset")
+    instance_ids = httpx.post(f"{ctx.camunda_url}/_bench/instances", json={"count": args.tasks}, timeout=60).json()
+    httpx.post(f"{ctx.camunda_url}/_bench/tasks", timeout=60, json={"tasks": [{
+        "topic": "store-create-contract", "processInstanceId": instance_id, "activityId": "Store_Initial_Draft",
+        "variables": {
+            "contractTitle": {"type": "String", "value": f"Drained contract {i}"},
+            "budget": {"type": "String", "value": str(random.randint(1000, 100000))},
+            "description": {"type": "String", "value": "Queued by the offline benchmark " * 20},
+        },
+    } for i, instance_id in enumerate(instance_ids)]})
+
+    env = {
+        **ctx.env,
+        "ENGINE_REST": f"{ctx.camunda_url}/engine-rest",
+        "STORE_TOPICS": "store-create-contract",
+        "WORKER_ID": "bench-store-worker",
+        "MAX_TASKS": str(args.worker_max_tasks),
+        "WORKER_CONCURRENCY": str(args.worker_concurrency),
+        "ASYNC_RESPONSE_TIMEOUT_MS": "5000",
+        "BACKEND_URL": ctx.backend_url,
+        "METRICS_PORT": str(free_port()),
+    }
+    started = time.monotonic()
+    worker = subprocess.Popen([sys.executable, "-u", WORKER], env=env, stdout=ctx.log, stderr=subprocess.STDOUT)
+    try:
+        state = {}
+        while time.monotonic() - started < args.drain_timeout:
+            state = httpx.get(f"{ctx.camunda_url}/_bench/state", timeout=10).json()
+            if state["completed"] + state["failed"] >= args.tasks or worker.poll() is not None:
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.monotonic() - started
+    finally:
+        stop(worker)
+
+    # Queue-to-complete latency per task, as seen by the engine
+    result = summarize(state.get("completedLatencyMs", []), state.get("failed", 0), elapsed)
+    result.update({
+        "tasks": args.tasks,
+        "completed": state.get("completed", 0),
+        "drainSec": round(elapsed, 2),
+        "tasksPerSec": round(state.get("completed", 0) / elapsed, 1) if elapsed else None,
+        "fetches": state.get("fetches"),
+    })
+    return result
+
+
+RUNNERS = {
+    "providers": scenario_providers,
+    "patch-sync": scenario_patch_sync,
+    "stats": scenario_stats,
+    "worker-drain": scenario_worker_drain,
+}
+
+
+class Context:
+    pass
+
+
+async def run(args, ctx) -> dict:
+    results = {}
+    for name in args.scenarios:
+        print(f"[bench] running {name}...", file=sys.stderr, flush=True)
+        results[name] = await RUNNERS[name](ctx)
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {SCENARIOS}")
+    ap.add_argument("--contracts", type=int, default=2000, help="seeded Submitted contracts")
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds per HTTP scenario")
+    ap.add_argument("--page-size", type=int, default=50)
+    ap.add_argument("--tasks", type=int, default=500, help="store tasks queued for worker-drain")
+    ap.add_argument("--worker-max-tasks", type=int, default=20)
+    ap.add_argument("--worker-concurrency", type=int, default=4)
+    ap.add_argument("--drain-timeout", type=float, default=300.0)
+    ap.add_argument("--camunda-latency-ms", type=float, default=0.0, help="added to every fake engine call")
+    ap.add_argument("--log", default=None, help="file for backend/worker output (default: discarded)")
+    ap.add_argument("--out", default=None, help="also write the JSON result here")
+    args = ap.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in args.scenarios if s not in RUNNERS]
+    if unknown:
+        ap.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    ctx = Context()
+    ctx.args = args
+    ctx.log = open(args.log, "a") if args.log else subprocess.DEVNULL
+    workdir = tempfile.mkdtemp(prefix="bench-offline-")
+    camunda_port, backend_port = free_port(), free_port()
+    ctx.camunda_url = f"http://127.0.0.1:{camunda_port}"
+    ctx.backend_url = f"http://127.0.0.1:{backend_port}"
+    ctx.env = {
+        **os.environ,
+        "STORAGE_BACKEND": "sqlite",
+        "STORAGE_SQLITE_PATH": os.path.join(workdir, "contracts.db"),
+        "CAMUNDA_URL": f"{ctx.camunda_url}/engine-rest",
+        "ARCHIVE_ENABLED": "false",
+        "PYTHONUNBUFFERED": "1",
+    }
+    os.environ.update({k: ctx.env[k] for k in ("STORAGE_BACKEND", "STORAGE_SQLITE_PATH")})
+
+    procs = []
+    try:
+        procs.append(subprocess.Popen(
+            [sys.executable, os.path.join(BENCH_DIR, "fake_camunda.py"), "--port", str(camunda_port),
+             "--latency-ms", str(args.camunda_latency_ms)],
+            stdout=ctx.log, stderr=subprocess.STDOUT
+        ))
+        wait_http(f"{ctx.camunda_url}/_bench/state")
+        # The backend applies the migrations on startup
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(backend_port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=ctx.env, stdout=ctx.log, stderr=subprocess.STDOUT
+        ))
+        wait_http(f"{ctx.backend_url}/")
+
+        seed_contracts(ctx.camunda_url, args.contracts)
+        ctx.contract_ids = [c["ContractId"] for c in httpx.get(
+            f"{ctx.backend_url}/api/providers/contracts", params={"limit": 1000, "fields": "ContractId"}, timeout=60
+        ).json()]
+
+        results = asyncio.run(run(args, ctx))
+    finally:
+        for proc in reversed(procs):
+            stop(proc)
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("log", "out")},
+        "storage": "sqlite",
+        "scenarios": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
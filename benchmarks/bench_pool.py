@@ -0,0 +1,126 @@
+"""
+Per-request latency of the /stats query with and without the connection pool.
+
+Runs against a local SQLite stand-in for Azure SQL. Opening a real Azure SQL
+connection costs a TCP + TLS + login handshake, which SQLite does not have, so
+every new connection sleeps CONNECT_LATENCY_MS to stand in for it.
+
+    python benchmarks/bench_pool.py --requests 500 --concurrency 8 --connect-latency-ms 40
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from pool import ConnectionPool
+
+STATS_QUERY = "SELECT ContractStatus, COUNT(*) FROM Contracts GROUP BY ContractStatus"
+
+
+def make_db(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE Contracts (
+            Id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ContractId TEXT NOT NULL UNIQUE,
+            ContractTitle TEXT,
+            ContractStatus TEXT,
+            CreatedAt TEXT
+        )
+        """
+    )
+    statuses = ["Submitted", "Running", "Approved", "Rejected"]
+    conn.executemany(
+        "INSERT INTO Contracts (ContractId, ContractTitle, ContractStatus, CreatedAt) VALUES (?, ?, ?, datetime('now'))",
+        [(str(uuid.uuid4()), f"Contract {i}", statuses[i % 4]) for i in range(rows)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def make_connect(path: str, latency_ms: float):
+    def connect():
+        time.sleep(latency_ms / 1000.0)
+        return sqlite3.connect(path, check_same_thread=False)
+    return connect
+
+
+def run(handler, requests: int, concurrency: int):
+    latencies = []
+    lock = threading.Lock()
+
+    def one(_):
+        t0 = time.perf_counter()
+        handler()
+        dt = (time.perf_counter() - t0) * 1000.0
+        with lock:
+            latencies.append(dt)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        list(ex.map(one, range(requests)))
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": requests,
+        "throughputRps": round(requests / elapsed, 1),
+        "meanMs": round(statistics.mean(latencies), 3),
+        "p50Ms": round(q[49], 3),
+        "p95Ms": round(q[94], 3),
+        "p99Ms": round(q[98], 3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=500)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--pool-size", type=int, default=10)
+    ap.add_argument("--connect-latency-ms", type=float, default=float(os.getenv("CONNECT_LATENCY_MS", "40")))
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "contracts.db")
+        make_db(path, args.rows)
+        connect = make_connect(path, args.connect_latency_ms)
+
+        def unpooled():
+            conn = connect()
+            try:
+                conn.execute(STATS_QUERY).fetchall()
+            finally:
+                conn.close()
+
+        pool = ConnectionPool(connect, max_size=args.pool_size)
+
+        def pooled():
+            with pool.connection() as conn:
+                conn.execute(STATS_QUERY).fetchall()
+
+        result = {
+            "connectLatencyMs": args.connect_latency_ms,
+            "concurrency": args.concurrency,
+            "unpooled": run(unpooled, args.requests, args.concurrency),
+            "pooled": run(pooled, args.requests, args.concurrency),
+            "poolStats": pool.stats(),
+        }
+        pool.close()
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+In-memory stand-in for the Camunda 7 REST endpoints this project calls, for offline benchmarks.
+
+Covers external tasks (fetchAndLock with long polling and the variables filter, complete,
+failure, extendLock), process instances (start, search by variable, variable updates)
+and the variable-instance fallback search. `--latency-ms` adds a fixed delay to every
+engine call to stand in for the network and the engine's own database.
+
+Benchmark-only endpoints under /_bench queue external tasks, create process instances
+in bulk and report counters and per-task queue-to-complete latency.
+
+    python benchmarks/fake_camunda.py --port 8081 --latency-ms 5
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request, Response
+
+PREFIX = "/engine-rest"
+
+
+class Engine:
+    def __init__(self):
+        self.instances = {}    # id -> {"key": definition key, "variables": {name: {value, type}}}
+        self.tasks = {}        # id -> external task (queued or locked)
+        self.completed_latency = []
+        self.counters = {"fetches": 0, "fetched": 0, "completed": 0, "failed": 0,
+                         "variableUpdates": 0, "started": 0}
+        self.changed = asyncio.Condition()
+
+    def start(self, key: str, variables: dict = None) -> dict:
+        instance_id = str(uuid.uuid4())
+        self.instances[instance_id] = {"key": key, "variables": dict(variables or {})}
+        self.counters["started"] += 1
+        return {"id": instance_id, "definitionId": f"{key}:1:bench", "businessKey": None, "ended": False}
+
+    def queue(self, topic: str, instance_id: str, activity_id: str, variables: dict) -> str:
+        task_id = str(uuid.uuid4())
+        self.tasks[task_id] = {
+            "id": task_id, "topicName": topic, "processInstanceId": instance_id, "activityId": activity_id,
+            "variables": variables, "retries": None, "lockedUntil": 0.0, "workerId": None,
+            "queuedAt": time.monotonic(),
+        }
+        return task_id
+
+    def lock(self, worker_id: str, max_tasks: int, topics: list) -> list:
+        now = time.monotonic()
+        wanted = {t["topicName"]: t for t in topics}
+        out = []
+        for task in self.tasks.values():
+            if len(out) >= max_tasks:
+                break
+            spec = wanted.get(task["topicName"])
+            if spec is None or task["lockedUntil"] > now:
+                continue
+            task["lockedUntil"] = now + spec.get("lockDuration", 60000) / 1000.0
+            task["workerId"] = worker_id
+            scope = {**self.instances.get(task["processInstanceId"], {}).get("variables", {}), **task["variables"]}
+            names = spec.get("variables")
+            if names is not None:
+                scope = {n: scope[n] for n in names if n in scope}
+            out.append({
+                "id": task["id"], "topicName": task["topicName"], "workerId": worker_id,
+                "processInstanceId": task["processInstanceId"], "activityId": task["activityId"],
+                "activityInstanceId": f"{task['activityId']}:{task['id']}", "businessKey": None,
+                "retries": task["retries"], "variables": scope,
+            })
+        self.counters["fetches"] += 1
+        self.counters["fetched"] += len(out)
+        return out
+
+
+def create_app(latency_ms: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Fake Camunda")
+    engine = Engine()
+    app.state.engine = engine
+    delay = latency_ms / 1000.0
+
+    @app.middleware("http")
+    async def engine_latency(request: Request, call_next):
+        if delay and request.url.path.startswith(PREFIX):
+            await asyncio.sleep(delay)
+        return await call_next(request)
+
+    @app.post(f"{PREFIX}/external-task/fetchAndLock")
+    async def fetch_and_lock(body: dict):
+        deadline = time.monotonic() + body.get("asyncResponseTimeout", 0) / 1000.0
+        async with engine.changed:
+            while True:
+                tasks = engine.lock(body["workerId"], body.get("maxTasks", 1), body.get("topics", []))
+                remaining = deadline - time.monotonic()
+                if tasks or remaining <= 0:
+                    return tasks
+                try:
+                    # Woken by new tasks; expired locks are picked up at the latest after a second
+                    await asyncio.wait_for(engine.changed.wait(), timeout=min(remaining, 1.0))
+                except asyncio.TimeoutError:
+                    pass
+
+    def locked_task(task_id: str, worker_id: str) -> dict:
+        task = engine.tasks.get(task_id)
+        if task is None:
+            raise HTTPException(status_code=404, detail=f"External task {task_id} does not exist")
+        if task["workerId"] != worker_id or task["lockedUntil"] < time.monotonic():
+            raise HTTPException(status_code=500, detail=f"External task {task_id} is not locked by {worker_id}")
+        return task
+
+    @app.post(f"{PREFIX}/external-task/{{task_id}}/complete", status_code=204)
+    async def complete(task_id: str, body: dict):
+        task = locked_task(task_id, body.get("workerId"))
+        instance = engine.instances.get(task["processInstanceId"])
+        if instance is not None:
+            instance["variables"].update(body.get("variables") or {})
+        del engine.tasks[task_id]
+        engine.counters["completed"] += 1
+        engine.completed_latency.append((time.monotonic() - task["queuedAt"]) * 1000.0)
+        return Response(status_code=204)
+
+    @app.post(f"{PREFIX}/external-task/{{task_id}}/failure", status_code=204)
+    async def failure(task_id: str, body: dict):
+        task = locked_task(task_id, body.get("workerId"))
+        engine.counters["failed"] += 1
+        task["retries"] = body.get("retries", 0)
+        if task["retries"] <= 0:
+            # An incident in the real engine; the task is no longer fetchable
+            del engine.tasks[task_id]
+        else:
+            task["lockedUntil"] = time.monotonic() + body.get("retryTimeout", 0) / 1000.0
+        return Response(status_code=204)
+
+    @app.post(f"{PREFIX}/external-task/{{task_id}}/extendLock", status_code=204)
+    async def extend_lock(task_id: str, body: dict):
+        task = locked_task(task_id, body.get("workerId"))
+        task["lockedUntil"] = time.monotonic() + body.get("newDuration", 0) / 1000.0
+        return Response(status_code=204)
+
+    @app.post(f"{PREFIX}/process-definition/key/{{key}}/start")
+    async def start(key: str, body: dict = None):
+        return engine.start(key, (body or {}).get("variables"))
+
+    @app.get(f"{PREFIX}/process-instance")
+    async def search_instances(variables: Optional[str] = None, active: Optional[str] = None):
+        found = []
+        for instance_id, instance in engine.instances.items():
+            if variables:
+                name, _, value = variables.partition("_eq_")
+                if str(instance["variables"].get(name, {}).get("value")) != value:
+                    continue
+            found.append({"id": instance_id, "definitionId": f"{instance['key']}:1:bench", "ended": False})
+        return found
+
+    @app.get(f"{PREFIX}/process-instance/{{instance_id}}")
+    async def get_instance(instance_id: str):
+        instance = engine.instances.get(instance_id)
+        if instance is None:
+            raise HTTPException(status_code=404, detail=f"Process instance {instance_id} does not exist")
+        return {"id": instance_id, "definitionId": f"{instance['key']}:1:bench", "ended": False}
+
+    @app.post(f"{PREFIX}/process-instance/{{instance_id}}/variables", status_code=204)
+    async def modify_variables(instance_id: str, body: dict):
+        instance = engine.instances.get(instance_id)
+        if instance is None:
+            raise HTTPException(status_code=404, detail=f"Process instance {instance_id} does not exist")
+        instance["variables"].update(body.get("modifications") or {})
+        engine.counters["variableUpdates"] += 1
+        return Response(status_code=204)
+
+    @app.get(f"{PREFIX}/variable-instance")
+    async def variable_instances(variableName: str, variableValue: Optional[str] = None):
+        return [
+            {"name": variableName, "processInstanceId": instance_id, "value": v["value"]}
+            for instance_id, instance in engine.instances.items()
+            for name, v in instance["variables"].items()
+            if name == variableName and (variableValue is None or str(v.get("value")) == variableValue)
+        ]
+
+    # ---- benchmark control ----
+
+    @app.post("/_bench/instances")
+    async def bench_instances(body: dict):
+        """{"count": n, "key": "contractTool"} -> ids of n new process instances."""
+        return [engine.start(body.get("key", "contractTool"))["id"] for _ in range(body.get("count", 1))]
+
+    @app.post("/_bench/tasks")
+    async def bench_tasks(body: dict):
+        """{"tasks": [{"topic", "processInstanceId", "activityId", "variables"}]} -> queued task ids."""
+        ids = [engine.queue(t["topic"], t.get("processInstanceId") or engine.start("contractTool")["id"],
+                            t.get("activityId", "Bench_Activity"), t.get("variables") or {})
+               for t in body.get("tasks", [])]
+        async with engine.changed:
+            engine.changed.notify_all()
+        return ids
+
+    @app.get("/_bench/state")
+    async def bench_state():
+        return {**engine.counters, "queued": len(engine.tasks), "completedLatencyMs": engine.completed_latency}
+
+    @app.post("/_bench/reset", status_code=204)
+    async def bench_reset():
+        engine.tasks.clear()
+        engine.completed_latency.clear()
+        for k in engine.counters:
+            engine.counters[k] = 0
+        return Response(status_code=204)
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8081)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    args = ap.parse_args()
+    uvicorn.run(create_app(args.latency_ms), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Provider load test: N concurrent providers polling the contract list and submitting offers.
+
+Each simulated provider loops for --duration seconds: GET /api/providers/contracts, then
+(every --patch-every iterations) PATCH one of the returned contracts. Prints throughput
+and latency percentiles per route as JSON.
+
+To compare the sync and async backends, run the same command against a backend started
+from each revision (same database and Camunda):
+
+    python benchmarks/load_providers.py --url http://localhost:8000 --concurrency 200 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import httpx
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    latencies = sorted(latencies)
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0]] * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughputRps": round(len(latencies) / elapsed, 1),
+        "meanMs": round(statistics.mean(latencies), 2),
+        "p50Ms": round(q[49], 2),
+        "p95Ms": round(q[94], 2),
+        "p99Ms": round(q[98], 2),
+    }
+
+
+async def provider(client: httpx.AsyncClient, deadline: float, patch_every: int, page_size: int, stats: dict):
+    i = 0
+    while time.monotonic() < deadline:
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            r = await client.get("/api/providers/contracts", params={"limit": page_size, "fields": "ContractId,ContractTitle"})
+            ok = r.status_code < 400
+            contracts = r.json() if ok else []
+        except Exception:
+            ok, contracts = False, []
+        stats["list"]["lat"].append((time.perf_counter() - t0) * 1000.0)
+        stats["list"]["err"] += 0 if ok else 1
+
+        if patch_every and i % patch_every == 0 and contracts:
+            target = random.choice(contracts)["ContractId"]
+            t0 = time.perf_counter()
+            try:
+                r = await client.patch(
+                    f"/api/providers/contracts/{target}",
+                    json={"providersBudget": random.randint(1000, 9000), "providersName": "LoadTest GmbH",
+                          "providersComment": "load test", "meetRequirement": "yes"},
+                )
+                ok = r.status_code < 400
+            except Exception:
+                ok = False
+            stats["patch"]["lat"].append((time.perf_counter() - t0) * 1000.0)
+            stats["patch"]["err"] += 0 if ok else 1
+
+
+async def run(args) -> dict:
+    stats = {"list": {"lat": [], "err": 0}, "patch": {"lat": [], "err": 0}}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            provider(client, deadline, args.patch_every, args.page_size, stats) for _ in range(args.concurrency)
+        ))
+        elapsed = time.monotonic() - started
+
+    total = len(stats["list"]["lat"]) + len(stats["patch"]["lat"])
+    return {
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "durationSec": round(elapsed, 2),
+        "throughputRps": round(total / elapsed, 1),
+        "list": summarize(stats["list"]["lat"], stats["list"]["err"], elapsed),
+        "patch": summarize(stats["patch"]["lat"], stats["patch"]["err"], elapsed),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://localhost:8000")
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--patch-every", type=int, default=5, help="PATCH after every Nth list call (0 = never)")
+    ap.add_argument("--page-size", type=int, default=50)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    args = ap.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
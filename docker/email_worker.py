@@ -1,10 +1,30 @@
+import html
+import json
 import os
+import re
 import smtplib
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from email.message import EmailMessage
+from html.parser import HTMLParser
+from pathlib import Path
+from string import Template
+
+import requests
 
 from camunda.external_task.external_task import ExternalTask, TaskResult
 from camunda.external_task.external_task_worker import ExternalTaskWorker
 
+# metrics.py and tracing.py are shared with the backend; the worker image copies them next to this file
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from metrics import REGISTRY, serve as serve_metrics
+from tracing import CORRELATION_VARIABLE, TRACING_ENABLED, SpanSink, span, utcnow
+
 # Configuration from environment
 ENGINE_REST = os.getenv("ENGINE_REST", "http://camunda-app:8080/engine-rest")
 MAILHOG_HOST = os.getenv("MAILHOG_HOST", "mailhog")
@@ -12,37 +32,356 @@ MAILHOG_PORT = int(os.getenv("MAILHOG_PORT", "1025"))
 TOPIC_NAME = os.getenv("TOPIC_NAME", "notify-topic")
 FROM_EMAIL = os.getenv("FROM_EMAIL", "noreply@local.com")
 WORKER_ID = os.getenv("WORKER_ID", f"email-worker-{TOPIC_NAME}")
+EMAIL_TEMPLATE_DIR = os.getenv("EMAIL_TEMPLATE_DIR", str(Path(__file__).resolve().parent / "email_templates"))
+DEFAULT_BODY = "You have a new task in the Contract Management Tool."
+
+# Concurrent senders (one long-polling subscription each) sharing the SMTP pool
+EMAIL_CONCURRENCY = int(os.getenv("EMAIL_CONCURRENCY", "4"))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", str(EMAIL_CONCURRENCY)))
+SMTP_TIMEOUT_SEC = float(os.getenv("SMTP_TIMEOUT_SEC", "10"))
+SMTP_PING_AFTER_SEC = float(os.getenv("SMTP_PING_AFTER_SEC", "15"))
+SMTP_MAX_IDLE_SEC = float(os.getenv("SMTP_MAX_IDLE_SEC", "120"))
+STATS_INTERVAL_SEC = float(os.getenv("STATS_INTERVAL_SEC", "60"))
+
+# Digest mode: hold tasks for a window and send one email per recipient
+EMAIL_DIGEST_ENABLED = os.getenv("EMAIL_DIGEST_ENABLED", "false").lower() == "true"
+EMAIL_DIGEST_WINDOW_SEC = float(os.getenv("EMAIL_DIGEST_WINDOW_SEC", "30"))
+EMAIL_DIGEST_MAX_TASKS = int(os.getenv("EMAIL_DIGEST_MAX_TASKS", "100"))
+EMAIL_LOCK_MS = int(os.getenv("EMAIL_LOCK_MS", "300000"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+# Trace spans are posted to the backend, which stores them with the rest of the pipeline
+BACKEND_URL = os.getenv("BACKEND_URL", "")
+TRACE_FLUSH_SEC = float(os.getenv("TRACE_FLUSH_SEC", "2"))
+
+# Same metric names as the store worker, so one dashboard covers both
+fetch_seconds = REGISTRY.histogram("worker_fetch_duration_seconds", "fetchAndLock round-trip, including the long poll")
+batch_tasks = REGISTRY.histogram("worker_tasks_per_batch", "Tasks returned per fetchAndLock",
+                                 buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500))
+fetched_tasks = REGISTRY.counter("worker_fetched_tasks_total", "Tasks fetched", ("topic",))
+handler_seconds = REGISTRY.histogram("worker_handler_duration_seconds", "Render and SMTP send per message", ("topic",))
+complete_seconds = REGISTRY.histogram("worker_complete_duration_seconds", "Camunda complete call", ("topic",))
+task_failures = REGISTRY.counter("worker_task_failures_total", "Tasks reported as failed to Camunda", ("topic",))
+
+
+class SmtpPool:
+    """
+    Bounded pool of open SMTP sessions.
+
+    Sessions are reused LIFO. A session idle for longer than `ping_after` is checked
+    with NOOP before reuse, and one idle for longer than `max_idle` is closed instead
+    (servers drop quiet clients). Sessions that fail are discarded and reopened.
+    """
+
+    def __init__(self, host: str, port: int, size: int, timeout: float, ping_after: float, max_idle: float):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.max_idle = max_idle
+
+        self._cond = threading.Condition()
+        self._idle = []     # [(smtp, last_used)]
+        self._open = 0
+        self._connects = 0
+        self._reused = 0
+        self._discarded = 0
+
+    def _connect(self):
+        return smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+
+    @staticmethod
+    def _quit(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _discard(self, smtp):
+        self._quit(smtp)
+        with self._cond:
+            self._open -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def acquire(self):
+        while True:
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    self._cond.wait()
+                if self._idle:
+                    smtp, last_used = self._idle.pop()
+                else:
+                    smtp, last_used = None, None
+                    self._open += 1
+
+            if smtp is None:
+                try:
+                    smtp = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._connects += 1
+                return smtp
+
+            idle = time.monotonic() - last_used
+            if idle > self.max_idle:
+                self._discard(smtp)
+                continue
+            if idle > self.ping_after:
+                try:
+                    healthy = smtp.noop()[0] == 250
+                except Exception:
+                    healthy = False
+                if not healthy:
+                    self._discard(smtp)
+                    continue
+            with self._cond:
+                self._reused += 1
+            return smtp
+
+    def release(self, smtp):
+        with self._cond:
+            self._idle.append((smtp, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def session(self):
+        smtp = self.acquire()
+        try:
+            yield smtp
+        except Exception:
+            # State of the session is unknown after an error; never hand it out again
+            self._discard(smtp)
+            raise
+        self.release(smtp)
+
+    def send(self, msg: EmailMessage):
+        """Sends on a pooled session, retrying once on a fresh one if the server hung up."""
+        try:
+            with self.session() as smtp:
+                smtp.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            with self.session() as smtp:
+                smtp.send_message(msg)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "connects": self._connects,
+                "reused": self._reused,
+                "discarded": self._discarded,
+            }
+
+
+class SendStats:
+    """Per-topic send counters and latency percentiles over the last `window` sends."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._topics = {}
+
+    def record(self, topic: str, seconds: float, ok: bool):
+        with self._lock:
+            entry = self._topics.setdefault(topic, {"sent": 0, "failed": 0, "latency": deque(maxlen=self.window)})
+            entry["sent" if ok else "failed"] += 1
+            entry["latency"].append(seconds * 1000.0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {}
+            for topic, entry in self._topics.items():
+                lat = sorted(entry["latency"])
+                summary = {"sent": entry["sent"], "failed": entry["failed"]}
+                if lat:
+                    q = statistics.quantiles(lat, n=100) if len(lat) > 1 else [lat[0]] * 99
+                    summary.update({
+                        "meanMs": round(statistics.mean(lat), 2),
+                        "p50Ms": round(q[49], 2),
+                        "p95Ms": round(q[94], 2),
+                        "maxMs": round(lat[-1], 2),
+                    })
+                out[topic] = summary
+            return out
+
+
+class _TextExtractor(HTMLParser):
+    BLOCKS = {"p", "div", "br", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "table", "hr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "li":
+            self.parts.append("\n- ")
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        # Source line breaks are just whitespace in HTML
+        self.parts.append(re.sub(r"\s+", " ", data))
+
+
+def html_to_text(markup: str) -> str:
+    """Plain-text rendering of an HTML body: block tags become line breaks, whitespace is collapsed."""
+    parser = _TextExtractor()
+    parser.feed(markup)
+    parser.close()
+    lines = [" ".join(line.split()) for line in "".join(parser.parts).splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def template_variables(template: Template) -> set:
+    # Template.get_identifiers() needs Python 3.11; the worker image runs 3.10
+    names = set()
+    for match in template.pattern.finditer(template.template):
+        name = match.group("named") or match.group("braced")
+        if name:
+            names.add(name)
+    return names
+
+
+class TemplateRegistry:
+    """
+    Email templates compiled once at startup.
+
+    Each `<name>.html` file starts with a `Subject:` line, then a blank line, then the
+    HTML body. Placeholders use `${variable}` (write `$$` for a literal `$`). The
+    plain-text alternative comes from an optional `<name>.txt` or is derived from the
+    HTML with the placeholders left in place, so rendering is only a substitution.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._templates = {}
+        for path in sorted(Path(directory).glob("*.html")) if os.path.isdir(directory) else []:
+            self._templates[path.stem] = self._compile(path)
+
+    @staticmethod
+    def _compile(path: Path):
+        head, _, body = path.read_text(encoding="utf-8").partition("\n\n")
+        if not head.lower().startswith("subject:"):
+            raise ValueError(f"{path.name}: first line must be 'Subject: ...'")
+        subject = Template(head.split(":", 1)[1].strip())
+        html_body = Template(body.strip())
+        text_path = path.with_suffix(".txt")
+        text_body = Template(text_path.read_text(encoding="utf-8").strip() if text_path.exists()
+                             else html_to_text(body))
+        variables = template_variables(subject) | template_variables(html_body) | template_variables(text_body)
+        return subject, html_body, text_body, frozenset(variables)
+
+    def names(self) -> list:
+        return sorted(self._templates)
+
+    def variables(self) -> set:
+        """Every variable any template refers to (used as the fetchAndLock filter)."""
+        return set().union(*(t[3] for t in self._templates.values()))
+
+    def render(self, name: str, get):
+        """Returns (subject, text, html); `get(variable)` supplies the task's variable values."""
+        if name not in self._templates:
+            raise KeyError(f"Unknown email template: {name}")
+        subject, html_body, text_body, variables = self._templates[name]
+        values = {v: get(v) for v in variables}
+        missing = sorted(v for v, value in values.items() if value is None)
+        if missing:
+            raise ValueError(f"Template {name} is missing variable(s): {', '.join(missing)}")
+        raw = {k: str(v) for k, v in values.items()}
+        escaped = {k: html.escape(v) for k, v in raw.items()}
+        return subject.substitute(raw), text_body.substitute(raw), html_body.substitute(escaped)
+
+
+smtp_pool = SmtpPool(MAILHOG_HOST, MAILHOG_PORT, SMTP_POOL_SIZE, SMTP_TIMEOUT_SEC,
+                     SMTP_PING_AFTER_SEC, SMTP_MAX_IDLE_SEC)
+send_stats = SendStats()
+templates = TemplateRegistry(EMAIL_TEMPLATE_DIR)
+REGISTRY.collect_stats("email_smtp_pool", smtp_pool.stats)
+span_sink = SpanSink(BACKEND_URL, TRACE_FLUSH_SEC, log_prefix="[email-worker]") if BACKEND_URL and TRACING_ENABLED else None
+if span_sink is not None:
+    REGISTRY.collect_stats("email_trace_spans", span_sink.stats)
+
+
+def trace(topic: str, started_at, correlation_id, process_instance_id, task_id, ok: bool):
+    if span_sink is not None:
+        span_sink.add(span(topic, "email-worker", started_at, correlation_id=correlation_id,
+                           process_instance_id=process_instance_id, task_id=task_id,
+                           status="ok" if ok else "error"))
 
 
-def send_via_mailhog(to_email: str, subject: str, body: str):
+def render_notification(get):
+    """
+    (subject, text, html or None) for one task. Tasks name a `template`; tasks from
+    older process definitions still carry a full `subject`/`body`, which is sent as is.
+    """
+    name = get("template")
+    if name:
+        return templates.render(name, get)
+
+    subject = get("subject") or "Notification"
+    body = get("body") or DEFAULT_BODY
+    # Legacy bodies: guess HTML by the closing tag
+    if body.strip().startswith("<") and "</div>" in body:
+        return subject, html_to_text(body), body
+    return subject, body, None
+
+
+def build_message(to_email: str, subject: str, text: str, html_body: str = None) -> EmailMessage:
     msg = EmailMessage()
     msg["From"] = FROM_EMAIL
     msg["To"] = to_email
     msg["Subject"] = subject
-    
-    # Check if body starts with HTML tag to set subtype
-    if body.strip().startswith("<") and "</div>" in body:
-        msg.set_content("Your email client does not support HTML. Please view in a compatible client.")
-        msg.add_alternative(body, subtype="html")
-    else:
-        msg.set_content(body)
+    msg.set_content(text)
+    if html_body:
+        msg.add_alternative(html_body, subtype="html")
+    return msg
 
-    with smtplib.SMTP(MAILHOG_HOST, MAILHOG_PORT, timeout=10) as s:
-        s.send_message(msg)
+
+def send_via_mailhog(to_email: str, subject: str, text: str, html_body: str = None):
+    smtp_pool.send(build_message(to_email, subject, text, html_body))
+
+
+# Topic of the task the current sender thread is running (read by the timed client calls)
+_current = threading.local()
 
 
 def handle(task: ExternalTask) -> TaskResult:
+    topic = task.get_topic_name()
+    _current.topic = topic
     to_email = task.get_variable("toEmail") or "recipient@local.com"
-    subject = task.get_variable("subject") or "Notification"
-    body = task.get_variable("body") or "You have a new task in the Contract Management Tool."
+    trace_ids = (task.get_variable(CORRELATION_VARIABLE), task.get_process_instance_id(), task.get_task_id())
 
+    started_at, started = utcnow(), time.perf_counter()
     try:
-        print(f"[{TOPIC_NAME}] Sending email to {to_email} (Subject: {subject})...")
-        send_via_mailhog(to_email, subject, body)
-        print(f"[{TOPIC_NAME}] SUCCESS: Email sent to {to_email}")
+        subject, text, html_body = render_notification(task.get_variable)
+        print(f"[{topic}] Sending email to {to_email} (Subject: {subject})...")
+        send_via_mailhog(to_email, subject, text, html_body)
+        elapsed = time.perf_counter() - started
+        send_stats.record(topic, elapsed, ok=True)
+        handler_seconds.observe(elapsed, topic=topic)
+        trace(topic, started_at, *trace_ids, ok=True)
+        print(f"[{topic}] SUCCESS: Email sent to {to_email}")
         return task.complete({"emailSent": True})
     except Exception as e:
-        print(f"[{TOPIC_NAME}] Error: {e}")
+        elapsed = time.perf_counter() - started
+        send_stats.record(topic, elapsed, ok=False)
+        handler_seconds.observe(elapsed, topic=topic)
+        trace(topic, started_at, *trace_ids, ok=False)
+        print(f"[{topic}] Error: {e}")
         return task.handle_failure(
             error_message=str(e),
             error_details=repr(e),
@@ -51,8 +390,224 @@ def handle(task: ExternalTask) -> TaskResult:
         )
 
 
+def instrument_client(client):
+    """Times the library client's fetchAndLock, complete and failure calls."""
+    fetch_and_lock, complete, failure = client.fetch_and_lock, client.complete, client.failure
+
+    def timed_fetch_and_lock(*args, **kwargs):
+        with fetch_seconds.time():
+            result = fetch_and_lock(*args, **kwargs)
+        tasks = result or []
+        batch_tasks.observe(len(tasks))
+        for t in tasks:
+            fetched_tasks.inc(topic=t.get("topicName"))
+        return result
+
+    def timed_complete(*args, **kwargs):
+        with complete_seconds.time(topic=getattr(_current, "topic", "")):
+            return complete(*args, **kwargs)
+
+    def timed_failure(*args, **kwargs):
+        task_failures.inc(topic=getattr(_current, "topic", ""))
+        return failure(*args, **kwargs)
+
+    client.fetch_and_lock = timed_fetch_and_lock
+    client.complete = timed_complete
+    client.failure = timed_failure
+
+
+def run_sender(index: int, topics: list):
+    # One task per fetch: the library runs a worker's tasks one after another,
+    # so concurrency comes from several subscriptions, not from larger batches
+    worker = ExternalTaskWorker(
+        worker_id=f"{WORKER_ID}-{index}",
+        base_url=ENGINE_REST,
+        config={"maxTasks": 1, "sleepSeconds": 5},
+    )
+    # The executor shares this client, so completions and failures are timed too
+    instrument_client(worker.client)
+    worker.subscribe(topics, handle, variables=FETCH_VARIABLES)
+
+
+# =========================================
+# Digest mode
+# Tasks are fetched straight from the REST API so a whole window of them can be
+# held (locked) at once; the library worker only ever holds the task it is running.
+# =========================================
+
+
+def fetch_tasks(session: requests.Session, topics: list, max_tasks: int, async_timeout_ms: int) -> list:
+    payload = {
+        "workerId": WORKER_ID,
+        "maxTasks": max_tasks,
+        "usePriority": True,
+        "asyncResponseTimeout": async_timeout_ms,
+        "topics": [{"topicName": t, "lockDuration": EMAIL_LOCK_MS, "variables": FETCH_VARIABLES} for t in topics],
+    }
+    with fetch_seconds.time():
+        r = session.post(f"{ENGINE_REST}/external-task/fetchAndLock", json=payload,
+                         timeout=async_timeout_ms / 1000.0 + 30)
+        r.raise_for_status()
+        tasks = r.json()
+    batch_tasks.observe(len(tasks))
+    for t in tasks:
+        fetched_tasks.inc(topic=t.get("topicName"))
+    return tasks
+
+
+def complete_task(session: requests.Session, task_id: str, variables: dict):
+    payload = {"workerId": WORKER_ID, "variables": {k: {"value": v} for k, v in variables.items()}}
+    session.post(f"{ENGINE_REST}/external-task/{task_id}/complete", json=payload, timeout=30).raise_for_status()
+
+
+def fail_task(session: requests.Session, task_id: str, error: Exception):
+    payload = {
+        "workerId": WORKER_ID,
+        "errorMessage": str(error)[:255],
+        "errorDetails": repr(error)[:4000],
+        "retries": 3,
+        "retryTimeout": 10000,
+    }
+    session.post(f"{ENGINE_REST}/external-task/{task_id}/failure", json=payload, timeout=30).raise_for_status()
+
+
+def task_var(task: dict, name: str, default=None):
+    """Like ExternalTask.get_variable: only a missing or null variable is replaced by `default`."""
+    value = (task.get("variables") or {}).get(name, {}).get("value")
+    return default if value is None else value
+
+
+def render_digest(tasks: list, rendered: list):
+    """One message listing every contract of the group, followed by the individual notifications."""
+    items, sections = [], []
+    for task, (subject, text, html_body) in zip(tasks, rendered):
+        title = task_var(task, "contractTitle") or subject
+        contract_id = task_var(task, "contractId")
+        label = html.escape(title) + (f" <small>({html.escape(contract_id)})</small>" if contract_id else "")
+        items.append(f"<li>{label}</li>")
+        body = html_body or f"<p>{html.escape(text)}</p>"
+        sections.append(f"<h3>{html.escape(subject)}</h3>{body}")
+
+    body = (
+        f"<div><p>You have {len(tasks)} new notifications in the Contract Management Tool:</p>"
+        f"<ul>{''.join(items)}</ul><hr>{'<hr>'.join(sections)}</div>"
+    )
+    return f"{len(tasks)} contract notifications", html_to_text(body), body
+
+
+def _report_failures(session: requests.Session, topic: str, started_at, failed: list):
+    """Traces and fails [(task, error)] in Camunda."""
+    for task, error in failed:
+        task_failures.inc(topic=topic)
+        trace(topic, started_at, task_var(task, CORRELATION_VARIABLE), task.get("processInstanceId"),
+              task["id"], ok=False)
+        try:
+            fail_task(session, task["id"], error)
+        except Exception as fe:
+            print(f"[{topic}] failure report failed task={task['id']} err={fe}")
+
+
+def send_group(session: requests.Session, to_email: str, tasks: list):
+    """
+    Sends the group's email, then completes (or fails) every task in it. Each task is
+    rendered on its own: a task whose template fails is failed alone and the digest
+    goes out with the others.
+    """
+    topic = tasks[0]["topicName"]
+    started_at, started = utcnow(), time.perf_counter()
+    rendered, failed = [], []
+    for task in tasks:
+        try:
+            rendered.append((task, render_notification(lambda name, t=task: task_var(t, name))))
+        except Exception as e:
+            print(f"[{topic}] Error rendering task={task['id']} for {to_email}: {e}")
+            failed.append((task, e))
+    _report_failures(session, topic, started_at, failed)
+    if not rendered:
+        return
+
+    tasks = [task for task, _ in rendered]
+    try:
+        message = rendered[0][1] if len(tasks) == 1 else render_digest(tasks, [m for _, m in rendered])
+        send_via_mailhog(to_email, *message)
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        send_stats.record(topic, elapsed, ok=False)
+        handler_seconds.observe(elapsed, topic=topic)
+        print(f"[{topic}] Error sending digest of {len(tasks)} to {to_email}: {e}")
+        _report_failures(session, topic, started_at, [(task, e) for task in tasks])
+        return
+
+    elapsed = time.perf_counter() - started
+    send_stats.record(topic, elapsed, ok=True)
+    handler_seconds.observe(elapsed, topic=topic)
+    print(f"[{topic}] SUCCESS: digest of {len(tasks)} notification(s) sent to {to_email}")
+    for task in tasks:
+        trace(topic, started_at, task_var(task, CORRELATION_VARIABLE), task.get("processInstanceId"),
+              task["id"], ok=True)
+        try:
+            with complete_seconds.time(topic=topic):
+                complete_task(session, task["id"], {"emailSent": True})
+        except Exception as ce:
+            print(f"[{topic}] complete failed task={task['id']} err={ce}")
+
+
+def collect_window(session: requests.Session, topics: list) -> list:
+    """Long-polls for the first task, then keeps fetching until the window closes or the cap is hit."""
+    tasks = fetch_tasks(session, topics, EMAIL_DIGEST_MAX_TASKS, 30000)
+    if not tasks:
+        return []
+    window_end = time.monotonic() + EMAIL_DIGEST_WINDOW_SEC
+    while len(tasks) < EMAIL_DIGEST_MAX_TASKS:
+        remaining_ms = int((window_end - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            break
+        tasks += fetch_tasks(session, topics, EMAIL_DIGEST_MAX_TASKS - len(tasks), remaining_ms)
+    return tasks
+
+
+def run_digest(topics: list):
+    session = requests.Session()
+    senders = ThreadPoolExecutor(max_workers=EMAIL_CONCURRENCY, thread_name_prefix="digest")
+    while True:
+        try:
+            tasks = collect_window(session, topics)
+        except Exception as e:
+            print(f"[email-worker] fetchAndLock failed: {e}")
+            time.sleep(5)
+            continue
+
+        groups = {}
+        for task in tasks:
+            to_email = task_var(task, "toEmail") or "recipient@local.com"
+            groups.setdefault(to_email.strip().lower(), []).append(task)
+        # Recipients are independent; send their digests in parallel over the SMTP pool
+        list(senders.map(lambda item: send_group(session, item[0], item[1]), groups.items()))
+
+
+# Only these variables are fetched with each task instead of the whole process scope
+FETCH_VARIABLES = sorted({"toEmail", "template", "subject", "body", "contractId", "contractTitle",
+                          CORRELATION_VARIABLE} | templates.variables())
+
+
 if __name__ == "__main__":
-    print(f"Starting email worker for topic: {TOPIC_NAME}")
-    worker = ExternalTaskWorker(worker_id=WORKER_ID, base_url=ENGINE_REST)
-    worker.subscribe(TOPIC_NAME, handle)
-    worker.run()
+    # TOPIC_NAME may list several topics (comma-separated); latency is reported per topic
+    topics = [t.strip() for t in TOPIC_NAME.split(",") if t.strip()]
+    print(f"[email-worker] {len(templates.names())} template(s) compiled from {EMAIL_TEMPLATE_DIR}: "
+          f"{', '.join(templates.names()) or '-'}")
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT)
+    if span_sink is not None:
+        span_sink.start()
+    if EMAIL_DIGEST_ENABLED:
+        print(f"Starting email worker for topic(s): {', '.join(topics)} in digest mode "
+              f"({EMAIL_DIGEST_WINDOW_SEC:.0f}s window, up to {EMAIL_DIGEST_MAX_TASKS} tasks)")
+        threading.Thread(target=run_digest, args=(topics,), name="digest", daemon=True).start()
+    else:
+        print(f"Starting email worker for topic(s): {', '.join(topics)} with {EMAIL_CONCURRENCY} concurrent sender(s)")
+        for i in range(EMAIL_CONCURRENCY):
+            threading.Thread(target=run_sender, args=(i, topics), name=f"sender-{i}", daemon=True).start()
+
+    while True:
+        time.sleep(STATS_INTERVAL_SEC)
+        print(f"[email-worker] stats {json.dumps({'topics': send_stats.snapshot(), 'smtp': smtp_pool.stats()})}", flush=True)
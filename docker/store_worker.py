@@ -0,0 +1,790 @@
+import json
+import os
+import re
+import signal
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+# storage.py, metrics.py and tracing.py are shared with the backend; the worker image copies them next to this file
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from metrics import REGISTRY, serve as serve_metrics
+from storage import get_storage
+from tracing import CORRELATION_VARIABLE, record_spans, span, utcnow
+
+
+def env(name: str, default: str = None) -> str:
+    v = os.getenv(name, default)
+    if v is None or v == "":
+        raise RuntimeError(f"Missing env var: {name}")
+    return v
+
+
+def get_var(vars_dict: dict, name: str, default=None):
+    """Camunda returns variables as {name: {value: ...}}"""
+    try:
+        return vars_dict.get(name, {}).get("value", default)
+    except Exception:
+        return default
+
+
+def sql_conn():
+    """Connection to the Contracts store selected by STORAGE_BACKEND (Azure SQL by default)."""
+    return get_storage().connect()
+
+
+# Optional: backend whose status-count cache is invalidated after each write
+BACKEND_URL = os.getenv("BACKEND_URL", "")
+
+
+def invalidate_backend_cache():
+    """Best effort; the backend cache also expires on its own TTL."""
+    if not BACKEND_URL:
+        return
+    try:
+        requests.post(f"{BACKEND_URL}/api/admin/cache/invalidate", timeout=2)
+    except Exception as e:
+        print(f"[store-worker] cache invalidation failed: {e}")
+
+
+# =========================================
+# Metrics (GET /metrics on METRICS_PORT)
+# =========================================
+
+fetch_seconds = REGISTRY.histogram("worker_fetch_duration_seconds", "fetchAndLock round-trip, including the long poll")
+batch_tasks = REGISTRY.histogram("worker_tasks_per_batch", "Tasks returned per fetchAndLock",
+                                 buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500))
+fetched_tasks = REGISTRY.counter("worker_fetched_tasks_total", "Tasks fetched", ("topic",))
+fetched_bytes = REGISTRY.counter("worker_fetched_bytes_total", "JSON bytes of fetched tasks", ("topic",))
+handler_seconds = REGISTRY.histogram("worker_handler_duration_seconds", "Store write per topic and batch", ("topic",))
+complete_seconds = REGISTRY.histogram("worker_complete_duration_seconds", "Camunda complete call", ("topic",))
+task_failures = REGISTRY.counter("worker_task_failures_total", "Tasks reported as failed to Camunda", ("topic",))
+
+# =========================================
+# Camunda external task REST
+# =========================================
+
+class FetchStats:
+    """Tasks and response bytes fetched per topic (the JSON size of each task as the engine sent it)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics = {}
+
+    def record(self, tasks: list):
+        with self._lock:
+            for t in tasks:
+                topic = t.get("topicName")
+                size = len(json.dumps(t, separators=(",", ":")))
+                entry = self._topics.setdefault(topic, {"tasks": 0, "bytes": 0})
+                entry["tasks"] += 1
+                entry["bytes"] += size
+                fetched_tasks.inc(topic=topic)
+                fetched_bytes.inc(size, topic=topic)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                topic: {**e, "bytesPerTask": round(e["bytes"] / e["tasks"])}
+                for topic, e in self._topics.items()
+            }
+
+
+fetch_stats = FetchStats()
+
+
+def fetch_and_lock(session: requests.Session, engine_rest: str, worker_id: str, topics: list,
+                   max_tasks: int, lock_ms: int, async_timeout_ms: int,
+                   variables: dict = None, deserialize_values: bool = False):
+    """
+    One fetchAndLock for all topics. With asyncResponseTimeout the engine holds the
+    request open until a task is available (or the timeout passes), so idle workers
+    neither sleep nor spin. `variables` maps a topic to the variable names to fetch;
+    a topic without an entry gets every variable in scope.
+    """
+    url = f"{engine_rest}/external-task/fetchAndLock"
+    topic_requests = []
+    for topic in topics:
+        req = {"topicName": topic, "lockDuration": lock_ms, "deserializeValues": deserialize_values}
+        if variables and topic in variables:
+            req["variables"] = list(variables[topic])
+        topic_requests.append(req)
+    payload = {
+        "workerId": worker_id,
+        "maxTasks": max_tasks,
+        "usePriority": True,
+        "asyncResponseTimeout": async_timeout_ms,
+        "topics": topic_requests
+    }
+    # HTTP timeout must outlive the long poll
+    with fetch_seconds.time():
+        r = session.post(url, json=payload, timeout=async_timeout_ms / 1000.0 + 30)
+        r.raise_for_status()
+        tasks = r.json()
+    batch_tasks.observe(len(tasks))
+    fetch_stats.record(tasks)
+    return tasks
+
+
+def complete_task(session: requests.Session, engine_rest: str, task_id: str, worker_id: str, variables: dict = None):
+    url = f"{engine_rest}/external-task/{task_id}/complete"
+    # Camunda expects variables in { varName: { value: x } }
+    payload = {"workerId": worker_id, "variables": {k: {"value": v} for k, v in (variables or {}).items()}}
+    r = session.post(url, json=payload, timeout=30)
+    r.raise_for_status()
+
+
+def fail_task(session: requests.Session, engine_rest: str, task_id: str, worker_id: str, msg: str, details: str,
+              retries: int = 3, retry_timeout_ms: int = 60000):
+    url = f"{engine_rest}/external-task/{task_id}/failure"
+    payload = {
+        "workerId": worker_id,
+        "errorMessage": msg[:255],
+        "errorDetails": details[:4000],
+        "retries": retries,
+        "retryTimeout": retry_timeout_ms
+    }
+    r = session.post(url, json=payload, timeout=30)
+    r.raise_for_status()
+
+
+def extend_lock(session: requests.Session, engine_rest: str, task_id: str, worker_id: str, new_duration_ms: int):
+    url = f"{engine_rest}/external-task/{task_id}/extendLock"
+    payload = {"workerId": worker_id, "newDuration": new_duration_ms}
+    r = session.post(url, json=payload, timeout=30)
+    r.raise_for_status()
+
+
+class LockExtender:
+    """
+    Background thread that keeps the locks of long-running tasks alive.
+    A task whose lock is more than half used up gets it extended by another lock_ms.
+    """
+
+    def __init__(self, session: requests.Session, engine_rest: str, worker_id: str, lock_ms: int):
+        self.session = session
+        self.engine_rest = engine_rest
+        self.worker_id = worker_id
+        self.lock_ms = lock_ms
+        self._locked_at = {}  # task_id -> monotonic time the current lock started
+        self._mutex = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lock-extender", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def track(self, task_id: str):
+        with self._mutex:
+            self._locked_at[task_id] = time.monotonic()
+
+    def untrack(self, task_id: str):
+        with self._mutex:
+            self._locked_at.pop(task_id, None)
+
+    def _run(self):
+        half = self.lock_ms / 2000.0
+        while not self._stop.wait(max(half / 2, 0.5)):
+            now = time.monotonic()
+            with self._mutex:
+                due = [tid for tid, since in self._locked_at.items() if now - since >= half]
+            for task_id in due:
+                try:
+                    extend_lock(self.session, self.engine_rest, task_id, self.worker_id, self.lock_ms)
+                    with self._mutex:
+                        if task_id in self._locked_at:
+                            self._locked_at[task_id] = time.monotonic()
+                    print(f"[store-worker] extended lock task={task_id} by {self.lock_ms}ms")
+                except Exception as e:
+                    print(f"[store-worker] extendLock failed task={task_id} err={e}")
+
+
+# =========================================
+# Topic mappings
+# Every store topic is described declaratively and compiled once at startup into a
+# TopicHandler: the variables to fetch, a row builder and one parameterized statement
+# that writes a whole batch of rows.
+#
+#   table        target table
+#   mode         "insert" (new row; a key that is already stored is updated instead, e.g.
+#                a draft stored again after the rejection loop) or "update" (existing row
+#                matched on the key)
+#   key          (variable, column, SQL type) identifying the row
+#   generate_key insert only: when the variable is missing, a UUID derived from the
+#                external task id, so a redelivered task gets the same key
+#   task_fields  [(task attribute, column, SQL type)] taken from the task itself
+#   fields       [(variable, column, SQL type)]; FLOAT/INT values are parsed, ''/invalid -> NULL
+#   required     further variables that must be present
+#   constants    {column: Python value} written with every new row
+#   status       (column, value) after the write
+#   timestamp    column(s) set to the storage's current time; every Contracts mapping
+#                includes ModifiedAt, the watermark of the provider change feed
+#   insert_only  insert only: timestamp columns left alone when an existing row is updated
+#   reset_on_update insert only: columns an update of an existing row returns to their
+#                new-row value (the constant, else NULL), so a redraft drops the last
+#                round's offer and review
+#   complete     variables returned to Camunda: {variable: "key"}
+# =========================================
+
+TOPIC_MAPPINGS = {
+    "store-create-contract": {
+        "table": "Contracts",
+        "mode": "insert",
+        "key": ("contractId", "ContractId", "VARCHAR(36)"),
+        "generate_key": True,
+        "task_fields": [
+            ("processInstanceId", "ProcessInstanceId", "VARCHAR(64)"),
+            ("businessKey", "BusinessKey", "VARCHAR(255)"),
+        ],
+        # contractDraft.form
+        "fields": [
+            ("contractTitle", "ContractTitle", "VARCHAR(255)"),
+            ("contractType", "ContractType", "VARCHAR(255)"),
+            ("roles", "Roles", "TEXT"),
+            ("skills", "Skills", "TEXT"),
+            ("requestType", "RequestType", "VARCHAR(255)"),
+            ("budget", "Budget", "FLOAT"),
+            ("contractStartDate", "ContractStartDate", "VARCHAR(50)"),
+            ("contractEndDate", "ContractEndDate", "VARCHAR(50)"),
+            ("description", "Description", "TEXT"),
+        ],
+        "constants": {"ProvidersComment": ""},
+        "status": ("ContractStatus", "Submitted"),
+        "timestamp": ["CreatedAt", "ModifiedAt"],
+        "insert_only": ["CreatedAt"],
+        "reset_on_update": ["ProvidersBudget", "ProvidersComment", "ProvidersName", "MeetRequirement",
+                            "LegalComment", "ApprovalDecision", "RejectedAt"],
+        # Push contractId back so next steps can use it
+        "complete": {"contractId": "key"},
+    },
+    "store-contract": {
+        "table": "Contracts",
+        "mode": "update",
+        "key": ("contractId", "ContractId", "VARCHAR(36)"),
+        # storeContract.form, then the legal items of reviewContract.form
+        "fields": [
+            ("signeddate", "SignedDate", "VARCHAR(50)"),
+            ("employeeName", "EmployeeName", "VARCHAR(255)"),
+            ("officeAddress", "OfficeAddress", "VARCHAR(255)"),
+            ("finalPrice", "FinalPrice", "FLOAT"),
+            ("legalcomment", "LegalComment", "TEXT"),
+            ("approvaldecision", "ApprovalDecision", "VARCHAR(50)"),
+        ],
+        "status": ("ContractStatus", "Approved"),
+        "timestamp": ["ApprovedAt", "ModifiedAt"],
+    },
+    "store-reject-contract": {
+        "table": "Contracts",
+        "mode": "update",
+        "key": ("contractId", "ContractId", "VARCHAR(36)"),
+        # reviewContract.form
+        "fields": [
+            ("legalcomment", "LegalComment", "TEXT"),
+            ("approvaldecision", "ApprovalDecision", "VARCHAR(50)"),
+        ],
+        "status": ("ContractStatus", "Rejected"),
+        "timestamp": ["RejectedAt", "ModifiedAt"],
+    },
+}
+
+# SQL Server allows at most 2100 parameters per statement
+MAX_SQL_PARAMS = 2000
+
+_KEY_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "urn:contract-tool:store-worker")
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_SQL_TYPE = re.compile(r"^[A-Z]+(\(\d+\))?$")
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value):
+    try:
+        return int(float(value)) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _converter(sql_type: str):
+    base = sql_type.split("(")[0]
+    if base in ("FLOAT", "REAL", "DOUBLE", "DECIMAL", "NUMERIC"):
+        return _to_float
+    if base in ("INT", "INTEGER", "BIGINT", "SMALLINT"):
+        return _to_int
+    return None
+
+
+def _sql_literal(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class TopicHandler:
+    """A compiled TOPIC_MAPPINGS entry; raises ValueError for an invalid mapping."""
+
+    def __init__(self, topic: str, spec: dict):
+        self.topic = topic
+        self.table = spec["table"]
+        self.mode = spec.get("mode", "update")
+        if self.mode not in ("insert", "update"):
+            raise ValueError(f"{topic}: mode must be 'insert' or 'update'")
+
+        self.key_variable, self.key_column, key_type = spec["key"]
+        self.generate_key = bool(spec.get("generate_key")) and self.mode == "insert"
+        task_fields = list(spec.get("task_fields", [])) if self.mode == "insert" else []
+        fields = list(spec.get("fields", []))
+        self.status_column, self.status = spec.get("status", (None, None))
+        timestamps = spec.get("timestamp") or []
+        timestamps = [timestamps] if isinstance(timestamps, str) else list(timestamps)
+        constants = dict(spec.get("constants", {}))
+        insert_only = set(spec.get("insert_only", [])) if self.mode == "insert" else set()
+        if not insert_only <= set(timestamps):
+            raise ValueError(f"{topic}: insert_only must name timestamp columns")
+        reset = list(spec.get("reset_on_update", [])) if self.mode == "insert" else []
+
+        # Parameter columns in row order: key, task attributes, variables
+        self.columns = [(self.key_column, key_type)] + [(c, t) for _, c, t in task_fields + fields]
+        names = [c for c, _ in self.columns] + list(constants) + ([self.status_column] if self.status_column else []) + timestamps
+        names += [c for c in reset if c not in constants]
+        for name in names + [self.table]:
+            if not _IDENTIFIER.match(name):
+                raise ValueError(f"{topic}: invalid identifier {name!r}")
+        for _, sql_type in self.columns:
+            if not _SQL_TYPE.match(sql_type):
+                raise ValueError(f"{topic}: invalid SQL type {sql_type!r}")
+        if len(set(names)) != len(names):
+            raise ValueError(f"{topic}: a column is mapped more than once")
+
+        self.variables = tuple(dict.fromkeys([self.key_variable] + [v for v, _, _ in fields]
+                                             + list(spec.get("required", []))))
+        self.required = tuple(spec.get("required", []))
+        self.complete = dict(spec.get("complete", {}))
+        # The per-task hot path: (name, converter) pairs, evaluated into one tuple
+        self._task_fields = tuple((attr, _converter(t)) for attr, _, t in task_fields)
+        self._fields = tuple((var, _converter(t)) for var, _, t in fields)
+
+        # Columns written with every row besides the parameters
+        self._fixed = [(c, _sql_literal(v)) for c, v in constants.items()]
+        if self.status_column:
+            self._fixed.append((self.status_column, _sql_literal(self.status)))
+        self._timestamps = timestamps
+        # Columns an update sets besides the parameters (constants are defaults of new rows)
+        self._update_fixed = ([(self.status_column, _sql_literal(self.status))] if self.status_column else [])
+        self._update_fixed += [(c, _sql_literal(constants.get(c))) for c in reset]
+        self._update_timestamps = [c for c in timestamps if c not in insert_only]
+        self._statements = {}
+
+    def build(self, task: dict):
+        """-> (key, row params, variables to complete the task with); raises ValueError for a bad task."""
+        vars_dict = task.get("variables") or {}
+        key = get_var(vars_dict, self.key_variable)
+        if not key:
+            if not self.generate_key:
+                raise ValueError(f"Task has no {self.key_variable} variable")
+            key = str(uuid.uuid5(_KEY_NAMESPACE, task["id"]) if task.get("id") else uuid.uuid4())
+        for name in self.required:
+            if get_var(vars_dict, name) in (None, ""):
+                raise ValueError(f"Task has no {name} variable")
+
+        row = (key,) + tuple(
+            conv(task.get(attr)) if conv else task.get(attr) for attr, conv in self._task_fields
+        ) + tuple(
+            conv(get_var(vars_dict, var)) if conv else get_var(vars_dict, var) for var, conv in self._fields
+        )
+        result = {var: key for var, source in self.complete.items() if source == "key"}
+        return key, row, result
+
+    def prepare(self, storage):
+        """Builds the statement for a full chunk up front; shorter chunks are built once on first use."""
+        self._statement(storage, self.chunk_size)
+        if self.mode == "insert":
+            self._insert_statement(storage)
+
+    @property
+    def chunk_size(self) -> int:
+        return max(1, MAX_SQL_PARAMS // len(self.columns))
+
+    def _statement(self, storage, nrows: int) -> str:
+        """UPDATE of nrows parameter rows matched on the key."""
+        sql = self._statements.get((storage.name, nrows))
+        if sql is None:
+            fixed = self._update_fixed + [(c, storage.now) for c in self._update_timestamps]
+            set_sql = ", ".join([f"{c} = v.{c}" for c, _ in self.columns[1:]] + [f"{c} = {v}" for c, v in fixed])
+            returning = [self.key_column] + ([self.status_column] if self.status_column else [])
+            sql = storage.bulk_update(self.table, self.key_column, self.columns, set_sql, nrows, returning)
+            self._statements[(storage.name, nrows)] = sql
+        return sql
+
+    def _insert_statement(self, storage) -> str:
+        """One INSERT for any batch size (executemany)."""
+        sql = self._statements.get((storage.name, "insert"))
+        if sql is None:
+            fixed = self._fixed + [(c, storage.now) for c in self._timestamps]
+            cols = [c for c, _ in self.columns] + [c for c, _ in fixed]
+            values = [storage.typed_param(t) for _, t in self.columns] + [v for _, v in fixed]
+            sql = self._statements[(storage.name, "insert")] = (
+                f"INSERT INTO {self.table} ({', '.join(cols)}) VALUES ({', '.join(values)})"
+            )
+        return sql
+
+    def _update(self, cur, storage, rows: list) -> dict:
+        # UPDATE joined to a table of parameter rows; OUTPUT / RETURNING replaces a verification SELECT
+        written = {}
+        for i in range(0, len(rows), self.chunk_size):
+            chunk = rows[i:i + self.chunk_size]
+            cur.execute(self._statement(storage, len(chunk)), *[p for row in chunk for p in row])
+            for out in cur.fetchall():
+                written[str(out[0]).lower()] = (out[0], out[1] if self.status_column else None)
+        return written
+
+    def write(self, cur, rows: list) -> dict:
+        """Writes a batch; returns {key: (key, status)} for every row actually written."""
+        storage = get_storage()
+        if self.mode == "update":
+            return self._update(cur, storage, rows)
+
+        # Keys already stored (a redraft, or a redelivery without the ledger) are updated,
+        # the rest inserted. A key inserted concurrently by another replica violates the
+        # unique key and fails the batch, whose tasks are then retried one by one.
+        written = self._update(cur, storage, rows)
+        new_rows = [row for row in rows if str(row[0]).lower() not in written]
+        if new_rows:
+            # fast_executemany (pyodbc) / execute_batch (psycopg2) ship the parameter array in
+            # as few round-trips as possible; the INSERT either stores every row or raises
+            cur.fast_executemany = True
+            cur.executemany(self._insert_statement(storage), new_rows)
+            written.update({str(r[0]).lower(): (r[0], self.status) for r in new_rows})
+        return written
+
+
+def compile_mappings(mappings: dict) -> dict:
+    return {topic: TopicHandler(topic, spec) for topic, spec in mappings.items()}
+
+
+TOPIC_HANDLERS = compile_mappings(TOPIC_MAPPINGS)
+
+
+def fetch_variables(topics: list) -> dict:
+    """
+    fetchAndLock variable filter: per topic, the variables its handler reads, plus the
+    correlation ID for the trace span.
+    """
+    return {t: TOPIC_HANDLERS[t].variables + (CORRELATION_VARIABLE,) for t in topics}
+
+
+# =========================================
+# Processed-task ledger
+# One ProcessedTasks row per external task id, written in the same transaction as
+# the task's rows. Camunda keeps the id when it redelivers a task, so a redelivered
+# task is completed with the stored result without touching the Contracts table
+# again; a store activity reached again through a BPMN loop is a new external task
+# and is written normally.
+# =========================================
+
+IDEMPOTENT_WRITES = os.getenv("IDEMPOTENT_WRITES", "true").lower() == "true"
+LEDGER_RETENTION_DAYS = int(os.getenv("LEDGER_RETENTION_DAYS", "30"))
+
+
+def ledger_key(task: dict):
+    return task.get("id")
+
+
+def ledger_lookup(cur, tasks: list) -> dict:
+    """{task id: completion variables} for tasks already written."""
+    task_ids = sorted({ledger_key(t) for t in tasks if ledger_key(t)})
+    done = {}
+    for i in range(0, len(task_ids), MAX_SQL_PARAMS):
+        chunk = task_ids[i:i + MAX_SQL_PARAMS]
+        cur.execute(
+            f"SELECT TaskId, Result FROM ProcessedTasks WHERE TaskId IN ({', '.join('?' * len(chunk))})",
+            *chunk
+        )
+        for task_id, result in cur.fetchall():
+            done[task_id] = json.loads(result)
+    return done
+
+
+def ledger_record(cur, entries: list):
+    """entries: [(task, completion variables)]; a concurrent duplicate fails the transaction."""
+    rows = [(t.get("processInstanceId") or "", t.get("activityId") or "", ledger_key(t), t.get("topicName"),
+             json.dumps(result))
+            for t, result in entries if ledger_key(t)]
+    if rows:
+        cur.executemany(
+            "INSERT INTO ProcessedTasks (ProcessInstanceId, ActivityId, TaskId, Topic, Result, ProcessedAt) "
+            f"VALUES (?, ?, ?, ?, ?, {get_storage().now})",
+            rows
+        )
+
+
+def purge_ledger():
+    """Deletes ledger entries older than LEDGER_RETENTION_DAYS, 1000 at a time."""
+    storage = get_storage()
+    expired = storage.top(1000, f"Id FROM ProcessedTasks WHERE ProcessedAt < {storage.seconds_from_now()}")
+    conn = worker_sql_conn()
+    cur = conn.cursor()
+    while True:
+        cur.execute(f"DELETE FROM ProcessedTasks WHERE Id IN ({expired})", -LEDGER_RETENTION_DAYS * 86400)
+        deleted = cur.rowcount
+        conn.commit()
+        if deleted < 1000:
+            return
+
+
+# =========================================
+# Batch execution
+# =========================================
+
+_local = threading.local()
+
+
+def worker_sql_conn():
+    """Per-thread Contracts-store connection, opened on first use and reused across batches."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = sql_conn()
+    return conn
+
+
+def drop_worker_sql_conn():
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def task_span(task: dict, started_at):
+    return span(task.get("topicName"), "store-worker", started_at,
+                correlation_id=get_var(task.get("variables") or {}, CORRELATION_VARIABLE),
+                process_instance_id=task.get("processInstanceId"), task_id=task["id"])
+
+
+def write_items(items: list, started_at=None) -> dict:
+    """
+    Writes prepared (task, topic, key, row, variables) items in one transaction, with a
+    trace span per written task. Returns {task_id: variables | Exception}. If the
+    transaction fails, every item is retried in its own transaction so one bad row only
+    fails its own task.
+    """
+    started_at = started_at or utcnow()
+    try:
+        conn = worker_sql_conn()
+        cur = conn.cursor()
+        results = {}
+        done = ledger_lookup(cur, [item[0] for item in items]) if IDEMPOTENT_WRITES else {}
+
+        by_topic = {}
+        for item in items:
+            task, topic = item[0], item[1]
+            if ledger_key(task) in done:
+                print(f"[store-worker] {topic}: already processed, completing again task={task['id']}")
+                results[task["id"]] = done[ledger_key(task)]
+            else:
+                by_topic.setdefault(topic, []).append(item)
+
+        processed, written_log = [], []
+        for topic, topic_items in by_topic.items():
+            handler = TOPIC_HANDLERS[topic]
+            with handler_seconds.time(topic=topic):
+                written = handler.write(cur, [row for _, _, _, row, _ in topic_items])
+            for task, _, key, _, result_vars in topic_items:
+                out = written.get(str(key).lower())
+                if out is None:
+                    results[task["id"]] = LookupError(f"{handler.key_column} {key} not found in {handler.table} table")
+                else:
+                    results[task["id"]] = result_vars
+                    processed.append((task, result_vars))
+                    written_log.append(f"[store-worker] {topic}: {handler.table} {handler.key_column}={key} "
+                                       f"status '{out[1]}' task={task['id']}")
+
+        record_spans(cur, [task_span(task, started_at) for task, _ in processed])
+        if IDEMPOTENT_WRITES:
+            ledger_record(cur, processed)
+        conn.commit()
+    except Exception as e:
+        # The connection may be broken; start over with a fresh one
+        drop_worker_sql_conn()
+        if len(items) == 1:
+            # Lost a race with another replica writing the same task: use its result
+            task = items[0][0]
+            if IDEMPOTENT_WRITES and ledger_key(task):
+                try:
+                    done = ledger_lookup(worker_sql_conn().cursor(), [task])
+                    if ledger_key(task) in done:
+                        return {task["id"]: done[ledger_key(task)]}
+                except Exception:
+                    drop_worker_sql_conn()
+            return {task["id"]: e}
+        print(f"[store-worker] batch of {len(items)} failed ({e}); retrying tasks individually")
+        results = {}
+        for item in items:
+            results.update(write_items([item], started_at))
+        return results
+
+    for line in written_log:
+        print(line)
+    return results
+
+
+def process_batch(session: requests.Session, engine_rest: str, worker_id: str, tasks: list, extender: LockExtender):
+    started_at = utcnow()
+    for t in tasks:
+        extender.track(t["id"])
+    try:
+        results = {}
+        items = []
+        for t in tasks:
+            topic = t.get("topicName")
+            try:
+                key, row, result_vars = TOPIC_HANDLERS[topic].build(t)
+                items.append((t, topic, key, row, result_vars))
+            except Exception as e:
+                results[t["id"]] = e
+        if items:
+            results.update(write_items(items, started_at))
+            if any(not isinstance(r, Exception) for r in results.values()):
+                invalidate_backend_cache()
+
+        for t in tasks:
+            task_id = t["id"]
+            topic = t.get("topicName")
+            outcome = results[task_id]
+            try:
+                if isinstance(outcome, Exception):
+                    print(f"[store-worker] FAILED topic={topic} task={task_id} err={outcome}")
+                    task_failures.inc(topic=topic)
+                    fail_task(session, engine_rest, task_id, worker_id,
+                              msg=f"Contracts store write failed ({topic})",
+                              details=str(outcome))
+                else:
+                    with complete_seconds.time(topic=topic):
+                        complete_task(session, engine_rest, task_id, worker_id, outcome)
+            except Exception as e:
+                print(f"[store-worker] could not report outcome task={task_id} err={e}")
+    finally:
+        for t in tasks:
+            extender.untrack(t["id"])
+
+
+def main():
+    engine_rest = env("ENGINE_REST")               # e.g. http://camunda:8080/engine-rest
+    cam_user = env("CAMUNDA_USER", "demo")
+    cam_pass = env("CAMUNDA_PASS", "demo")
+    topics = [t.strip() for t in env("STORE_TOPICS", ",".join(TOPIC_HANDLERS)).split(",") if t.strip()]
+
+    unknown = [t for t in topics if t not in TOPIC_HANDLERS]
+    if unknown:
+        raise RuntimeError(f"No handler for topic(s): {', '.join(unknown)}")
+
+    worker_id = os.getenv("WORKER_ID", f"worker-store-{uuid.uuid4()}")
+    lock_ms = int(os.getenv("LOCK_DURATION_MS", "60000"))
+    max_tasks = int(os.getenv("MAX_TASKS", "5"))
+    async_timeout_ms = int(os.getenv("ASYNC_RESPONSE_TIMEOUT_MS", "30000"))
+    concurrency = int(os.getenv("WORKER_CONCURRENCY", "4"))
+    # true: every fetched batch is written in one transaction; false: one transaction per task
+    batch_writes = os.getenv("BATCH_WRITES", "true").lower() == "true"
+    # false: fetch every variable in scope (debugging only; bodies and descriptions are large)
+    filter_variables = os.getenv("FETCH_VARIABLES_FILTER", "true").lower() == "true"
+    deserialize_values = os.getenv("FETCH_DESERIALIZE_VALUES", "false").lower() == "true"
+    stats_interval = float(os.getenv("STATS_INTERVAL_SEC", "60"))
+    topic_variables = fetch_variables(topics) if filter_variables else None
+
+    storage = get_storage()
+    for t in topics:
+        TOPIC_HANDLERS[t].prepare(storage)
+
+    metrics_port = int(os.getenv("METRICS_PORT", "9100"))
+    if metrics_port:
+        serve_metrics(metrics_port)
+
+    # One keep-alive session for every engine call, sized for the handler threads
+    session = requests.Session()
+    session.auth = HTTPBasicAuth(cam_user, cam_pass)
+    adapter = HTTPAdapter(pool_maxsize=concurrency + 2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    extender = LockExtender(session, engine_rest, worker_id, lock_ms)
+    extender.start()
+
+    stopping = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"[store-worker] signal {signum} received, draining in-flight tasks...")
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    print(f"[store-worker] started. engine={engine_rest} topics={topics} workerId={worker_id} "
+          f"concurrency={concurrency} batchWrites={batch_writes} variableFilter={filter_variables}")
+
+    in_flight = set()
+    next_stats = time.monotonic() + stats_interval
+    next_purge = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="store-task") as executor:
+        while not stopping.is_set():
+            try:
+                # Only lock as many tasks as there are free handler slots
+                if len(in_flight) >= concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    continue
+                # In batch mode each slot takes a whole batch
+                free = max_tasks if batch_writes else min(max_tasks, concurrency - len(in_flight))
+                # Don't hold a long poll open while finished futures wait to be reaped
+                poll_ms = async_timeout_ms if not in_flight else min(async_timeout_ms, 1000)
+
+                tasks = fetch_and_lock(session, engine_rest, worker_id, topics, free, lock_ms, poll_ms,
+                                       topic_variables, deserialize_values)
+                batches = [tasks] if batch_writes and tasks else [[t] for t in tasks]
+                for batch in batches:
+                    in_flight.add(executor.submit(process_batch, session, engine_rest, worker_id, batch, extender))
+                in_flight = {f for f in in_flight if not f.done()}
+
+                if time.monotonic() >= next_stats:
+                    next_stats = time.monotonic() + stats_interval
+                    print(f"[store-worker] fetch stats {json.dumps(fetch_stats.snapshot())}", flush=True)
+
+                if IDEMPOTENT_WRITES and time.monotonic() >= next_purge:
+                    next_purge = time.monotonic() + 3600
+                    try:
+                        purge_ledger()
+                    except Exception as e:
+                        drop_worker_sql_conn()
+                        print(f"[store-worker] ledger purge failed: {e}")
+
+            except Exception as e:
+                print(f"[store-worker] loop error: {e}")
+                stopping.wait(5)
+
+        # Graceful shutdown: locked tasks are finished, nothing new is fetched
+        if in_flight:
+            print(f"[store-worker] waiting for {len(in_flight)} in-flight task(s)...")
+        wait(in_flight)
+
+    extender.stop()
+    session.close()
+    print("[store-worker] stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Offline tests: SQLite storage and the fake Camunda engine, no services required.
+Run from the repository root with `python -m pytest -q`.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Appended, as the workers do, so backend/camunda.py does not shadow the camunda client library
+for directory in ("backend", "docker", "benchmarks"):
+    sys.path.append(os.path.join(ROOT, directory))
+
+# Must be set before storage.get_storage() is first called
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ.setdefault("METRICS_PORT", "0")
+
+import pytest
+
+from schema import apply_migrations
+from storage import SqliteStorage
+
+
+@pytest.fixture
+def sqlite_conn(tmp_path):
+    """Connection to a fresh SQLite database with every migration applied."""
+    storage = SqliteStorage(str(tmp_path / "contracts.db"))
+    conn = storage.connect()
+    apply_migrations(conn, storage)
+    yield conn
+    conn.close()
@@ -0,0 +1,18 @@
+import pytest
+
+ExternalTask = pytest.importorskip("camunda.external_task.external_task").ExternalTask
+
+from email_worker import render_notification, task_var
+
+
+@pytest.mark.parametrize("variables", [
+    {"template": {"value": ""}, "subject": {"value": ""}, "body": {"value": "Offer received"}},
+    {"template": {"value": None}, "subject": {"value": "Reminder"}, "body": {"value": ""}},
+    {"subject": {"value": "Reminder"}},
+])
+def test_digest_reads_variables_like_single_sends(variables):
+    task = {"id": "t1", "variables": variables}
+    for name in ("template", "subject", "body", "missing"):
+        assert task_var(task, name) == ExternalTask(task).get_variable(name)
+    # The digest renders each task through task_var, a single send through get_variable
+    assert render_notification(lambda name: task_var(task, name)) == render_notification(ExternalTask(task).get_variable)
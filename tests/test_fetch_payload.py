@@ -0,0 +1,61 @@
+"""
+The store worker's fetchAndLock against benchmarks/fake_camunda.py: the variables
+filter names only what each topic handler reads, and shrinks the response without
+changing the row the handler builds.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import httpx
+import pytest
+import requests
+
+from bench_fetch_payload import process_scope
+from bench_offline import BENCH_DIR, free_port, stop, wait_http
+from store_worker import TOPIC_HANDLERS, fetch_and_lock, fetch_variables
+from tracing import CORRELATION_VARIABLE
+
+
+@pytest.fixture(scope="module")
+def camunda_url():
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "fake_camunda.py"), "--port", str(port)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    try:
+        url = f"http://127.0.0.1:{port}"
+        wait_http(f"{url}/_bench/state")
+        yield url
+    finally:
+        stop(proc)
+
+
+def _fetch(camunda_url, topic, variables):
+    """-> (fetchAndLock request body, raw response body, tasks) for one task of `topic`."""
+    exchanges = []
+    session = requests.Session()
+    session.hooks["response"].append(lambda r, *args, **kwargs: exchanges.append(r))
+    tasks = fetch_and_lock(session, f"{camunda_url}/engine-rest", "test-worker", [topic], 1, 60000, 0, variables)
+    (response,) = exchanges
+    return json.loads(response.request.body), response.content, tasks
+
+
+@pytest.mark.parametrize("topic", list(TOPIC_HANDLERS))
+def test_variables_filter_shrinks_fetch_payload(camunda_url, topic):
+    handler = TOPIC_HANDLERS[topic]
+    scope = {**process_scope(description_kb=8), CORRELATION_VARIABLE: {"type": "String", "value": "corr-1"}}
+    httpx.post(f"{camunda_url}/_bench/reset", timeout=10).raise_for_status()
+    (instance_id,) = httpx.post(f"{camunda_url}/_bench/instances", json={"count": 1}, timeout=10).json()
+    # Two identical tasks, one fetched with the filter and one without
+    task = {"topic": topic, "processInstanceId": instance_id, "variables": scope}
+    httpx.post(f"{camunda_url}/_bench/tasks", json={"tasks": [task, task]}, timeout=10).raise_for_status()
+
+    request, slim_body, (slim,) = _fetch(camunda_url, topic, fetch_variables([topic]))
+    _, full_body, (full,) = _fetch(camunda_url, topic, None)
+
+    (topic_request,) = request["topics"]
+    assert topic_request["variables"] == list(handler.variables) + [CORRELATION_VARIABLE]
+    assert set(slim["variables"]) <= set(handler.variables) | {CORRELATION_VARIABLE}
+    assert len(slim_body) < len(full_body)
+    assert handler.build(slim)[1] == handler.build(full)[1]
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from paging import decode_cursor, encode_cursor, keyset_page
+
+
+def _insert(conn, rows):
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO Contracts (ContractId, ContractStatus, ApprovedAt, CreatedAt) VALUES (?, 'Approved', ?, ?)",
+        rows
+    )
+    conn.commit()
+
+
+def _all_pages(conn, limit):
+    ids, after = [], None
+    while True:
+        rows, after = keyset_page(conn.cursor(), ["ContractId"], "ContractStatus = 'Approved'",
+                                  "ApprovedAt", limit, after)
+        ids += [r["ContractId"] for r in rows]
+        if after is None:
+            return ids
+
+
+def test_cursor_round_trips_null_sort_value():
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+    moment = datetime(2026, 1, 1, 8, 30)
+    assert decode_cursor(encode_cursor(moment, 3)) == (moment, 3)
+
+
+def test_pages_across_null_sort_values(sqlite_conn):
+    base = datetime(2026, 1, 1)
+    approved = [(f"c{i}", base + timedelta(hours=i), base) for i in range(5)]
+    # Legacy rows without ApprovedAt, interleaved by Id with the dated ones
+    missing = [(f"n{i}", None, base) for i in range(4)]
+    _insert(sqlite_conn, [row for pair in zip(approved, missing) for row in pair] + approved[4:])
+
+    expected = [f"c{i}" for i in reversed(range(5))] + [f"n{i}" for i in reversed(range(4))]
+    for limit in (1, 2, 3, 4, 100):
+        assert _all_pages(sqlite_conn, limit) == expected
+
+
+def test_page_boundary_on_a_null_row(sqlite_conn):
+    base = datetime(2026, 1, 1)
+    _insert(sqlite_conn, [("c0", base, base), ("n0", None, base), ("n1", None, base), ("n2", None, base)])
+
+    rows, after = keyset_page(sqlite_conn.cursor(), ["ContractId"], "ContractStatus = 'Approved'",
+                              "ApprovedAt", 2, None)
+    assert [r["ContractId"] for r in rows] == ["c0", "n2"]
+    assert decode_cursor(after)[0] is None
+
+    rows, after = keyset_page(sqlite_conn.cursor(), ["ContractId"], "ContractStatus = 'Approved'",
+                              "ApprovedAt", 2, after)
+    assert [r["ContractId"] for r in rows] == ["n1", "n0"]
+    assert after is None
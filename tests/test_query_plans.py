@@ -0,0 +1,95 @@
+"""
+The list endpoints' keyset queries must be answered from the status/time indexes,
+never by scanning Contracts: checked with SQLite's EXPLAIN QUERY PLAN offline, and
+with SQL Server's estimated plan (SET SHOWPLAN_XML ON; nothing is executed) when
+AZURE_SQL_* credentials are set.
+"""
+import os
+import re
+from datetime import datetime
+
+import pytest
+
+from paging import encode_cursor, keyset_query
+from schema import apply_migrations
+from storage import AzureSqlStorage
+
+# (name, columns, where, sort column, source relation, expected SQL Server indexes).
+# Approved/rejected lists read the ContractsAll view and must seek both the hot and
+# the history index.
+LIST_QUERIES = [
+    ("/contracts/submitted", ["ContractId", "ContractTitle", "ContractStatus", "CreatedAt"],
+     "ContractStatus IN ('Submitted', 'Running')", "CreatedAt", "Contracts",
+     {"IX_Contracts_Status_CreatedAt"}),
+    ("/api/providers/contracts", ["ContractId", "ContractTitle", "ContractType", "Budget", "ContractStatus"],
+     "ContractStatus IN ('Submitted', 'Running')", "CreatedAt", "Contracts",
+     {"IX_Contracts_Status_CreatedAt"}),
+    ("/contracts/approved", ["ContractId", "ContractTitle", "ContractStatus", "ApprovedAt"],
+     "ContractStatus = 'Approved'", "ApprovedAt", "ContractsAll",
+     {"IX_Contracts_Approved_ApprovedAt", "IX_ContractsHistory_Approved_ApprovedAt"}),
+    ("/contracts/rejected", ["ContractId", "ContractTitle", "ContractStatus", "RejectedAt"],
+     "ContractStatus = 'Rejected'", "RejectedAt", "ContractsAll",
+     {"IX_Contracts_Rejected_RejectedAt", "IX_ContractsHistory_Rejected_RejectedAt"}),
+]
+
+# First page, a follow-up page, and a follow-up page among rows without a sort value
+PAGES = [
+    ("first", None),
+    ("next", encode_cursor(datetime(2026, 1, 1), 2 ** 31 - 1)),
+    ("next-null", encode_cursor(None, 2 ** 31 - 1)),
+]
+
+CASES = [pytest.param(query, after, id=f"{query[0]}-{page}") for query in LIST_QUERIES for page, after in PAGES]
+
+
+@pytest.mark.parametrize("query, after", CASES)
+def test_sqlite_plan_searches_indexes(sqlite_conn, query, after):
+    name, columns, where, sort_column, table, _ = query
+    sql, params, _ = keyset_query(columns, where, sort_column, 100, after, table)
+    cursor = sqlite_conn.cursor()
+    cursor.execute("EXPLAIN QUERY PLAN " + sql, *params)
+    steps = [row[-1] for row in cursor.fetchall()]
+
+    assert not [s for s in steps if re.match(r"SCAN Contracts(History)?\b", s)], steps
+    searched = {m.group(1) for s in steps for m in [re.match(r"SEARCH (\w+) USING (?:COVERING )?INDEX", s)] if m}
+    assert searched == ({"Contracts", "ContractsHistory"} if table == "ContractsAll" else {"Contracts"}), steps
+
+
+_OP_RE = re.compile(r'<RelOp [^>]*PhysicalOp="([^"]+)"')
+_INDEX_RE = re.compile(r'<Object [^>]*Table="\[Contracts(?:History)?\]"[^>]*Index="\[([^\]]+)\]"')
+
+
+@pytest.fixture(scope="module")
+def azure_sql():
+    if not all(os.getenv(v) for v in ("AZURE_SQL_SERVER", "AZURE_SQL_DATABASE", "AZURE_SQL_USER", "AZURE_SQL_PASSWORD")):
+        pytest.skip("needs AZURE_SQL_* credentials")
+    storage = AzureSqlStorage()
+    conn = storage.connect()
+    apply_migrations(conn, storage)
+    yield storage, conn
+    conn.close()
+
+
+def _plan_xml(conn, sql: str, params: list) -> str:
+    cursor = conn.cursor()
+    cursor.execute("SET SHOWPLAN_XML ON")
+    try:
+        cursor.execute(sql, *params)
+        return "".join(row[0] for row in cursor.fetchall())
+    finally:
+        cursor.execute("SET SHOWPLAN_XML OFF")
+
+
+@pytest.mark.parametrize("query, after", CASES)
+def test_sql_server_plan_seeks_indexes(azure_sql, monkeypatch, query, after):
+    storage, conn = azure_sql
+    # keyset_query renders TOP/NULLS LAST for the process-wide (SQLite) backend otherwise
+    monkeypatch.setattr("paging.get_storage", lambda: storage)
+    name, columns, where, sort_column, table, expected = query
+    sql, params, _ = keyset_query(columns, where, sort_column, 100, after, table)
+    xml = _plan_xml(conn, sql, params)
+
+    ops = _OP_RE.findall(xml)
+    assert "Index Seek" in ops, ops
+    assert not [op for op in ops if op in ("Table Scan", "Clustered Index Scan", "Index Scan")], ops
+    assert expected <= set(_INDEX_RE.findall(xml))
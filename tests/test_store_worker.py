@@ -0,0 +1,40 @@
+from store_worker import TOPIC_HANDLERS
+
+
+def _task(task_id, **variables):
+    return {"id": task_id, "processInstanceId": "pi-1", "businessKey": None,
+            "variables": {name: {"value": value} for name, value in variables.items()}}
+
+
+def _write(conn, topic, task):
+    handler = TOPIC_HANDLERS[topic]
+    cursor = conn.cursor()
+    written = handler.write(cursor, [handler.build(task)[1]])
+    conn.commit()
+    return written
+
+
+def test_redraft_clears_previous_round(sqlite_conn):
+    contract_id = "0b7c4d52-5d0a-4e38-9a57-2a4f5f1f7b11"
+    _write(sqlite_conn, "store-create-contract",
+           _task("t1", contractId=contract_id, contractTitle="Ops", budget="1000"))
+    cursor = sqlite_conn.cursor()
+    cursor.execute(
+        "UPDATE Contracts SET ProvidersBudget = 900, ProvidersComment = 'two weeks', ProvidersName = 'Acme', "
+        "MeetRequirement = 'yes' WHERE ContractId = ?", contract_id
+    )
+    sqlite_conn.commit()
+    _write(sqlite_conn, "store-reject-contract",
+           _task("t2", contractId=contract_id, legalcomment="Too expensive", approvaldecision="reject"))
+
+    # The rejection loop stores the redrafted form under the same contractId
+    written = _write(sqlite_conn, "store-create-contract",
+                     _task("t3", contractId=contract_id, contractTitle="Ops v2", budget="1200"))
+
+    assert written[contract_id] == (contract_id, "Submitted")
+    cursor.execute(
+        "SELECT ContractTitle, Budget, ContractStatus, ProvidersBudget, ProvidersComment, ProvidersName, "
+        "MeetRequirement, LegalComment, ApprovalDecision, RejectedAt FROM Contracts WHERE ContractId = ?",
+        contract_id
+    )
+    assert cursor.fetchall() == [("Ops v2", 1200.0, "Submitted", None, "", None, None, None, None, None)]